@@ -19,6 +19,13 @@ from src.models import db
 
 migrate = Migrate(app, db)
 
+# Registra os comandos de manutenção (ex.: 'flask files migrate-blobs')
+from src.cli import files_cli, stats_cli, users_cli, versions_cli
+app.cli.add_command(files_cli)
+app.cli.add_command(stats_cli)
+app.cli.add_command(users_cli)
+app.cli.add_command(versions_cli)
+
 # Não execute o app aqui, apenas exponha a variável 'app' para o Flask CLI
 if __name__ == '__main__':
     print("Este arquivo é apenas um ponto de entrada para o Flask CLI.")
@@ -0,0 +1,69 @@
+"""busca textual (tsvector + GIN) em artigos
+
+Revision ID: b882a162e953
+Revises: 59337c3e70dd
+Create Date: 2025-06-10 10:12:41.208377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b882a162e953'
+down_revision = '59337c3e70dd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    is_postgres = op.get_bind().dialect.name == 'postgresql'
+
+    with op.batch_alter_table('articles', schema=None) as batch_op:
+        batch_op.add_column(sa.Column(
+            'search_vector',
+            sa.Text().with_variant(postgresql.TSVECTOR(), 'postgresql'),
+            nullable=True
+        ))
+
+    if is_postgres:
+        op.execute("""
+            CREATE OR REPLACE FUNCTION articles_search_vector_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector :=
+                    setweight(to_tsvector('portuguese', coalesce(NEW.title, '')), 'A') ||
+                    setweight(to_tsvector('portuguese', coalesce(NEW.content, '')), 'B');
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        op.execute("""
+            CREATE TRIGGER articles_search_vector_trigger
+                BEFORE INSERT OR UPDATE OF title, content ON articles
+                FOR EACH ROW EXECUTE PROCEDURE articles_search_vector_update()
+        """)
+        # Preenche o vetor dos artigos existentes
+        op.execute("""
+            UPDATE articles SET search_vector =
+                setweight(to_tsvector('portuguese', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('portuguese', coalesce(content, '')), 'B')
+        """)
+
+    op.create_index(
+        'ix_articles_search_vector', 'articles', ['search_vector'],
+        unique=False, postgresql_using='gin'
+    )
+
+
+def downgrade():
+    is_postgres = op.get_bind().dialect.name == 'postgresql'
+
+    op.drop_index('ix_articles_search_vector', table_name='articles')
+
+    if is_postgres:
+        op.execute('DROP TRIGGER IF EXISTS articles_search_vector_trigger ON articles')
+        op.execute('DROP FUNCTION IF EXISTS articles_search_vector_update()')
+
+    with op.batch_alter_table('articles', schema=None) as batch_op:
+        batch_op.drop_column('search_vector')
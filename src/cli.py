@@ -0,0 +1,366 @@
+"""
+Comandos de manutenção para o Flask CLI (registrados em app.py).
+
+Exemplo:
+    flask files migrate-blobs --batch-size 50
+    flask files gc-uploads
+    flask files thumbnails --include-failed
+    flask stats reconcile
+    flask users import novos_usuarios.csv --dry-run
+    flask versions compact
+    flask versions dedupe
+"""
+import time
+
+import click
+from flask.cli import AppGroup
+
+files_cli = AppGroup('files', help='Manutenção dos arquivos enviados.')
+stats_cli = AppGroup('stats', help='Contadores do painel administrativo.')
+users_cli = AppGroup('users', help='Administração de usuários.')
+versions_cli = AppGroup('versions', help='Histórico de versões dos artigos.')
+
+
+@files_cli.command('migrate-blobs')
+@click.option('--batch-size', default=50, show_default=True, help='Arquivos por lote (uma transação por lote).')
+@click.option('--limit', default=0, help='Máximo de arquivos nesta execução (0 = todos).')
+@click.option('--pause', default=0.0, help='Pausa em segundos entre lotes, para reduzir a carga em horário comercial.')
+@click.option('--target', type=click.Choice(['filesystem']), default='filesystem', show_default=True,
+              help='Backend de destino.')
+def migrate_blobs(batch_size, limit, pause, target):
+    """Move os arquivos armazenados no banco para o repositório em disco.
+
+    Pode ser interrompido e executado novamente (continua de onde parou) e
+    pode rodar em vários processos ao mesmo tempo no PostgreSQL.
+    """
+    from src.services.blob_migration import migrate_batch, pending_count
+
+    pending = pending_count()
+    click.echo(f'{pending} arquivo(s) armazenado(s) no banco.')
+
+    started = time.monotonic()
+    after_id = 0
+    migrated = total_bytes = batch_number = 0
+    failures = []
+
+    while not limit or migrated + len(failures) < limit:
+        size = batch_size if not limit else min(batch_size, limit - migrated - len(failures))
+        batch_started = time.monotonic()
+        result = migrate_batch(size, after_id=after_id, target=target)
+        if result.processed == 0:
+            break
+
+        batch_number += 1
+        after_id = result.last_id
+        migrated += result.migrated
+        total_bytes += result.bytes
+        failures.extend(result.failed)
+
+        batch_elapsed = max(time.monotonic() - batch_started, 1e-6)
+        elapsed = max(time.monotonic() - started, 1e-6)
+        click.echo(
+            f'lote {batch_number}: {result.migrated} migrado(s), {len(result.failed)} falha(s), '
+            f'{result.bytes / 1024 / 1024:.1f} MB em {batch_elapsed:.1f}s | '
+            f'total {migrated}/{pending} ({total_bytes / 1024 / 1024:.1f} MB, '
+            f'{migrated / elapsed:.1f} arq/s, {total_bytes / 1024 / 1024 / elapsed:.1f} MB/s)'
+        )
+        for file_id, reason in result.failed:
+            click.echo(f'  arquivo {file_id}: {reason}', err=True)
+
+        if pause:
+            time.sleep(pause)
+
+    click.echo(f'Concluído: {migrated} arquivo(s) migrado(s), {len(failures)} falha(s).')
+
+
+@files_cli.command('gc-uploads')
+def gc_uploads():
+    """Remove sessões de envio em pedaços concluídas ou expiradas.
+
+    Sessões com mais de UPLOAD_SESSION_TTL_HOURS horas são apagadas junto com
+    os pedaços no disco. Pode ser agendado (ex.: cron a cada hora).
+    """
+    from src.services.upload_sessions import collect_garbage
+
+    removed = collect_garbage()
+    click.echo(f'{removed} sessão(ões) de envio removida(s).')
+
+
+@files_cli.command('gc-blobs')
+def gc_blobs():
+    """Remove os blobs do repositório em disco que nenhum arquivo referencia.
+
+    Blobs de arquivos excluídos normalmente são removidos no commit da
+    exclusão; ficam para este comando os reutilizados por um envio nos
+    últimos BLOB_REUSE_GRACE_SECONDS e os de remoções interrompidas. Pode ser
+    agendado (ex.: cron diário).
+    """
+    from src.services.file_storage import FilesystemStorage
+
+    removed = FilesystemStorage().collect_garbage()
+    click.echo(f'{removed} blob(s) removido(s).')
+
+
+@files_cli.command('thumbnails')
+@click.option('--include-failed', is_flag=True, help='Tenta novamente os arquivos cuja miniatura falhou.')
+@click.option('--limit', default=0, help='Máximo de arquivos nesta execução (0 = todos).')
+def generate_thumbnails(include_failed, limit):
+    """Gera as miniaturas que faltam (arquivos antigos ou trabalhos perdidos).
+
+    Usa o mesmo pool de threads dos envios (THUMBNAIL_WORKERS).
+    """
+    from flask import current_app
+    from src.models.file import File
+    from src.services import thumbnails
+
+    query = thumbnails.pending_files(include_failed=include_failed).with_entities(File.id)
+    if limit:
+        query = query.limit(limit)
+    file_ids = [file_id for (file_id,) in query]
+    click.echo(f'{len(file_ids)} arquivo(s) sem miniatura.')
+
+    app = current_app._get_current_object()
+    futures = [thumbnails.get_executor().submit(thumbnails.generate_in_context, app, file_id)
+               for file_id in file_ids]
+    generated = 0
+    for done, future in enumerate(futures, start=1):
+        generated += bool(future.result())
+        if done % 50 == 0:
+            click.echo(f'  {done}/{len(file_ids)}')
+
+    click.echo(f'Concluído: {generated} miniatura(s) gerada(s), {len(file_ids) - generated} falha(s).')
+
+
+@files_cli.command('extract-inline-images')
+@click.option('--dry-run', is_flag=True, help='Apenas calcula o que seria extraído, sem gravar.')
+@click.option('--article-id', type=int, default=None, help='Apenas este artigo (padrão: todos).')
+@click.option('--batch-size', default=50, show_default=True, help='Artigos por lote.')
+@click.option('--limit', default=0, help='Máximo de artigos nesta execução (0 = todos).')
+@click.option('--pause', default=0.0, help='Pausa em segundos entre lotes, para reduzir a carga em horário comercial.')
+def extract_inline_images_command(dry_run, article_id, batch_size, limit, pause):
+    """Extrai as imagens em base64 do conteúdo dos artigos e das versões.
+
+    Cada imagem vira um arquivo (servido por /files/serve/<id>) e o HTML passa
+    a apontar para ele; imagens repetidas usam o mesmo arquivo. Uma transação
+    por artigo; pode ser interrompido e executado novamente. As miniaturas
+    ficam pendentes para 'flask files thumbnails'.
+    """
+    from src.models.article import Article
+    from src.models.user import db
+    from src.services.inline_images import extract_article
+
+    after_id = 0
+    articles = images = article_bytes = version_bytes = batch_number = 0
+    while not limit or articles < limit:
+        if article_id is not None:
+            article_ids = [article_id] if batch_number == 0 else []
+        else:
+            size = batch_size if not limit else min(batch_size, limit - articles)
+            article_ids = [row[0] for row in db.session.query(Article.id).filter(
+                Article.id > after_id
+            ).order_by(Article.id).limit(size)]
+        if not article_ids:
+            break
+
+        batch_number += 1
+        after_id = article_ids[-1]
+        batch_bytes = 0
+        for current_id in article_ids:
+            result = extract_article(current_id, dry_run=dry_run)
+            images += result.images
+            article_bytes += result.article_bytes
+            version_bytes += result.version_bytes
+            batch_bytes += result.article_bytes + result.version_bytes
+        articles += len(article_ids)
+        click.echo(
+            f'lote {batch_number}: {len(article_ids)} artigo(s), {batch_bytes / 1024 / 1024:.1f} MB | '
+            f'total {articles} artigo(s), {(article_bytes + version_bytes) / 1024 / 1024:.1f} MB'
+        )
+
+        if pause:
+            time.sleep(pause)
+
+    summary = (
+        f'{articles} artigo(s), {images} imagem(ns); {article_bytes / 1024 / 1024:.1f} MB do conteúdo '
+        f'dos artigos e {version_bytes / 1024 / 1024:.1f} MB das versões'
+    )
+    if dry_run:
+        click.echo(f'Simulação: {summary} seriam removidos. Nada foi gravado.')
+    else:
+        click.echo(f'Concluído: {summary} removidos.')
+
+
+@stats_cli.command('reconcile')
+def reconcile_stats():
+    """Recalcula os contadores do painel e corrige divergências.
+
+    Os contadores são mantidos a cada alteração; este comando corrige desvios
+    (ex.: registros alterados direto no banco). Pode ser agendado (ex.: cron diário).
+    """
+    from src.services.stats import reconcile
+
+    fixed = reconcile()
+    for name, (old, new) in sorted(fixed.items()):
+        click.echo(f'  {name}: {old if old is not None else "ausente"} -> {new}')
+    click.echo(f'{len(fixed)} contador(es) corrigido(s).')
+
+
+@users_cli.command('import')
+@click.argument('path', type=click.File('rb'))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'json']), default=None,
+              help='Formato do arquivo (padrão: pela extensão ou pelo conteúdo).')
+@click.option('--dry-run', is_flag=True, help='Apenas valida as linhas, sem gravar.')
+def import_users_command(path, fmt, dry_run):
+    """Cadastra os usuários de um arquivo CSV ou JSON.
+
+    Colunas: username, email, full_name, role, active, password. As linhas com
+    erro são listadas e ignoradas; as demais são gravadas em uma transação.
+    """
+    import os
+
+    from flask import current_app
+    from src.services.user_import import ImportFormatError, parse_rows, import_users, summarize
+
+    processes = current_app.config['USER_IMPORT_HASH_PROCESSES'] or os.cpu_count() or 1
+    try:
+        rows = parse_rows(path.read(), fmt=fmt, filename=path.name)
+        report = import_users(rows, dry_run=dry_run, processes=processes)
+    except ImportFormatError as e:
+        raise click.ClickException(str(e))
+
+    for entry in report:
+        if entry['status'] == 'error':
+            click.echo(f'  linha {entry["line"]} ({entry["username"] or "-"}): {entry["message"]}', err=True)
+    summary = summarize(report)
+    if dry_run:
+        click.echo(f'{summary.get("valid", 0)} válido(s), {summary.get("error", 0)} com erro. Nada foi gravado.')
+    else:
+        click.echo(f'{summary.get("created", 0)} usuário(s) criado(s), {summary.get("error", 0)} com erro.')
+
+
+@versions_cli.command('compact')
+@click.option('--article-id', type=int, default=None, help='Apenas este artigo (padrão: todos).')
+@click.option('--interval', type=int, default=None,
+              help='Versões por cadeia de deltas (padrão: VERSION_KEYFRAME_INTERVAL).')
+def compact_versions(article_id, interval):
+    """Regrava o histórico de versões como versões completas periódicas e deltas.
+
+    Serve para os históricos gravados antes dos deltas (todas as versões
+    completas) ou para aplicar um novo VERSION_KEYFRAME_INTERVAL. Uma
+    transação por artigo; pode ser interrompido e executado novamente.
+    """
+    from src.models.article_version import ArticleVersion
+    from src.models.user import db
+    from src.services.version_store import compact_article
+
+    if article_id is not None:
+        article_ids = [article_id]
+    else:
+        article_ids = [row[0] for row in db.session.query(ArticleVersion.article_id).distinct().order_by(ArticleVersion.article_id)]
+
+    total_before = total_after = 0
+    for done, current_id in enumerate(article_ids, start=1):
+        before, after = compact_article(current_id, interval)
+        total_before += before
+        total_after += after
+        if done % 50 == 0:
+            click.echo(f'  {done}/{len(article_ids)} artigo(s)')
+
+    saved = total_before - total_after
+    click.echo(
+        f'Concluído: {len(article_ids)} artigo(s), {total_before / 1024 / 1024:.1f} MB -> '
+        f'{total_after / 1024 / 1024:.1f} MB ({saved / 1024 / 1024:.1f} MB a menos).'
+    )
+
+
+@versions_cli.command('dedupe')
+@click.option('--article-id', type=int, default=None, help='Apenas este artigo (padrão: todos).')
+def dedupe_versions(article_id):
+    """Remove versões repetidas em sequência (salvamentos sem alteração).
+
+    Também preenche o hash do conteúdo das versões e artigos antigos. Uma
+    transação por artigo; pode ser interrompido e executado novamente.
+    """
+    from src.models.article_version import ArticleVersion
+    from src.models.user import db
+    from src.services.version_store import collapse_duplicates
+
+    if article_id is not None:
+        article_ids = [article_id]
+    else:
+        article_ids = [row[0] for row in db.session.query(ArticleVersion.article_id).distinct().order_by(ArticleVersion.article_id)]
+
+    removed = 0
+    for done, current_id in enumerate(article_ids, start=1):
+        count = collapse_duplicates(current_id)
+        removed += count
+        if count:
+            click.echo(f'  artigo {current_id}: {count} versão(ões) repetida(s) removida(s)')
+        if done % 50 == 0:
+            click.echo(f'  {done}/{len(article_ids)} artigo(s)')
+
+    click.echo(f'Concluído: {len(article_ids)} artigo(s), {removed} versão(ões) removida(s).')
+
+
+@versions_cli.command('retention')
+@click.option('--dry-run', is_flag=True, help='Apenas calcula o que seria removido, sem gravar.')
+@click.option('--article-id', type=int, default=None, help='Apenas este artigo (padrão: todos).')
+@click.option('--batch-size', default=50, show_default=True, help='Artigos por lote.')
+@click.option('--limit', default=0, help='Máximo de artigos nesta execução (0 = todos).')
+@click.option('--pause', default=0.0, help='Pausa em segundos entre lotes, para reduzir a carga em horário comercial.')
+def apply_version_retention(dry_run, article_id, batch_size, limit, pause):
+    """Aplica a política de retenção ao histórico de versões.
+
+    Mantém todas as versões dos últimos VERSION_RETENTION_KEEP_ALL_DAYS dias,
+    a última de cada dia até VERSION_RETENTION_DAILY_DAYS dias e a última de
+    cada mês depois disso, além da mais recente e das mudanças de status. Uma
+    transação por artigo; pode ser agendado (ex.: cron semanal) e executado
+    novamente.
+    """
+    from src.services.retention import apply_retention, candidate_articles, configured_policy
+
+    policy = configured_policy()
+    click.echo(
+        f'Política: tudo por {policy.keep_all_days} dia(s), uma versão por dia até '
+        f'{policy.daily_days} dia(s), depois uma por mês.'
+    )
+
+    after_id = 0
+    articles = versions_removed = history_removed = reclaimed = batch_number = 0
+    while not limit or articles < limit:
+        if article_id is not None:
+            article_ids = [article_id] if batch_number == 0 else []
+        else:
+            size = batch_size if not limit else min(batch_size, limit - articles)
+            article_ids = candidate_articles(policy, after_id=after_id, limit=size)
+        if not article_ids:
+            break
+
+        batch_number += 1
+        after_id = article_ids[-1]
+        batch_versions = batch_bytes = 0
+        for current_id in article_ids:
+            result = apply_retention(current_id, policy, dry_run=dry_run)
+            batch_versions += result.versions_removed
+            history_removed += result.history_removed
+            batch_bytes += result.bytes_reclaimed
+        articles += len(article_ids)
+        versions_removed += batch_versions
+        reclaimed += batch_bytes
+        click.echo(
+            f'lote {batch_number}: {len(article_ids)} artigo(s), {batch_versions} versão(ões), '
+            f'{batch_bytes / 1024 / 1024:.1f} MB | total {versions_removed} versão(ões), '
+            f'{reclaimed / 1024 / 1024:.1f} MB'
+        )
+
+        if pause:
+            time.sleep(pause)
+
+    summary = (
+        f'{articles} artigo(s) verificado(s), {versions_removed} versão(ões) e '
+        f'{history_removed} entrada(s) de histórico'
+    )
+    if dry_run:
+        click.echo(f'Simulação: {summary} seriam removidas, liberando {reclaimed / 1024 / 1024:.1f} MB. Nada foi gravado.')
+    else:
+        click.echo(f'Concluído: {summary} removidas, {reclaimed / 1024 / 1024:.1f} MB liberados.')
@@ -27,6 +27,10 @@ app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'admin')
 def inject_now():
     return {'now': datetime.now()}
 
+# Cursor pagination links in templates (see partials/pagination.html)
+from src.services.pagination import page_link
+app.add_template_global(page_link)
+
 # Database configuration (escape non-ASCII in password)
 db_user     = os.getenv('DB_USERNAME', 'cdf_user_system')
 db_password = quote_plus(os.getenv('DB_PASSWORD', 'cdfsystem'))
@@ -34,7 +38,8 @@ db_host     = os.getenv('DB_HOST',     'localhost')
 db_port     = os.getenv('DB_PORT',     '5432')
 db_name     = os.getenv('DB_NAME',     'cdf_db')
 
-app.config['SQLALCHEMY_DATABASE_URI'] = (
+# DATABASE_URL, when set, replaces the settings above (e.g. SQLite in the tests)
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL') or (
     f"postgresql://{db_user}:{db_password}"
     f"@{db_host}:{db_port}/{db_name}"
 )
@@ -44,6 +49,74 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = str(BASE_DIR / 'uploads')
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50 MB
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+# Storage backend for new uploads: 'filesystem' (content-addressed blobs under
+# UPLOAD_FOLDER, deduplicated by SHA-256) or 'database' (chunked rows)
+app.config['FILE_STORAGE_BACKEND'] = os.getenv('FILE_STORAGE_BACKEND', 'filesystem')
+# Size of each chunk when files are stored in the database (streamed on download)
+app.config['DB_CHUNK_SIZE'] = int(os.getenv('DB_CHUNK_SIZE', str(512 * 1024)))
+# Let the front-end web server (nginx/Apache) send files from disk via X-Sendfile
+app.config['USE_X_SENDFILE'] = os.getenv('USE_X_SENDFILE', 'false').lower() == 'true'
+# Blobs no longer referenced are removed after the deleting transaction commits,
+# unless an upload reused them within this many seconds (then 'flask files
+# gc-blobs' removes them later)
+app.config['BLOB_REUSE_GRACE_SECONDS'] = int(os.getenv('BLOB_REUSE_GRACE_SECONDS', '600'))
+# Browser cache lifetime (seconds) for files served publicly (serve_file) and
+# for authenticated downloads (download_file); 0 means always revalidate
+app.config['FILE_CACHE_MAX_AGE_PUBLIC']  = int(os.getenv('FILE_CACHE_MAX_AGE_PUBLIC', '86400'))
+app.config['FILE_CACHE_MAX_AGE_PRIVATE'] = int(os.getenv('FILE_CACHE_MAX_AGE_PRIVATE', '0'))
+# Resumable uploads (/files/uploads): chunk size handed to clients, maximum
+# total size of a session (same limit as regular uploads unless raised) and
+# how long unfinished/completed sessions are kept
+app.config['UPLOAD_CHUNK_SIZE']        = int(os.getenv('UPLOAD_CHUNK_SIZE', str(5 * 1024 * 1024)))
+app.config['UPLOAD_SESSION_MAX_SIZE']  = int(os.getenv('UPLOAD_SESSION_MAX_SIZE', str(app.config['MAX_CONTENT_LENGTH'])))
+app.config['UPLOAD_SESSION_TTL_HOURS'] = int(os.getenv('UPLOAD_SESSION_TTL_HOURS', '24'))
+# Thumbnails for images and PDF first pages: bounding box in pixels and number
+# of background threads generating them after upload
+app.config['THUMBNAIL_SIZE']    = int(os.getenv('THUMBNAIL_SIZE', '320'))
+app.config['THUMBNAIL_WORKERS'] = int(os.getenv('THUMBNAIL_WORKERS', '2'))
+
+# Seconds the logged-in user's basic fields (role, active, name) are cached per
+# worker (entries are also reloaded as soon as any worker changes a user)
+app.config['PRINCIPAL_CACHE_TTL'] = int(os.getenv('PRINCIPAL_CACHE_TTL', '30'))
+
+# last_login is written behind: logins are buffered per worker and flushed in
+# one batched UPDATE every LAST_LOGIN_FLUSH_INTERVAL seconds or once
+# LAST_LOGIN_FLUSH_SIZE users are pending (and on worker shutdown)
+app.config['LAST_LOGIN_FLUSH_INTERVAL'] = float(os.getenv('LAST_LOGIN_FLUSH_INTERVAL', '10'))
+app.config['LAST_LOGIN_FLUSH_SIZE']     = int(os.getenv('LAST_LOGIN_FLUSH_SIZE', '100'))
+
+# Password hashing: werkzeug method with its cost parameters (e.g.
+# "scrypt:32768:8:1" or "pbkdf2:sha256:600000"); stored hashes made with other
+# parameters are upgraded on the next login. Hashes are computed in a pool of
+# PASSWORD_HASH_WORKERS threads; at most PASSWORD_HASH_QUEUE more requests may
+# wait for a thread, beyond that logins get a "try again" page (503)
+app.config['PASSWORD_HASH_METHOD']  = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+app.config['PASSWORD_HASH_QUEUE']   = int(os.getenv('PASSWORD_HASH_QUEUE', '32'))
+
+# Bulk user import (/admin/users/import, 'flask users import'): maximum rows
+# per file and processes hashing passwords in the CLI (0 = one per CPU); the
+# web import hashes one password at a time on the PASSWORD_HASH_* pool
+app.config['USER_IMPORT_MAX_ROWS']       = int(os.getenv('USER_IMPORT_MAX_ROWS', '1000'))
+app.config['USER_IMPORT_HASH_PROCESSES'] = int(os.getenv('USER_IMPORT_HASH_PROCESSES', '0'))
+
+# Article versions are stored as compressed deltas against the previous
+# version, with a full copy at least every VERSION_KEYFRAME_INTERVAL versions
+# (bounds how many deltas are applied to show an old version)
+app.config['VERSION_KEYFRAME_INTERVAL'] = int(os.getenv('VERSION_KEYFRAME_INTERVAL', '10'))
+# Rendered version diffs kept per worker (LRU), in bytes of HTML
+app.config['DIFF_CACHE_MAX_BYTES'] = int(os.getenv('DIFF_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+# Version retention ('flask versions retention'): every version younger than
+# KEEP_ALL_DAYS, the last one per day up to DAILY_DAYS, then the last one per
+# month (the latest version and status changes are always kept)
+app.config['VERSION_RETENTION_KEEP_ALL_DAYS'] = int(os.getenv('VERSION_RETENTION_KEEP_ALL_DAYS', '90'))
+app.config['VERSION_RETENTION_DAILY_DAYS']    = int(os.getenv('VERSION_RETENTION_DAILY_DAYS', '365'))
+# History entries shown on the article page (the full list is in the versions page)
+app.config['HISTORY_PREVIEW_SIZE'] = int(os.getenv('HISTORY_PREVIEW_SIZE', '10'))
+
+# Pagination (items per page in listings)
+app.config['PAGE_SIZE']     = int(os.getenv('PAGE_SIZE', '20'))
+app.config['MAX_PAGE_SIZE'] = int(os.getenv('MAX_PAGE_SIZE', '100'))
 
 # Initialize database and login manager
 from src.models import db, init_db
@@ -54,11 +127,13 @@ login_manager.init_app(app)
 login_manager.login_view    = 'auth.login'
 login_manager.login_message = 'Por favor, faça login para acessar esta página.'
 
-from src.models.user import User
+from src.services.principals import load_principal
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Principal em cache (papel, ativo, nome...); o User completo só é
+    # carregado se a rota usar outros atributos
+    return load_principal(int(user_id))
 
 # Register blueprints
 from src.routes.auth     import auth_bp
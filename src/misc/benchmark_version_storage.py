@@ -0,0 +1,159 @@
+"""
+Benchmark do armazenamento de versões como deltas (src/services/deltas.py).
+
+Gera um histórico de edições parecido com o de um POP real (documento HTML
+com títulos, parágrafos, listas e tabelas; a maioria das edições muda poucas
+palavras, algumas incluem ou removem trechos e, de vez em quando, o texto é
+bastante reescrito) e compara, para cada intervalo de versões completas:
+
+- o espaço ocupado por cópias completas e pela cadeia de deltas;
+- o tempo para gravar uma versão (calcular o delta);
+- o tempo para reconstruir uma versão, inclusive o pior caso (a versão mais
+  distante da última versão completa). A leitura do banco (uma consulta
+  recursiva pela cadeia) não entra na medida.
+
+Uso:
+    python src/misc/benchmark_version_storage.py --edits 200 --intervals 1,5,10,20
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.services.deltas import make_delta, apply_delta, chain_is_full, delta_pays_off
+
+WORDS = (
+    'acessar sistema cadastro cliente verificar campo botão tela relatório '
+    'procedimento técnico equipamento configuração rede servidor senha usuário '
+    'chamado atendimento protocolo registro validar confirmar enviar anexo '
+    'impressora estoque nota fiscal pedido fornecedor prazo responsável setor '
+    'backup rotina diária semanal manutenção preventiva corretiva falha erro'
+).split()
+
+
+def sentence(rng, size=None):
+    words = [rng.choice(WORDS) for _ in range(size or rng.randint(8, 24))]
+    return ' '.join(words).capitalize() + '.'
+
+
+def block(rng):
+    kind = rng.random()
+    if kind < 0.6:
+        return '<p>' + ' '.join(sentence(rng) for _ in range(rng.randint(2, 5))) + '</p>'
+    if kind < 0.75:
+        return f'<h3>{sentence(rng, rng.randint(3, 6))}</h3>'
+    if kind < 0.9:
+        items = ''.join(f'<li>{sentence(rng)}</li>' for _ in range(rng.randint(3, 7)))
+        return f'<ol>{items}</ol>'
+    rows = ''.join(
+        '<tr>' + ''.join(f'<td>{sentence(rng, 3)}</td>' for _ in range(3)) + '</tr>'
+        for _ in range(rng.randint(3, 8))
+    )
+    return f'<table class="table table-bordered"><tbody>{rows}</tbody></table>'
+
+
+def edit(rng, blocks):
+    """Aplica uma edição aleatória (em geral pequena) à lista de blocos."""
+    blocks = list(blocks)
+    kind = rng.random()
+    index = rng.randrange(len(blocks))
+    if kind < 0.6:
+        # Troca algumas palavras de um bloco
+        words = blocks[index].split(' ')
+        for _ in range(rng.randint(1, 4)):
+            words[rng.randrange(len(words))] = rng.choice(WORDS)
+        blocks[index] = ' '.join(words)
+    elif kind < 0.75:
+        blocks.insert(index, block(rng))
+    elif kind < 0.85 and len(blocks) > 5:
+        del blocks[index]
+    elif kind < 0.95:
+        blocks[index] = blocks[index].replace('<p>', '<p><strong>', 1).replace('</p>', '</strong></p>', 1)
+    else:
+        # Reescrita de cerca de um terço do documento
+        for i in rng.sample(range(len(blocks)), len(blocks) // 3):
+            blocks[i] = block(rng)
+    return blocks
+
+
+def make_history(edits, blocks, seed):
+    rng = random.Random(seed)
+    current = [block(rng) for _ in range(blocks)]
+    history = ['\n'.join(current)]
+    for _ in range(edits):
+        current = edit(rng, current)
+        history.append('\n'.join(current))
+    return history
+
+
+def encode(history, interval):
+    """Mesma regra de ArticleVersion.encode_content; devolve as versões e os tempos."""
+    stored = []  # (conteúdo completo ou None, delta ou None, índice da base, profundidade)
+    timings = []
+    for number, content in enumerate(history):
+        started = time.perf_counter()
+        depth = stored[-1][3] if stored else None
+        if number and not chain_is_full(depth, interval):
+            delta = make_delta(history[number - 1], content)
+            if delta_pays_off(len(delta), len(content.encode('utf-8'))):
+                stored.append((None, delta, number - 1, depth + 1))
+                timings.append(time.perf_counter() - started)
+                continue
+        stored.append((content, None, None, 0))
+        timings.append(time.perf_counter() - started)
+    return stored, timings
+
+
+def reconstruct(stored, number):
+    chain = []
+    while stored[number][0] is None:
+        chain.append(stored[number][1])
+        number = stored[number][2]
+    content = stored[number][0]
+    for delta in reversed(chain):
+        content = apply_delta(content, delta)
+    return content
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--edits', type=int, default=200, help='Edições no histórico (padrão: 200)')
+    parser.add_argument('--blocks', type=int, default=60, help='Blocos do documento inicial (padrão: 60)')
+    parser.add_argument('--intervals', default='1,5,10,20', help='Intervalos de versões completas a comparar')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    history = make_history(args.edits, args.blocks, args.seed)
+    full_size = sum(len(content.encode('utf-8')) for content in history)
+    print(f'{len(history)} versões, documento final com {len(history[-1].encode("utf-8")) / 1024:.1f} KB, '
+          f'cópias completas somam {full_size / 1024 / 1024:.2f} MB')
+    print()
+    print(f'{"intervalo":>9} {"completas":>9} {"armazenado":>11} {"economia":>9} '
+          f'{"gravar méd":>11} {"ler méd":>9} {"ler p95":>9} {"ler pior":>9} {"cadeia máx":>10}')
+
+    for interval in (int(value) for value in args.intervals.split(',')):
+        stored, encode_times = encode(history, interval)
+        size = sum(len(content.encode('utf-8')) if content is not None else len(delta)
+                   for content, delta, _, _ in stored)
+        keyframes = sum(1 for content, _, _, _ in stored if content is not None)
+
+        read_times = []
+        for number, expected in enumerate(history):
+            started = time.perf_counter()
+            content = reconstruct(stored, number)
+            read_times.append(time.perf_counter() - started)
+            assert content == expected, f'versão {number} reconstruída incorretamente'
+        read_times.sort()
+
+        print(f'{interval:>9} {keyframes:>9} {size / 1024 / 1024:>9.2f}MB {1 - size / full_size:>9.1%} '
+              f'{statistics.mean(encode_times) * 1000:>9.2f}ms {statistics.mean(read_times) * 1000:>7.2f}ms '
+              f'{read_times[int(len(read_times) * 0.95)] * 1000:>7.2f}ms {read_times[-1] * 1000:>7.2f}ms '
+              f'{max(depth for _, _, _, depth in stored):>10}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 from src.models.user import db, User
 from src.models.article import Category, Tag, Article, ArticleHistory
-from src.models.file import File, ArticleFile
+from src.models.file import File, FileChunk, UploadSession, ArticleFile
+from src.models.stats import StatCounter
 
 # Função para inicializar o banco de dados
 def init_db(app):
@@ -19,7 +20,7 @@ def init_db(app):
                 role='admin',
                 active=True
             )
-            admin.set_password('admin123')  # Senha temporária que deve ser alterada
+            admin.set_password('admin123', wait=True)  # Senha temporária que deve ser alterada
             db.session.add(admin)
             
             # Criar categoria geral padrão
@@ -31,4 +32,9 @@ def init_db(app):
             
             db.session.commit()
             
+            # Contadores do painel de um banco novo (em bancos existentes são
+            # criados pela migração e corrigidos por 'flask stats reconcile')
+            from src.services.stats import reconcile
+            reconcile()
+            
         return True
@@ -1,6 +1,13 @@
 from datetime import datetime
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import column_property, validates
 from src.models.user import db, User
 from src.models.article_version import ArticleVersion
+from src.services.text import make_excerpt, content_hash
+
+# Tentativas de gravar uma versão com número repetido (ver Article.save_version)
+VERSION_SAVE_ATTEMPTS = 3
 
 # adicionamos a importação de User para o relacionamento
 class Category(db.Model):
@@ -36,7 +43,17 @@ class Article(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    status = db.Column(db.String(20), nullable=False, default='rascunho')  # 'rascunho', 'em_analise', 'homologado', 'arquivado'
+    # active_history: o status anterior é carregado ao alterar, para os contadores do painel (StatCounter)
+    status = column_property(db.Column(db.String(20), nullable=False, default='rascunho'), active_history=True)  # 'rascunho', 'em_analise', 'homologado', 'arquivado'
+    # Resumo em texto simples do conteúdo, mantido ao salvar (ver set_content), para
+    # que as listagens não precisem carregar nem interpretar o HTML
+    excerpt = db.Column(db.String(300), nullable=True)
+    # SHA-256 do conteúdo (também mantido por set_content), para saber se um
+    # salvamento alterou alguma coisa sem comparar o HTML inteiro
+    content_hash = db.Column(db.String(64), nullable=True)
+    # Último número de versão usado; incrementado atomicamente a cada versão
+    # salva (ver ArticleVersion.create_from_article)
+    version_counter = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -49,6 +66,16 @@ class Article(db.Model):
     # NOVO: campo "editor designado" (opcional)
     assigned_editor_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     
+    # Vetor de busca textual (PostgreSQL), mantido pelo trigger articles_search_vector_trigger
+    search_vector = db.deferred(db.Column(db.Text().with_variant(TSVECTOR(), 'postgresql'), nullable=True))
+    
+    __table_args__ = (
+        db.Index('ix_articles_search_vector', 'search_vector', postgresql_using='gin'),
+        # Chaves da paginação por cursor das listagens
+        db.Index('ix_articles_updated_at_id', 'updated_at', 'id'),
+        db.Index('ix_articles_status_updated_at_id', 'status', 'updated_at', 'id'),
+    )
+    
     # Relacionamentos
     tags = db.relationship('Tag', secondary=article_tags, backref=db.backref('articles', lazy='dynamic'))
     files = db.relationship('ArticleFile', backref='article', lazy=True)
@@ -62,6 +89,37 @@ class Article(db.Model):
     def __repr__(self):
         return f'<Article {self.title}>'
     
+    @validates('content')
+    def set_content(self, key, content):
+        """Atualiza o resumo e o hash sempre que o conteúdo muda."""
+        self.excerpt = make_excerpt(content)
+        self.content_hash = content_hash(content)
+        return content
+    
+    def version_fields_match(self, title, content, category_id, status):
+        """
+        Indica se os dados gravados nas versões (título, conteúdo, categoria e
+        status) são iguais aos do artigo, comparando o conteúdo pelo hash.
+        """
+        return (
+            title == self.title
+            and str(category_id) == str(self.category_id)
+            and status == self.status
+            and content_hash(content) == (self.content_hash or content_hash(self.content))
+        )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'title': self.title,
+            'status': self.status,
+            'excerpt': self.excerpt,
+            'category_id': self.category_id,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+    
     def is_viewable_by(self, user):
         """Verifica se o usuário pode visualizar o artigo."""
         if user.is_admin() or user.is_editor():
@@ -99,18 +157,58 @@ class Article(db.Model):
         """
         Salva uma nova versão do artigo atual.
         
+        A versão é gravada em um savepoint: se o número já existir (contador
+        atrás do histórico, ex.: versões incluídas direto no banco), o
+        contador é realinhado com o maior número gravado e a gravação é
+        repetida.
+        
         Args:
             user_id: ID do usuário que está criando a versão
             
         Returns:
-            Nova instância de ArticleVersion
+            Nova instância de ArticleVersion (já com id)
         """
-        version = ArticleVersion.create_from_article(self, user_id)
-        db.session.add(version)
-        return version
+        for attempt in range(VERSION_SAVE_ATTEMPTS):
+            try:
+                with db.session.begin_nested():
+                    version = ArticleVersion.create_from_article(self, user_id)
+                    db.session.add(version)
+                return version
+            except IntegrityError:
+                if attempt == VERSION_SAVE_ATTEMPTS - 1:
+                    raise
+                ArticleVersion.resync_counter(self)
+
+# Mantém o search_vector em bancos criados via db.create_all() (as migrações
+# criam a mesma função/trigger em bancos existentes)
+db.event.listen(
+    Article.__table__,
+    'after_create',
+    db.DDL("""
+CREATE OR REPLACE FUNCTION articles_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('portuguese', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('portuguese', coalesce(NEW.content, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER articles_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, content ON articles
+    FOR EACH ROW EXECUTE PROCEDURE articles_search_vector_update();
+""").execute_if(dialect='postgresql')
+)
 
 class ArticleHistory(db.Model):
     __tablename__ = 'article_history'
+    __table_args__ = (
+        # Entradas mais recentes de um artigo (página do artigo)
+        db.Index('ix_article_history_article_id_timestamp_id', 'article_id', 'timestamp', 'id'),
+        # Entradas de uma versão (remoção de versões pela política de retenção)
+        db.Index('ix_article_history_version_id', 'version_id'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     article_id = db.Column(db.Integer, db.ForeignKey('articles.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
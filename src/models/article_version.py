@@ -1,5 +1,8 @@
 from datetime import datetime
+from flask import current_app
+from sqlalchemy.orm.attributes import set_committed_value
 from src.models.user import db
+from src.services.deltas import make_delta, apply_delta, chain_is_full, delta_pays_off
 
 class ArticleVersion(db.Model):
     __tablename__ = 'article_versions'
@@ -8,37 +11,151 @@ class ArticleVersion(db.Model):
     article_id = db.Column(db.Integer, db.ForeignKey('articles.id'), nullable=False)
     version_number = db.Column(db.Integer, nullable=False)
     title = db.Column(db.String(255), nullable=False)
-    content = db.Column(db.Text, nullable=False)
+    # O conteúdo é gravado completo apenas nas versões-chave; as demais guardam
+    # um delta (comprimido) em relação à versão base_version_id. Use a
+    # propriedade ``content``, que reconstrói o texto quando necessário
+    stored_content = db.Column('content', db.Text, nullable=True)
+    delta = db.Column(db.LargeBinary, nullable=True)
+    # SHA-256 do conteúdo completo (o mesmo de Article.content_hash)
+    content_hash = db.Column(db.String(64), nullable=True)
+    base_version_id = db.Column(db.Integer, db.ForeignKey('article_versions.id'), nullable=True, index=True)
     status = db.Column(db.String(50), nullable=False)
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        # Também atende à busca da versão mais recente de um artigo
+        db.UniqueConstraint('article_id', 'version_number', name='uq_article_versions_article_id_version_number'),
+    )
+    
     # Relacionamentos
     article = db.relationship('Article', back_populates='versions')
     category = db.relationship('Category')
     creator = db.relationship('User', foreign_keys=[created_by])
+    base = db.relationship('ArticleVersion', remote_side=[id])
     
     def __repr__(self):
         return f'<ArticleVersion {self.id} - v{self.version_number}>'
 
+    @property
+    def is_keyframe(self):
+        return self.stored_content is not None
+
+    @property
+    def content(self):
+        return self.reconstruct()[0]
+
+    @content.setter
+    def content(self, content):
+        # Atribuição direta grava a versão completa
+        self.stored_content = content
+        self.delta = None
+        self.base_version_id = None
+        self._reconstructed = (content, 0)
+
+    def reconstruct(self):
+        """
+        Conteúdo desta versão e a quantidade de deltas aplicados para obtê-lo.
+
+        A cadeia até a versão completa é lida em uma única consulta recursiva
+        e o resultado fica guardado na instância.
+        """
+        cached = getattr(self, '_reconstructed', None)
+        if cached is not None:
+            return cached
+        if self.stored_content is not None:
+            self._reconstructed = (self.stored_content, 0)
+            return self._reconstructed
+
+        cls = type(self)
+        chain = db.select(
+            cls.id, cls.base_version_id, cls.stored_content, cls.delta, db.literal(1).label('depth')
+        ).where(cls.id == self.base_version_id).cte('chain', recursive=True)
+        chain = chain.union_all(
+            db.select(cls.id, cls.base_version_id, cls.stored_content, cls.delta, chain.c.depth + 1)
+            .where(cls.id == chain.c.base_version_id)
+        )
+        # Da base imediata até a versão completa: (conteúdo completo, delta).
+        # Sem ORDER BY o banco pode devolver as linhas em qualquer ordem
+        rows = db.session.execute(
+            db.select(chain.c[2], chain.c[3]).order_by(chain.c.depth)
+        ).all()
+        if not rows or rows[-1][0] is None:
+            raise ValueError(f'Cadeia de deltas incompleta na versão {self.id}')
+
+        content = rows[-1][0]
+        for _, delta in reversed(rows[:-1]):
+            content = apply_delta(content, delta)
+        content = apply_delta(content, self.delta)
+        self._reconstructed = (content, len(rows))
+        return self._reconstructed
+
+    def encode_content(self, content, previous=None, interval=None):
+        """
+        Grava ``content`` como delta em relação a ``previous`` ou, se a cadeia
+        já tiver ``interval`` versões (VERSION_KEYFRAME_INTERVAL) ou o delta
+        não compensar, como versão completa.
+        """
+        if previous is not None and previous.id is not None:
+            if interval is None:
+                interval = current_app.config['VERSION_KEYFRAME_INTERVAL']
+            base_content, depth = previous.reconstruct()
+            if not chain_is_full(depth, interval):
+                delta = make_delta(base_content, content)
+                if delta_pays_off(len(delta), len(content.encode('utf-8'))):
+                    self.stored_content = None
+                    self.delta = delta
+                    self.base_version_id = previous.id
+                    self._reconstructed = (content, depth + 1)
+                    return
+        self.content = content
+
 
     @classmethod
     def create_from_article(cls, article, user_id):
         """
         Cria uma nova versão com base no artigo atual.
         """
-        # Determinar o próximo número de versão
-        next_version = 1
-        if article.versions:
-            next_version = max([v.version_number for v in article.versions]) + 1
+        # Próximo número: incremento atômico do contador do artigo (a linha do
+        # artigo fica bloqueada até o commit, então saves simultâneos do mesmo
+        # artigo recebem números diferentes)
+        articles = article.__table__
+        next_version = db.session.execute(
+            articles.update()
+            .where(articles.c.id == article.id)
+            # updated_at repetido para não disparar o onupdate da coluna
+            .values(version_counter=articles.c.version_counter + 1, updated_at=articles.c.updated_at)
+            .returning(articles.c.version_counter)
+        ).scalar_one()
+        set_committed_value(article, 'version_counter', next_version)
+
+        # Versão mais recente (pelo índice único), base do delta
+        previous = cls.query.filter_by(article_id=article.id).order_by(cls.version_number.desc()).first()
 
-        return cls(
+        version = cls(
             article_id=article.id,
             version_number=next_version,
             title=article.title,
-            content=article.content,
             status=article.status,
             category_id=article.category_id,
+            content_hash=article.content_hash,
             created_by=user_id
-        )
\ No newline at end of file
+        )
+        version.encode_content(article.content, previous)
+        return version
+
+    @classmethod
+    def resync_counter(cls, article):
+        """Realinha o contador do artigo com o maior número de versão gravado."""
+        articles = article.__table__
+        latest = db.select(db.func.coalesce(db.func.max(cls.version_number), 0)).where(
+            cls.article_id == article.id
+        ).scalar_subquery()
+        counter = db.session.execute(
+            articles.update()
+            .where(articles.c.id == article.id)
+            .values(version_counter=latest, updated_at=articles.c.updated_at)
+            .returning(articles.c.version_counter)
+        ).scalar_one()
+        set_committed_value(article, 'version_counter', counter)
@@ -6,7 +6,7 @@ class File(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(255), nullable=False)
     original_filename = db.Column(db.String(255), nullable=False)
-    file_path = db.Column(db.String(512), nullable=True)  # Caminho opcional, usado quando o arquivo está no sistema de arquivos
+    file_path = db.Column(db.String(512), nullable=True)  # Caminho opcional (relativo a UPLOAD_FOLDER), usado quando o arquivo está no sistema de arquivos
     file_type = db.Column(db.String(50), nullable=False)  # 'pdf', 'zip', 'image', etc.
     file_size = db.Column(db.Integer, nullable=False)  # tamanho em bytes
     mime_type = db.Column(db.String(100), nullable=False)
@@ -14,15 +14,44 @@ class File(db.Model):
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     uploaded_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
-    # Novo campo para armazenar o conteúdo do arquivo diretamente no banco de dados
-    file_content = db.Column(db.LargeBinary, nullable=True)
+    # Conteúdo legado armazenado em uma única coluna. Arquivos no banco agora são
+    # gravados em pedaços (FileChunk); a coluna é adiada (deferred) para que
+    # listagens e relacionamentos nunca tragam os bytes.
+    file_content = db.deferred(db.Column(db.LargeBinary, nullable=True))
     
     # Flag para indicar se o arquivo está armazenado no banco de dados ou no sistema de arquivos
     stored_in_db = db.Column(db.Boolean, default=False)
     
+    # SHA-256 do conteúdo; no sistema de arquivos também define o caminho do blob
+    # (envios idênticos compartilham o mesmo blob)
+    content_hash = db.Column(db.String(64), nullable=True, index=True)
+    
+    # Miniatura (JPEG no repositório de blobs) gerada em segundo plano para imagens
+    # e PDFs: thumbnail_status é 'pending', 'ready' ou 'failed' (nulo se não se aplica)
+    thumbnail_hash = db.Column(db.String(64), nullable=True)
+    thumbnail_status = db.Column(db.String(20), nullable=True)
+    
+    # Chave da paginação por cursor da listagem de arquivos
+    __table_args__ = (
+        db.Index('ix_files_uploaded_at_id', 'uploaded_at', 'id'),
+    )
+    
     def __repr__(self):
         return f'<File {self.original_filename}>'
     
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'original_filename': self.original_filename,
+            'file_type': self.file_type,
+            'mime_type': self.mime_type,
+            'file_size': self.file_size,
+            'description': self.description,
+            'uploaded_by': self.uploaded_by,
+            'uploaded_at': self.uploaded_at.isoformat() if self.uploaded_at else None,
+            'has_thumbnail': self.has_thumbnail
+        }
+    
     @property
     def is_image(self):
         return self.file_type.startswith('image/')
@@ -35,11 +64,61 @@ class File(db.Model):
     def is_zip(self):
         return self.file_type == 'application/zip'
     
+    @property
+    def has_thumbnail(self):
+        return self.thumbnail_status == 'ready'
+    
     @property
     def storage_location(self):
         """Retorna a localização de armazenamento do arquivo"""
         return "Banco de Dados" if self.stored_in_db else "Sistema de Arquivos"
 
+class FileChunk(db.Model):
+    """
+    Pedaço de tamanho fixo do conteúdo de um arquivo armazenado no banco.
+    Os downloads leem um pedaço por vez, sem carregar o arquivo inteiro em memória.
+    """
+    __tablename__ = 'file_chunks'
+    file_id = db.Column(db.Integer, db.ForeignKey('files.id'), primary_key=True)
+    seq = db.Column(db.Integer, primary_key=True, autoincrement=False)  # ordem do pedaço, a partir de 0
+    data = db.Column(db.LargeBinary, nullable=False)
+    
+    def __repr__(self):
+        return f'<FileChunk {self.file_id}#{self.seq}>'
+
+class UploadSession(db.Model):
+    """
+    Envio retomável: o cliente cria a sessão, envia pedaços numerados (em
+    ``UPLOAD_FOLDER/sessions/<id>``) e a finaliza, quando os pedaços são
+    juntados em um ``File``. Sessões concluídas ou expiradas são removidas por
+    ``flask files gc-uploads``.
+    """
+    __tablename__ = 'upload_sessions'
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 em hexadecimal
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    original_filename = db.Column(db.String(255), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    article_id = db.Column(db.Integer, db.ForeignKey('articles.id'), nullable=True)
+    reference_text = db.Column(db.Text, nullable=True)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    chunk_size = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    file_id = db.Column(db.Integer, db.ForeignKey('files.id'), nullable=True)  # arquivo gerado ao finalizar
+
+    @property
+    def total_chunks(self):
+        return max(1, -(-self.total_size // self.chunk_size))
+
+    def expected_chunk_size(self, number):
+        """Tamanho esperado do pedaço ``number`` (o último pode ser menor)."""
+        if number < self.total_chunks - 1:
+            return self.chunk_size
+        return self.total_size - self.chunk_size * (self.total_chunks - 1)
+
+    def __repr__(self):
+        return f'<UploadSession {self.id}>'
+
 class ArticleFile(db.Model):
     __tablename__ = 'article_files'
     id = db.Column(db.Integer, primary_key=True)
@@ -0,0 +1,121 @@
+from flask import g, has_request_context
+from sqlalchemy import inspect
+from src.models.user import db, User
+from src.models.article import Article, Category, Tag
+
+# Status possíveis de um artigo (um contador para cada)
+ARTICLE_STATUSES = ('rascunho', 'em_analise', 'homologado', 'arquivado')
+
+# Contadores mantidos para cada modelo: nome -> classe
+COUNTED_MODELS = {
+    'users': User,
+    'articles': Article,
+    'categories': Category,
+    'tags': Tag,
+}
+
+
+# Carimbos de versão dos caches por worker (ver src/services/cache.py)
+# Categorias e tags
+REFERENCE_DATA_VERSION = 'version:reference_data'
+
+
+def principal_version(user_id):
+    """Carimbo de um usuário (ver src/services/principals.py)."""
+    return f'version:principal:{user_id}'
+
+
+def article_status_counter(status):
+    return f'articles:{status}'
+
+
+class StatCounter(db.Model):
+    """
+    Contadores do painel administrativo (total de usuários, artigos por status...).
+
+    São atualizados na mesma transação que cria, exclui ou muda o status dos
+    registros (ver ``update_counters``), então o painel lê uma linha por
+    contador em vez de contar as tabelas. ``flask stats reconcile`` recalcula
+    os valores e corrige qualquer divergência (ex.: alterações feitas
+    diretamente no banco).
+    """
+    __tablename__ = 'stat_counters'
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<StatCounter {self.name}={self.value}>'
+
+
+def bump_version(connection, name):
+    """
+    Incrementa o carimbo de versão ``name`` na transação de ``connection``,
+    criando-o se ainda não existir.
+    """
+    table = StatCounter.__table__
+    updated = connection.execute(
+        table.update().where(table.c.name == name).values(value=table.c.value + 1)
+    ).rowcount
+    if not updated:
+        connection.execute(table.insert().values(name=name, value=1))
+    if has_request_context():
+        g.pop('cache_versions', None)
+
+
+def _original_status(article):
+    """Status do artigo antes das alterações pendentes na sessão."""
+    history = inspect(article).attrs.status.history
+    if history.deleted:
+        return history.deleted[0]
+    return article.status
+
+
+@db.event.listens_for(db.session, 'after_flush')
+def update_counters(session, flush_context):
+    """
+    Aplica aos contadores as inclusões, exclusões e mudanças de status do
+    flush e incrementa a versão dos dados de referência quando categorias ou
+    tags mudam.
+    """
+    deltas = {}
+
+    def add(name, delta):
+        deltas[name] = deltas.get(name, 0) + delta
+
+    for obj in session.new:
+        for name, model in COUNTED_MODELS.items():
+            if isinstance(obj, model):
+                add(name, 1)
+        if isinstance(obj, Article):
+            add(article_status_counter(obj.status), 1)
+
+    for obj in session.deleted:
+        for name, model in COUNTED_MODELS.items():
+            if isinstance(obj, model):
+                add(name, -1)
+        if isinstance(obj, Article):
+            add(article_status_counter(_original_status(obj)), -1)
+
+    for obj in session.dirty:
+        if isinstance(obj, Article) and obj not in session.deleted:
+            history = inspect(obj).attrs.status.history
+            if history.deleted and history.added and history.deleted[0] != history.added[0]:
+                add(article_status_counter(history.deleted[0]), -1)
+                add(article_status_counter(history.added[0]), 1)
+
+    # Ordem fixa das atualizações, para que transações simultâneas travem as
+    # linhas dos contadores sempre na mesma sequência
+    for name in sorted(deltas):
+        if deltas[name]:
+            session.connection().execute(
+                StatCounter.__table__.update()
+                .where(StatCounter.name == name)
+                .values(value=StatCounter.value + deltas[name])
+            )
+
+    reference_changed = any(
+        isinstance(obj, (Category, Tag)) and (obj not in session.dirty or session.is_modified(obj, include_collections=False))
+        for obj in (*session.new, *session.deleted, *session.dirty)
+    )
+    if reference_changed:
+        bump_version(session.connection(), REFERENCE_DATA_VERSION)
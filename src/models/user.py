@@ -1,7 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 from flask_login import UserMixin
+from src.services.passwords import hash_password, verify_password, needs_rehash
 
 # instância única do SQLAlchemy
 db = SQLAlchemy()
@@ -24,11 +24,17 @@ class User(UserMixin, db.Model):
     articles_updated = db.relationship('Article', backref='updater', lazy=True, foreign_keys='Article.updated_by')
     files_uploaded = db.relationship('File', backref='uploader', lazy=True)
     
-    def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+    def set_password(self, password, wait=False):
+        # Levanta PasswordHashBusy se a fila de hashes estiver cheia (ou
+        # espera por uma vaga com wait, fora das requisições)
+        self.password_hash = hash_password(password, wait=wait)
         
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        # Hash gravado com método/custo diferente de PASSWORD_HASH_METHOD
+        return needs_rehash(self.password_hash)
     
     def is_admin(self):
         return self.role == 'admin'
@@ -39,6 +45,18 @@ class User(UserMixin, db.Model):
     def __repr__(self):
         return f'<User {self.username}>'
     
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'username': self.username,
+            'email': self.email,
+            'full_name': self.full_name,
+            'role': self.role,
+            'active': self.active,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'last_login': self.last_login.isoformat() if self.last_login else None
+        }
+    
     @property
     def is_active(self):
         # UserMixin also provides default is_active, but override to use 'active' flag
@@ -1,7 +1,14 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
+from sqlalchemy.orm import defer, joinedload
 from src.models.user import User, db
 from src.models.article import Category, Tag, Article
+from src.models.stats import ARTICLE_STATUSES, article_status_counter
+from src.services.stats import get_counters
+from src.services.cache import cache_stats
+from src.services.passwords import password_stats, PasswordHashBusy, BUSY_MESSAGE
+from src.services.user_import import ImportFormatError, parse_rows, import_users, summarize
+from src.services.pagination import paginate_keyset, first_pages_by_group, get_page_size
 import json
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
@@ -17,21 +24,29 @@ def check_admin():
 @admin_bp.route('/')
 @login_required
 def dashboard():
-    # Estatísticas
-    total_users = User.query.count()
-    total_articles = Article.query.count()
-    total_categories = Category.query.count()
-    total_tags = Tag.query.count()
+    # Estatísticas: contadores mantidos a cada alteração (ver StatCounter),
+    # lidos em uma consulta pela chave primária em vez de contar as tabelas
+    counters = get_counters()
+    total_users = counters['users']
+    total_articles = counters['articles']
+    total_categories = counters['categories']
+    total_tags = counters['tags']
     
     # Artigos por status
-    articles_by_status = db.session.query(
-        Article.status, db.func.count(Article.id)
-    ).group_by(Article.status).all()
-    
-    status_data = {status: count for status, count in articles_by_status}
+    status_data = {
+        status: counters[article_status_counter(status)]
+        for status in ARTICLE_STATUSES
+        if counters[article_status_counter(status)]
+    }
     
-    # Artigos recentes
-    recent_articles = Article.query.order_by(Article.created_at.desc()).limit(5).all()
+    # Artigos recentes (sem o conteúdo HTML, que o painel não exibe)
+    recent_articles = (
+        Article.query
+        .options(defer(Article.content), joinedload(Article.creator))
+        .order_by(Article.created_at.desc())
+        .limit(5)
+        .all()
+    )
     
     return render_template(
         'admin/dashboard.html',
@@ -43,12 +58,38 @@ def dashboard():
         recent_articles=recent_articles
     )
 
+# Estatísticas dos caches em memória (acertos/falhas deste worker)
+@admin_bp.route('/cache-stats')
+@login_required
+def cache_stats_view():
+    return jsonify(cache_stats())
+
+# Métricas do pool de hashes de senha (fila, espera e tempo de cálculo deste worker)
+@admin_bp.route('/password-stats')
+@login_required
+def password_stats_view():
+    return jsonify(password_stats())
+
 # Gerenciar usuários
 @admin_bp.route('/users')
 @login_required
 def list_users():
-    users = User.query.all()
-    return render_template('admin/users.html', users=users)
+    page = paginate_keyset(
+        User.query,
+        [User.id],
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        per_page=get_page_size(),
+        descending=False
+    )
+    
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return jsonify({
+            'users': [user.to_dict() for user in page.items],
+            **page.to_dict()
+        })
+    
+    return render_template('admin/users.html', users=page.items, page=page)
 
 # Criar usuário
 @admin_bp.route('/users/create', methods=['GET', 'POST'])
@@ -94,7 +135,11 @@ def create_user():
             role=role,
             active=active
         )
-        new_user.set_password(password)
+        try:
+            new_user.set_password(password)
+        except PasswordHashBusy:
+            flash(BUSY_MESSAGE, 'warning')
+            return render_template('admin/create_user.html', form=request.form), 503
 
         # 3) Commit
         db.session.add(new_user)
@@ -107,6 +152,48 @@ def create_user():
     return render_template('admin/create_user.html')
 
 
+# Cadastrar usuários em lote (arquivo CSV ou JSON)
+@admin_bp.route('/users/import', methods=['GET', 'POST'])
+@login_required
+def import_users_view():
+    if request.method == 'GET':
+        return render_template('admin/import_users.html')
+
+    dry_run = request.form.get('dry_run') == 'on' or request.args.get('dry_run') == '1'
+    wants_json = request.is_json or request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    try:
+        if request.is_json:
+            rows = parse_rows(request.get_data(), fmt='json')
+        else:
+            upload = request.files.get('file')
+            if not upload or not upload.filename:
+                raise ImportFormatError('Selecione um arquivo CSV ou JSON.')
+            rows = parse_rows(upload.read(), filename=upload.filename)
+        report = import_users(rows, dry_run=dry_run)
+    except ImportFormatError as e:
+        if wants_json:
+            return jsonify({'error': str(e)}), 400
+        flash(str(e), 'danger')
+        return render_template('admin/import_users.html'), 400
+    except PasswordHashBusy:
+        db.session.rollback()
+        if wants_json:
+            return jsonify({'error': BUSY_MESSAGE}), 503
+        flash(BUSY_MESSAGE, 'warning')
+        return render_template('admin/import_users.html'), 503
+
+    summary = summarize(report)
+    if wants_json:
+        return jsonify({'summary': summary, 'dry_run': dry_run, 'rows': report})
+
+    if dry_run:
+        flash(f'{summary.get("valid", 0)} usuário(s) válido(s), {summary.get("error", 0)} linha(s) com erro. Nada foi gravado.', 'info')
+    else:
+        flash(f'{summary.get("created", 0)} usuário(s) criado(s), {summary.get("error", 0)} linha(s) com erro.',
+              'success' if summary.get('created') else 'warning')
+    return render_template('admin/import_users.html', report=report, summary=summary, dry_run=dry_run)
+
+
 @admin_bp.route('/users/<int:user_id>/edit', methods=['GET', 'POST'])
 @login_required
 def update_user(user_id):
@@ -159,7 +246,13 @@ def update_user(user_id):
         user.active = active
 
         if password:
-            user.set_password(password)
+            try:
+                user.set_password(password)
+            except PasswordHashBusy:
+                # Nenhuma das alterações acima é gravada
+                db.session.rollback()
+                flash(BUSY_MESSAGE, 'warning')
+                return render_template('admin/edit_user.html', user=user), 503
             flash('Senha atualizada.', 'info')
         # Senão: mantém o password_hash atual
 
@@ -375,17 +468,51 @@ def delete_tag(tag_id):
 @admin_bp.route('/articles')
 @login_required
 def list_pending_articles():
-    draft_articles = Article.query.filter_by(status='rascunho').order_by(Article.updated_at.desc()).all()
-    review_articles = Article.query.filter_by(status='em_analise').order_by(Article.updated_at.desc()).all()
-    approved_articles = Article.query.filter_by(status='homologado').order_by(Article.updated_at.desc()).all()
-    archived_articles = Article.query.filter_by(status='arquivado').order_by(Article.updated_at.desc()).all()
+    # A primeira página e o total de cada status vêm de uma única consulta
+    # (funções de janela); só as abas navegadas por cursor (ex.:
+    # ?rascunho_after=...) são consultadas à parte. Categoria e autor exibidos
+    # nas tabelas vêm na mesma consulta, sem o conteúdo HTML
+    per_page = get_page_size()
+    statuses = ('rascunho', 'em_analise', 'homologado', 'arquivado')
+    keys = [Article.updated_at, Article.id]
+    load_options = (
+        defer(Article.content),
+        joinedload(Article.category),
+        joinedload(Article.creator)
+    )
+    pages = first_pages_by_group(Article.query, Article.status, statuses, keys,
+                                 per_page=per_page, options=load_options)
+    for status in statuses:
+        after = request.args.get(f'{status}_after')
+        before = request.args.get(f'{status}_before')
+        if after or before:
+            page = paginate_keyset(
+                Article.query.filter_by(status=status).options(*load_options),
+                keys,
+                after=after,
+                before=before,
+                per_page=per_page
+            )
+            page.total = pages[status].total
+            pages[status] = page
+    
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return jsonify({
+            status: {
+                'articles': [article.to_dict() for article in page.items],
+                **page.to_dict()
+            }
+            for status, page in pages.items()
+        })
     
     return render_template(
         'admin/articles.html',
-        draft_articles=draft_articles,
-        review_articles=review_articles,
-        approved_articles=approved_articles,
-        archived_articles=archived_articles
+        draft_articles=pages['rascunho'].items,
+        review_articles=pages['em_analise'].items,
+        approved_articles=pages['homologado'].items,
+        archived_articles=pages['arquivado'].items,
+        pages=pages,
+        active_tab=request.args.get('tab', 'draft')
     )
 
 # Alterar status de artigo
@@ -1,9 +1,17 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, abort, current_app, jsonify, send_file
 from flask_login import login_required, current_user
+from sqlalchemy.orm import defer, joinedload, selectinload
 from src.models.article import Article, ArticleHistory, Category, Tag
 from src.models.article_version import ArticleVersion
 from src.models.file import File, ArticleFile
 from src.models.user import db, User
+from src.services.search import apply_search, search_snippets
+from src.services.pagination import paginate_keyset, get_page_size
+from src.services.cache import get_categories, get_tags
+from src.services.text import content_hash
+from src.services.diff import version_diff
+from src.services.inline_images import extract_inline_images, link_to_article, not_extracted
+from src.services import thumbnails
 import os
 import uuid
 from werkzeug.utils import secure_filename
@@ -28,8 +36,15 @@ def list_articles():
     # Busca por texto
     search_query = request.args.get('q', '')
     
-    # Construir a query base
-    query = Article.query
+    # Construir a query base, já carregando o que os cartões exibem (categoria,
+    # autor e tags) em vez de uma consulta por artigo no template. O conteúdo
+    # HTML não é lido: os cartões usam o resumo (excerpt)
+    query = Article.query.options(
+        defer(Article.content),
+        joinedload(Article.category),
+        joinedload(Article.creator),
+        selectinload(Article.tags)
+    )
     
     # Aplicar filtros
     if status:
@@ -48,29 +63,48 @@ def list_articles():
     if tag_id:
         query = query.join(Article.tags).filter(Tag.id == tag_id)
     
-    # Busca por texto
+    # Busca por texto (tsvector no PostgreSQL, ILIKE nos demais bancos)
+    rank = None
     if search_query:
-        query = query.filter(
-            db.or_(
-                Article.title.ilike(f'%{search_query}%'),
-                Article.content.ilike(f'%{search_query}%')
-            )
-        )
+        query, rank = apply_search(query, search_query)
     
     # Usuários normais só veem artigos homologados
     if not current_user.is_editor():
         query = query.filter(Article.status == 'homologado')
     
-    # Ordenar por data de atualização
-    articles = query.order_by(Article.updated_at.desc()).all()
+    # Ordenar por relevância (quando houver busca) e data de atualização,
+    # paginando por cursor sobre a mesma chave
+    keys = [Article.updated_at, Article.id]
+    if rank is not None:
+        keys.insert(0, rank)
+    page = paginate_keyset(
+        query,
+        keys,
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        per_page=get_page_size()
+    )
+    articles = page.items
+    
+    # Requisições AJAX recebem a página em JSON
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return jsonify({
+            'articles': [article.to_dict() for article in articles],
+            **page.to_dict()
+        })
+    
+    # Trechos destacados com os termos buscados
+    snippets = search_snippets([a.id for a in articles], search_query) if search_query else {}
     
-    # Obter categorias e tags para os filtros
-    categories = Category.query.all()
-    tags = Tag.query.all()
+    # Obter categorias e tags para os filtros (cache validado pela versão no banco)
+    categories = get_categories()
+    tags = get_tags()
     
     return render_template(
         'articles/list.html',
         articles=articles,
+        page=page,
+        snippets=snippets,
         categories=categories,
         tags=tags,
         status=status,
@@ -90,11 +124,18 @@ def view_article(article_id):
         flash('Você não tem permissão para visualizar este artigo.', 'danger')
         return redirect(url_for('articles.list_articles'))
     
-    # Obter histórico
-    history = ArticleHistory.query.filter_by(article_id=article_id).order_by(ArticleHistory.timestamp.desc()).all()
+    # Obter histórico (apenas as entradas mais recentes; o restante fica na página de versões)
+    history = ArticleHistory.query.filter_by(article_id=article_id).options(
+        joinedload(ArticleHistory.user),
+        joinedload(ArticleHistory.version).load_only(ArticleVersion.id, ArticleVersion.version_number)
+    ).order_by(ArticleHistory.timestamp.desc(), ArticleHistory.id.desc()).limit(
+        current_app.config['HISTORY_PREVIEW_SIZE']
+    ).all()
     
-    # Obter arquivos associados
-    article_files = ArticleFile.query.filter_by(article_id=article_id).all()
+    # Obter arquivos associados (as imagens extraídas do conteúdo não são anexos)
+    article_files = ArticleFile.query.join(File).filter(
+        ArticleFile.article_id == article_id, not_extracted()
+    ).all()
     
     # Obter editores para atribuição (apenas para admins)
     editors = []
@@ -126,10 +167,13 @@ def create_article():
         # Validar dados
         if not title or not content or not category_id:
             flash('Por favor, preencha todos os campos obrigatórios.', 'danger')
-            categories = Category.query.all()
-            tags = Tag.query.all()
+            categories = get_categories()
+            tags = get_tags()
             return render_template('articles/edit.html', categories=categories, tags=tags)
         
+        # Imagens coladas no editor (base64) viram arquivos servidos por URL
+        content, images, image_ids = extract_inline_images(content, current_user.id)
+        
         # Criar artigo
         article = Article(
             title=title,
@@ -156,18 +200,21 @@ def create_article():
             new_status=status
         )
         db.session.add(history)
+        link_to_article(article.id, image_ids)
         
         # Salvar versão inicial
         version = article.save_version(current_user.id)
         history.version_id = version.id
         db.session.commit()
+        for image in images:
+            thumbnails.schedule(image)
         
         flash('Artigo criado com sucesso!', 'success')
         return redirect(url_for('articles.view_article', article_id=article.id))
     
     # GET: Exibir formulário
-    categories = Category.query.all()
-    tags = Tag.query.all()
+    categories = get_categories()
+    tags = get_tags()
     return render_template('articles/edit.html', categories=categories, tags=tags)
 
 @articles_bp.route('/<int:article_id>/edit', methods=['GET', 'POST'])
@@ -190,17 +237,30 @@ def edit_article(article_id):
         # Validar dados
         if not title or not content or not category_id:
             flash('Por favor, preencha todos os campos obrigatórios.', 'danger')
-            categories = Category.query.all()
-            tags = Tag.query.all()
+            categories = get_categories()
+            tags = get_tags()
             return render_template('articles/edit.html', article=article, categories=categories, tags=tags)
         
+        # Imagens coladas no editor (base64) viram arquivos servidos por URL;
+        # a mesma imagem reutiliza o mesmo arquivo, então o hash não muda
+        content, images, image_ids = extract_inline_images(content, current_user.id)
+        
+        # Salvar sem alterar nada (ex.: clicar em Salvar de novo) não gera
+        # versão nem histórico
+        version_changed = not article.version_fields_match(title, content, category_id, status)
+        tags_changed = {str(tag.id) for tag in article.tags} != set(tag_ids)
+        if not version_changed and not tags_changed:
+            flash('Nenhuma alteração para salvar.', 'info')
+            return redirect(url_for('articles.view_article', article_id=article.id))
+        
         # Verificar se houve mudança de status
         status_changed = article.status != status
         old_status = article.status
         
         # Atualizar artigo
         article.title = title
-        article.content = content
+        if content_hash(content) != article.content_hash:
+            article.content = content
         article.category_id = category_id
         article.status = status
         article.updated_by = current_user.id
@@ -226,18 +286,22 @@ def edit_article(article_id):
             new_status=status if status_changed else None
         )
         db.session.add(history)
+        link_to_article(article.id, image_ids)
         
-        # Salvar nova versão
-        version = article.save_version(current_user.id)
-        history.version_id = version.id
+        # Salvar nova versão (só as tags mudaram: a versão atual continua valendo)
+        if version_changed:
+            version = article.save_version(current_user.id)
+            history.version_id = version.id
         db.session.commit()
+        for image in images:
+            thumbnails.schedule(image)
         
         flash('Artigo atualizado com sucesso!', 'success')
         return redirect(url_for('articles.view_article', article_id=article.id))
     
     # GET: Exibir formulário
-    categories = Category.query.all()
-    tags = Tag.query.all()
+    categories = get_categories()
+    tags = get_tags()
     return render_template('articles/edit.html', article=article, categories=categories, tags=tags)
 
 @articles_bp.route('/<int:article_id>/versions')
@@ -250,13 +314,31 @@ def list_versions(article_id):
         flash('Você não tem permissão para visualizar versões anteriores deste artigo.', 'danger')
         return redirect(url_for('articles.view_article', article_id=article_id))
     
-    # Obter todas as versões
-    versions = ArticleVersion.query.filter_by(article_id=article_id).order_by(ArticleVersion.version_number.desc()).all()
+    # Obter as versões, da mais recente à mais antiga, paginadas por cursor
+    # A listagem não exibe o conteúdo (nem precisa reconstruí-lo)
+    page = paginate_keyset(
+        ArticleVersion.query.filter_by(article_id=article_id).options(
+            defer(ArticleVersion.stored_content),
+            defer(ArticleVersion.delta),
+            joinedload(ArticleVersion.creator)
+        ),
+        [ArticleVersion.version_number, ArticleVersion.id],
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        per_page=get_page_size()
+    )
+    
+    # Versão mais antiga do artigo (não tem anterior para comparar)
+    first_version_id = db.session.query(ArticleVersion.id).filter_by(article_id=article_id).order_by(
+        ArticleVersion.version_number
+    ).limit(1).scalar()
     
     return render_template(
         'articles/versions.html',
         article=article,
-        versions=versions
+        versions=page.items,
+        page=page,
+        first_version_id=first_version_id
     )
 
 @articles_bp.route('/<int:article_id>/versions/<int:version_id>')
@@ -280,6 +362,55 @@ def view_version(article_id, version_id):
         version=version
     )
 
+@articles_bp.route('/<int:article_id>/versions/diff')
+@login_required
+def diff_versions(article_id):
+    article = Article.query.get_or_404(article_id)
+    
+    # Verificar permissão
+    if not article.can_view_versions(current_user):
+        flash('Você não tem permissão para visualizar versões anteriores deste artigo.', 'danger')
+        return redirect(url_for('articles.view_article', article_id=article_id))
+    
+    # Versão nova (padrão: a mais recente) e versão antiga (padrão: a anterior a ela)
+    versions = ArticleVersion.query.filter_by(article_id=article_id)
+    new_id = request.args.get('b', type=int)
+    if new_id:
+        new_version = versions.filter_by(id=new_id).first_or_404()
+    else:
+        new_version = versions.order_by(ArticleVersion.version_number.desc()).first_or_404()
+    old_id = request.args.get('a', type=int)
+    if old_id:
+        old_version = versions.filter_by(id=old_id).first_or_404()
+    else:
+        old_version = versions.filter(
+            ArticleVersion.version_number < new_version.version_number
+        ).order_by(ArticleVersion.version_number.desc()).first()
+        if old_version is None:
+            flash('Esta é a primeira versão do artigo; não há versão anterior para comparar.', 'info')
+            return redirect(url_for('articles.list_versions', article_id=article_id))
+    
+    # Sempre da mais antiga para a mais nova (e a mesma chave no cache)
+    if old_version.version_number > new_version.version_number:
+        old_version, new_version = new_version, old_version
+    
+    mode = 'side' if request.args.get('mode') == 'side' else 'inline'
+    
+    # Versões para os seletores de comparação (sem o conteúdo)
+    all_versions = ArticleVersion.query.filter_by(article_id=article_id).with_entities(
+        ArticleVersion.id, ArticleVersion.version_number, ArticleVersion.created_at
+    ).order_by(ArticleVersion.version_number.desc()).all()
+    
+    return render_template(
+        'articles/version_diff.html',
+        article=article,
+        old_version=old_version,
+        new_version=new_version,
+        diff=version_diff(old_version, new_version),
+        mode=mode,
+        all_versions=all_versions
+    )
+
 @articles_bp.route('/<int:article_id>/assign', methods=['POST'])
 @login_required
 def assign_editor(article_id):
@@ -2,6 +2,8 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from src.models.user import User, db
+from src.services.login_tracker import record_login
+from src.services.passwords import PasswordHashBusy, BUSY_MESSAGE
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
@@ -18,7 +20,12 @@ def login():
         user = User.query.filter_by(username=username).first()
         
         # Verificar se o usuário existe e a senha está correta
-        if not user or not user.check_password(password):
+        try:
+            valid = user is not None and user.check_password(password)
+        except PasswordHashBusy:
+            flash(BUSY_MESSAGE, 'warning')
+            return render_template('auth/login.html'), 503
+        if not valid:
             flash('Usuário ou senha incorretos. Por favor, tente novamente.', 'danger')
             return render_template('auth/login.html')
             
@@ -27,12 +34,21 @@ def login():
             flash('Sua conta está desativada. Entre em contato com o administrador.', 'warning')
             return render_template('auth/login.html')
             
+        # Refazer o hash se PASSWORD_HASH_METHOD mudou (a senha em texto só
+        # está disponível aqui)
+        if user.password_needs_rehash():
+            try:
+                user.set_password(password)
+                db.session.commit()
+            except PasswordHashBusy:
+                pass  # fica para o próximo login
+        
         # Fazer login do usuário
         login_user(user, remember=remember)
         
-        # Atualizar data do último login
-        user.last_login = db.func.now()
-        db.session.commit()
+        # Atualizar data do último login (gravada depois, em lote, sem
+        # prender a resposta em uma transação de escrita)
+        record_login(user)
         
         # Redirecionar para a página solicitada ou para a página inicial
         next_page = request.args.get('next')
@@ -87,7 +103,11 @@ def register():
             role='user',  # Papel padrão
             active=True
         )
-        new_user.set_password(password)
+        try:
+            new_user.set_password(password)
+        except PasswordHashBusy:
+            flash(BUSY_MESSAGE, 'warning')
+            return render_template('auth/register.html'), 503
         
         db.session.add(new_user)
         db.session.commit()
@@ -101,6 +121,10 @@ def register():
 @login_required
 def profile():
     if request.method == 'POST':
+        # current_user guarda só os campos básicos em cache; as alterações são
+        # feitas no registro completo
+        user = current_user.user
+        
         full_name = request.form.get('full_name')
         email = request.form.get('email')
         current_password = request.form.get('current_password')
@@ -108,27 +132,32 @@ def profile():
         confirm_password = request.form.get('confirm_password')
         
         # Atualizar informações básicas
-        current_user.full_name = full_name
+        user.full_name = full_name
         
         # Verificar se o email está sendo alterado
-        if email != current_user.email:
-            user = User.query.filter_by(email=email).first()
-            if user:
+        if email != user.email:
+            other = User.query.filter_by(email=email).first()
+            if other:
                 flash('Email já está em uso.', 'danger')
                 return render_template('auth/profile.html')
-            current_user.email = email
+            user.email = email
             
         # Verificar se a senha está sendo alterada
         if current_password and new_password and confirm_password:
-            if not current_user.check_password(current_password):
-                flash('Senha atual incorreta.', 'danger')
-                return render_template('auth/profile.html')
-                
-            if new_password != confirm_password:
-                flash('As novas senhas não coincidem.', 'danger')
-                return render_template('auth/profile.html')
-                
-            current_user.set_password(new_password)
+            try:
+                if not user.check_password(current_password):
+                    flash('Senha atual incorreta.', 'danger')
+                    return render_template('auth/profile.html')
+                    
+                if new_password != confirm_password:
+                    flash('As novas senhas não coincidem.', 'danger')
+                    return render_template('auth/profile.html')
+                    
+                user.set_password(new_password)
+            except PasswordHashBusy:
+                db.session.rollback()
+                flash(BUSY_MESSAGE, 'warning')
+                return render_template('auth/profile.html'), 503
             flash('Senha alterada com sucesso.', 'success')
             
         db.session.commit()
@@ -4,11 +4,15 @@ from werkzeug.utils import secure_filename
 import os
 import uuid
 from datetime import datetime
-import io
 
-from src.models.file import File, ArticleFile
+from src.models.file import File, ArticleFile, UploadSession
 from src.models.article import Article
 from src.models.user import db
+from src.services.pagination import paginate_keyset, get_page_size
+from src.services.file_storage import get_storage, storage_for, apply_cache_policy
+from src.services.uploads import receive_upload
+from src.services import upload_sessions, thumbnails
+from src.services.inline_images import can_view, is_extracted, not_extracted
 
 files_bp = Blueprint('files', __name__, url_prefix='/files')
 
@@ -20,42 +24,40 @@ def allowed_file(filename):
 @files_bp.route('/')
 @login_required
 def list_files():
-    """Lista todos os arquivos"""
-    files = File.query.order_by(File.uploaded_at.desc()).all()
-    return render_template('files/list.html', files=files)
+    """Lista os arquivos, do mais recente ao mais antigo, paginados por cursor"""
+    # As imagens extraídas do conteúdo dos artigos seguem os artigos e não são listadas
+    page = paginate_keyset(
+        File.query.filter(not_extracted()),
+        [File.uploaded_at, File.id],
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        per_page=get_page_size()
+    )
+    
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return jsonify({
+            'files': [file.to_dict() for file in page.items],
+            **page.to_dict()
+        })
+    
+    return render_template('files/list.html', files=page.items, page=page)
 
 @files_bp.route('/<int:file_id>')
 @login_required
 def download_file(file_id):
     """Download de arquivo"""
     file = File.query.get_or_404(file_id)
+    if is_extracted(file) and not can_view(file, current_user):
+        abort(404)
     
-    # Se o arquivo está armazenado no banco de dados
-    if file.stored_in_db and file.file_content:
-        # Criar um objeto BytesIO a partir do conteúdo binário
-        file_data = io.BytesIO(file.file_content)
-        
-        # Enviar o arquivo como resposta
-        return send_file(
-            file_data,
-            mimetype=file.mime_type,
-            as_attachment=True,
-            download_name=file.original_filename
-        )
-    
-    # Se o arquivo está no sistema de arquivos
-    elif file.file_path and os.path.exists(file.file_path):
-        return send_file(
-            file.file_path,
-            mimetype=file.mime_type,
-            as_attachment=True,
-            download_name=file.original_filename
-        )
+    # Enviar pelo backend em que o arquivo está (banco em streaming ou disco via sendfile)
+    storage = storage_for(file)
+    if storage.exists(file):
+        return apply_cache_policy(storage.send(file, as_attachment=True), public=False)
     
     # Arquivo não encontrado
-    else:
-        flash('Arquivo não encontrado.', 'danger')
-        return redirect(url_for('files.list_files'))
+    flash('Arquivo não encontrado.', 'danger')
+    return redirect(url_for('files.list_files'))
 
 @files_bp.route('/upload', methods=['POST'])
 @login_required
@@ -86,55 +88,34 @@ def upload_file():
         
     # Gerar nome seguro para o arquivo
     original_filename = secure_filename(file.filename)
-    extension = original_filename.rsplit('.', 1)[1].lower()
-    filename = f"{uuid.uuid4().hex}.{extension}"
-    
-    # Determinar tipo de arquivo
-    file_type = file.content_type
-    
-    # Ler o conteúdo do arquivo
-    file_content = file.read()
-    file_size = len(file_content)
     
-    # Criar registro no banco de dados
-    new_file = File(
-        filename=filename,
-        original_filename=original_filename,
-        file_type=file_type,
-        file_size=file_size,
-        mime_type=file.content_type,
-        description=request.form.get('description', ''),
-        uploaded_by=current_user.id,
-        file_content=file_content,  # Armazenar conteúdo no banco
-        stored_in_db=True  # Marcar como armazenado no banco
-    )
-    
-    db.session.add(new_file)
-    db.session.commit()
+    # Receber o conteúdo em blocos num temporário (tamanho, SHA-256 e tipo
+    # identificado pelos primeiros bytes) e gravá-lo no backend configurado
+    with receive_upload(file.stream) as upload:
+        if upload.mime_type is None:
+            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                return jsonify({'success': False, 'error': 'Tipo de arquivo não permitido'})
+            flash('Tipo de arquivo não permitido', 'danger')
+            return redirect(url_for('files.list_files'))
+        
+        new_file = store_upload(upload, original_filename, request.form.get('description', ''))
+        db.session.commit()
+    thumbnails.schedule(new_file)
+    file_type = new_file.file_type
     
     # Verificar se o upload está associado a um artigo
     article_id = request.form.get('article_id')
-    if article_id:
-        article = Article.query.get(article_id)
-        if article and article.is_editable_by(current_user):
-            article_file = ArticleFile(
-                article_id=article_id,
-                file_id=new_file.id,
-                reference_text=request.form.get('reference_text', '')
-            )
-            db.session.add(article_file)
-            db.session.commit()
-            
-            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                return jsonify({
-                    'success': True,
-                    'file_id': new_file.id,
-                    'filename': original_filename,
-                    'file_type': file_type
-                })
-            
-            flash(f'Arquivo "{original_filename}" enviado e associado ao artigo com sucesso!', 'success')
-            return redirect(url_for('articles.edit_article', article_id=article_id))
+    if article_id and attach_to_article(new_file, article_id, request.form.get('reference_text', '')):
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            return jsonify({
+                'success': True,
+                'file_id': new_file.id,
+                'filename': original_filename,
+                'file_type': file_type
+            })
+        
+        flash(f'Arquivo "{original_filename}" enviado e associado ao artigo com sucesso!', 'success')
+        return redirect(url_for('articles.edit_article', article_id=article_id))
     
     # Se for uma requisição AJAX, retornar JSON
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -149,34 +130,218 @@ def upload_file():
     flash(f'Arquivo "{original_filename}" enviado com sucesso!', 'success')
     return redirect(url_for('files.list_files'))
 
+def store_upload(upload, original_filename, description):
+    """
+    Cria o registro de um arquivo recebido (ver ``receive_upload``) e grava o
+    conteúdo no backend configurado, sem confirmar a transação. O tipo já deve
+    ter sido identificado. Após o commit, ``thumbnails.schedule`` gera a
+    miniatura em segundo plano.
+    """
+    extension = original_filename.rsplit('.', 1)[1].lower()
+    new_file = File(
+        filename=f"{uuid.uuid4().hex}.{extension}",
+        original_filename=original_filename,
+        file_type=upload.mime_type,
+        file_size=upload.size,
+        mime_type=upload.mime_type,
+        description=description,
+        uploaded_by=current_user.id
+    )
+    
+    db.session.add(new_file)
+    db.session.flush()
+    
+    get_storage().save_upload(new_file, upload)
+    thumbnails.mark_pending(new_file)
+    return new_file
+
+def attach_to_article(file, article_id, reference_text):
+    """Associa o arquivo ao artigo, se o usuário puder editá-lo. Retorna o artigo ou None."""
+    article = Article.query.get(article_id)
+    if not article or not article.is_editable_by(current_user):
+        return None
+    
+    db.session.add(ArticleFile(
+        article_id=article.id,
+        file_id=file.id,
+        reference_text=reference_text
+    ))
+    db.session.commit()
+    return article
+
+# ---------------------------------------------------------------------------
+# Envio retomável em pedaços, para arquivos grandes em conexões instáveis:
+#   POST   /files/uploads                     cria a sessão
+#   PUT    /files/uploads/<id>/chunks/<n>     envia o pedaço n (corpo bruto)
+#   GET    /files/uploads/<id>                pedaços e intervalos recebidos
+#   POST   /files/uploads/<id>/complete       junta os pedaços em um arquivo
+#   DELETE /files/uploads/<id>                cancela a sessão
+# ---------------------------------------------------------------------------
+
+def get_upload_session_or_404(session_id):
+    """Sessão de envio do usuário atual (sessões de outros usuários são 404)."""
+    return UploadSession.query.filter_by(id=session_id, user_id=current_user.id).first_or_404()
+
+@files_bp.route('/uploads', methods=['POST'])
+@login_required
+def create_upload_session():
+    """Cria uma sessão de envio em pedaços"""
+    data = request.get_json(silent=True) or request.form
+    original_filename = secure_filename(data.get('filename', ''))
+    
+    if not original_filename or not allowed_file(original_filename):
+        return jsonify({'success': False, 'error': 'Tipo de arquivo não permitido'}), 400
+    
+    try:
+        total_size = int(data.get('total_size', 0))
+    except (TypeError, ValueError):
+        total_size = 0
+    if total_size <= 0:
+        return jsonify({'success': False, 'error': 'Tamanho do arquivo inválido'}), 400
+    if total_size > current_app.config['UPLOAD_SESSION_MAX_SIZE']:
+        return jsonify({'success': False, 'error': 'Arquivo maior que o limite permitido'}), 413
+    
+    try:
+        article_id = int(data.get('article_id') or 0) or None
+    except (TypeError, ValueError):
+        article_id = None
+    
+    upload_session = upload_sessions.create_session(
+        user_id=current_user.id,
+        original_filename=original_filename,
+        total_size=total_size,
+        description=data.get('description', ''),
+        article_id=article_id,
+        reference_text=data.get('reference_text', '')
+    )
+    return jsonify({'success': True, **upload_sessions.session_status(upload_session)}), 201
+
+@files_bp.route('/uploads/<session_id>', methods=['GET'])
+@login_required
+def upload_session_status(session_id):
+    """Pedaços já recebidos, para o cliente retomar o envio"""
+    upload_session = get_upload_session_or_404(session_id)
+    return jsonify({'success': True, **upload_sessions.session_status(upload_session)})
+
+@files_bp.route('/uploads/<session_id>/chunks/<int:number>', methods=['PUT'])
+@login_required
+def upload_chunk(session_id, number):
+    """Recebe um pedaço; reenviar o mesmo número substitui o anterior"""
+    upload_session = get_upload_session_or_404(session_id)
+    if upload_session.completed_at:
+        return jsonify({'success': False, 'error': 'Envio já finalizado'}), 409
+    
+    try:
+        size = upload_sessions.write_chunk(
+            upload_session, number, request.stream,
+            checksum=request.headers.get('X-Chunk-Checksum')
+        )
+    except upload_sessions.ChunkError as exc:
+        return jsonify({'success': False, 'error': str(exc)}), 400
+    
+    return jsonify({'success': True, 'chunk': number, 'size': size})
+
+@files_bp.route('/uploads/<session_id>/complete', methods=['POST'])
+@login_required
+def complete_upload_session(session_id):
+    """Junta os pedaços em um arquivo e o associa ao artigo, como em upload_file"""
+    # Trava a sessão para que duas finalizações simultâneas não criem dois arquivos
+    upload_session = (
+        UploadSession.query
+        .filter_by(id=session_id, user_id=current_user.id)
+        .with_for_update()
+        .first_or_404()
+    )
+    
+    # Finalização repetida (ex.: resposta perdida): devolve o mesmo arquivo
+    if upload_session.completed_at:
+        new_file = File.query.get_or_404(upload_session.file_id)
+        return jsonify({
+            'success': True,
+            'file_id': new_file.id,
+            'filename': new_file.original_filename,
+            'file_type': new_file.file_type
+        })
+    
+    status = upload_sessions.session_status(upload_session)
+    if status['missing']:
+        return jsonify({'success': False, 'error': 'Envio incompleto', **status}), 409
+    
+    reader = upload_sessions.ChunkSequenceReader(upload_session)
+    try:
+        with receive_upload(reader) as upload:
+            if upload.mime_type is None:
+                return jsonify({'success': False, 'error': 'Tipo de arquivo não permitido'}), 400
+            new_file = store_upload(upload, upload_session.original_filename, upload_session.description)
+            upload_session.file_id = new_file.id
+            upload_session.completed_at = datetime.utcnow()
+            db.session.commit()
+    finally:
+        reader.close()
+    
+    upload_sessions.discard_parts(upload_session)
+    thumbnails.schedule(new_file)
+    
+    if upload_session.article_id:
+        attach_to_article(new_file, upload_session.article_id, upload_session.reference_text)
+    
+    return jsonify({
+        'success': True,
+        'file_id': new_file.id,
+        'filename': new_file.original_filename,
+        'file_type': new_file.file_type
+    })
+
+@files_bp.route('/uploads/<session_id>', methods=['DELETE'])
+@login_required
+def cancel_upload_session(session_id):
+    """Cancela a sessão e descarta os pedaços recebidos"""
+    upload_session = get_upload_session_or_404(session_id)
+    upload_sessions.discard_parts(upload_session)
+    if not upload_session.completed_at:
+        db.session.delete(upload_session)
+        db.session.commit()
+    return jsonify({'success': True})
+
 @files_bp.route('/serve/<int:file_id>')
 def serve_file(file_id):
     """Serve um arquivo para visualização no navegador (não como download)"""
     file = File.query.get_or_404(file_id)
     
-    # Se o arquivo está armazenado no banco de dados
-    if file.stored_in_db and file.file_content:
-        # Criar um objeto BytesIO a partir do conteúdo binário
-        file_data = io.BytesIO(file.file_content)
-        
-        # Enviar o arquivo como resposta
-        return send_file(
-            file_data,
-            mimetype=file.mime_type,
-            as_attachment=False
-        )
+    # Imagens extraídas de artigos: só para quem pode ver o artigo, sem cache público
+    extracted = is_extracted(file)
+    if extracted and not can_view(file, current_user):
+        abort(404)
     
-    # Se o arquivo está no sistema de arquivos
-    elif file.file_path and os.path.exists(file.file_path):
-        return send_file(
-            file.file_path,
-            mimetype=file.mime_type,
-            as_attachment=False
-        )
+    # Validadores (ETag/Last-Modified) e Range permitem cache no navegador e busca em PDFs
+    storage = storage_for(file)
+    if storage.exists(file):
+        return apply_cache_policy(storage.send(file, as_attachment=False), public=not extracted)
     
     # Arquivo não encontrado
-    else:
+    abort(404)
+
+@files_bp.route('/thumb/<int:file_id>')
+def thumbnail(file_id):
+    """Miniatura do arquivo (imagem reduzida ou primeira página do PDF)"""
+    file = File.query.get_or_404(file_id)
+    extracted = is_extracted(file)
+    if extracted and not can_view(file, current_user):
+        abort(404)
+    
+    path = thumbnails.thumbnail_path(file)
+    if path is None:
         abort(404)
+    
+    # O conteúdo da miniatura só muda com o arquivo, então o ETag é o próprio hash
+    response = send_file(
+        path,
+        mimetype=thumbnails.THUMBNAIL_MIME_TYPE,
+        conditional=True,
+        etag=file.thumbnail_hash,
+        last_modified=file.uploaded_at
+    )
+    return apply_cache_policy(response, public=not extracted)
 
 @files_bp.route('/delete/<int:file_id>', methods=['POST'])
 @login_required
@@ -189,12 +354,18 @@ def delete_file(file_id):
         flash('Você não tem permissão para excluir este arquivo.', 'danger')
         return redirect(url_for('files.list_files'))
     
-    # Remover associações com artigos
+    # Imagens extraídas do conteúdo: excluí-las quebraria as imagens dos artigos
+    if is_extracted(file):
+        flash('Esta imagem faz parte do conteúdo de um artigo e não pode ser excluída.', 'danger')
+        return redirect(url_for('files.list_files'))
+    
+    # Remover associações com artigos e sessões de envio que geraram o arquivo
     ArticleFile.query.filter_by(file_id=file_id).delete()
+    UploadSession.query.filter_by(file_id=file_id).delete()
     
-    # Se o arquivo estiver no sistema de arquivos, excluí-lo
-    if not file.stored_in_db and file.file_path and os.path.exists(file.file_path):
-        os.remove(file.file_path)
+    # Remover o conteúdo (pedaços no banco ou blob no disco, se não for compartilhado)
+    storage_for(file).delete(file)
+    thumbnails.delete(file)
     
     # Excluir registro do banco
     db.session.delete(file)
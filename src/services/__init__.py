@@ -0,0 +1 @@
+"""Serviços de apoio às rotas (busca, armazenamento, caches, etc.)."""
@@ -0,0 +1,85 @@
+"""
+Migração dos arquivos armazenados no banco para o repositório em disco.
+
+Cada lote trava as linhas com ``FOR UPDATE SKIP LOCKED`` (PostgreSQL), então
+vários processos podem rodar em paralelo sem processar o mesmo arquivo. O
+estado fica na própria linha (``stored_in_db``) e cada lote é confirmado
+separadamente, de modo que uma execução interrompida continua de onde parou.
+"""
+from src.models.file import File
+from src.models.user import db
+from src.services.file_storage import get_storage, DatabaseStorage
+
+
+class BatchResult:
+    """Resumo de um lote migrado."""
+
+    def __init__(self):
+        self.migrated = 0
+        self.bytes = 0
+        self.failed = []  # lista de (file_id, motivo)
+        self.last_id = None
+
+    @property
+    def processed(self):
+        return self.migrated + len(self.failed)
+
+
+def pending_count():
+    """Quantidade de arquivos ainda armazenados no banco."""
+    return File.query.filter(File.stored_in_db.is_(True)).count()
+
+
+def migrate_batch(batch_size, after_id=0, target='filesystem'):
+    """
+    Move até ``batch_size`` arquivos (com ``id > after_id``) do banco para o
+    backend ``target``.
+
+    Para cada arquivo: copia os pedaços para o blob calculando o SHA-256,
+    confere tamanho e hash (com o ``content_hash`` gravado, se houver, e
+    relendo o blob do disco), aponta o registro para o blob, limpa
+    ``file_content`` e remove os pedaços. Arquivos que falham permanecem no
+    banco e são informados em ``BatchResult.failed``.
+    """
+    source = DatabaseStorage()
+    destination = get_storage(target)
+    result = BatchResult()
+
+    files = (
+        File.query
+        .filter(File.stored_in_db.is_(True), File.id > after_id)
+        .order_by(File.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+    for file in files:
+        result.last_id = file.id
+        try:
+            content_hash, size = destination.write_blob(source.open(file))
+        except OSError as exc:
+            result.failed.append((file.id, f'erro de E/S: {exc}'))
+            continue
+
+        if size != file.file_size:
+            result.failed.append((file.id, f'tamanho divergente ({size} != {file.file_size})'))
+            continue
+        if file.content_hash and file.content_hash != content_hash:
+            result.failed.append((file.id, 'checksum divergente do registrado'))
+            continue
+        if not destination.verify(content_hash):
+            result.failed.append((file.id, 'checksum do blob gravado não confere'))
+            continue
+
+        file.file_path = destination.blob_key(content_hash)
+        file.content_hash = content_hash
+        file.file_content = None
+        file.stored_in_db = False
+        source.delete(file)
+
+        result.migrated += 1
+        result.bytes += size
+
+    db.session.commit()
+    return result
@@ -0,0 +1,238 @@
+"""
+Caches em memória por processo, validados por um carimbo de versão no banco.
+
+Cada cache guarda o valor carregado junto com a versão lida de um contador
+(``StatCounter``) que é incrementado na mesma transação de qualquer alteração
+dos dados. Antes de usar o valor, o cache relê o contador (uma leitura pela
+chave primária, no máximo uma vez por requisição para cada carimbo e junto
+com os carimbos de ``SHARED_VERSIONS``); se outro worker
+alterou os dados, a versão mudou e o valor é recarregado. Assim todos os
+workers enxergam a alteração já na requisição seguinte ao commit.
+
+``TTLCache`` guarda valores por chave por um tempo curto, invalidados
+localmente quando alterados; com um carimbo de versão (ex.: o usuário logado)
+também são recarregados assim que outro worker altera os dados.
+``LRUCache`` guarda resultados que nunca mudam (ex.: diferenças entre duas
+versões), limitado por tamanho.
+
+Os valores devem ser objetos simples e imutáveis (não instâncias do ORM, que
+pertencem à sessão de uma requisição).
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import g, has_request_context
+
+from src.models.article import Category, Tag
+from src.models.stats import StatCounter, REFERENCE_DATA_VERSION
+from src.models.user import db
+
+# Registro de todos os caches, para a rota de estatísticas
+CACHES = {}
+
+
+# Carimbos lidos junto com qualquer outro: a primeira leitura da requisição
+# (normalmente a do usuário logado) já traz os das páginas com categorias e tags
+SHARED_VERSIONS = (REFERENCE_DATA_VERSION,)
+
+
+def read_version(name):
+    """
+    Versão atual do carimbo ``name``, memorizada durante a requisição (uma
+    alteração na própria requisição descarta a memória, ver ``bump_version``).
+    """
+    versions = g.setdefault('cache_versions', {}) if has_request_context() else {}
+    if name not in versions:
+        names = {name, *SHARED_VERSIONS} - versions.keys()
+        found = dict(db.session.query(StatCounter.name, StatCounter.value).filter(StatCounter.name.in_(names)))
+        for missing in names:
+            versions[missing] = found.get(missing) or 0
+    return versions[name]
+
+
+class VersionedCache:
+    """Valor carregado por ``loader`` e reaproveitado enquanto a versão não muda."""
+
+    def __init__(self, name, version_key, loader):
+        self.name = name
+        self.version_key = version_key
+        self.loader = loader
+        self.value = None
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        CACHES[name] = self
+
+    def get(self):
+        # A versão é lida antes dos dados: se mudar durante a carga, o valor
+        # fica associado à versão antiga e é recarregado na próxima leitura
+        version = read_version(self.version_key)
+        with self.lock:
+            if self.version == version:
+                self.hits += 1
+                return self.value
+        value = self.loader()
+        with self.lock:
+            self.misses += 1
+            self.value, self.version = value, version
+        return value
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else None,
+            'version': self.version,
+        }
+
+
+class TTLCache:
+    """
+    Valores por chave, carregados por ``loader(key)`` e mantidos pelo tempo
+    devolvido por ``ttl()`` (em segundos, lido da configuração a cada carga).
+    Alterações feitas neste processo devem chamar ``invalidate``. Com
+    ``version_key(key)`` (nome do carimbo de cada chave), cada valor também
+    fica associado à versão do carimbo lida antes da carga e é recarregado
+    quando ela muda (alterações de outros workers); sem ele, nos demais
+    workers o valor antigo vale até expirar.
+    ``loader`` devolvendo ``None`` não é guardado.
+    """
+
+    def __init__(self, name, ttl, loader, version_key=None):
+        self.name = name
+        self.ttl = ttl
+        self.loader = loader
+        self.version_key = version_key
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        CACHES[name] = self
+
+    def get(self, key):
+        version = read_version(self.version_key(key)) if self.version_key else None
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now and entry[1] == version:
+                self.hits += 1
+                return entry[2]
+        value = self.loader(key)
+        with self.lock:
+            self.misses += 1
+            if value is not None:
+                self.entries[key] = (now + self.ttl(), version, value)
+            # Descarta as entradas vencidas de tempos em tempos
+            if self.misses % 100 == 0:
+                self.entries = {k: e for k, e in self.entries.items() if e[0] > now}
+        return value
+
+    def invalidate(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else None,
+            'size': len(self.entries),
+        }
+
+
+class LRUCache:
+    """
+    Valores por chave, carregados por ``loader(key)`` e descartados pelo uso
+    menos recente quando a soma de ``size(valor)`` passa de ``capacity()``
+    (lida da configuração a cada inclusão). Serve para resultados que só
+    dependem da chave (não mudam depois de calculados).
+    """
+
+    def __init__(self, name, capacity, loader, size=lambda value: 1):
+        self.name = name
+        self.capacity = capacity
+        self.loader = loader
+        self.size = size
+        self.entries = OrderedDict()
+        self.total_size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        CACHES[name] = self
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        value = self.loader(key)
+        size = self.size(value)
+        with self.lock:
+            self.misses += 1
+            if key not in self.entries:
+                self.entries[key] = (size, value)
+                self.total_size += size
+                capacity = self.capacity()
+                while self.total_size > capacity and self.entries:
+                    evicted_size, _ = self.entries.popitem(last=False)[1]
+                    self.total_size -= evicted_size
+                    self.evictions += 1
+        return value
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else None,
+            'size': len(self.entries),
+            'total_size': self.total_size,
+            'evictions': self.evictions,
+        }
+
+
+def cache_stats():
+    """Acertos e falhas de todos os caches registrados."""
+    return {name: cache.stats() for name, cache in CACHES.items()}
+
+
+# ---------------------------------------------------------------------------
+# Dados de referência: categorias e tags. A versão é incrementada a cada
+# alteração de Category ou Tag (ver update_counters em src/models/stats.py)
+# ---------------------------------------------------------------------------
+
+CategoryRef = namedtuple('CategoryRef', 'id name description parent_id')
+TagRef = namedtuple('TagRef', 'id name')
+
+
+def _load_categories():
+    rows = db.session.query(
+        Category.id, Category.name, Category.description, Category.parent_id
+    ).order_by(Category.id).all()
+    return tuple(CategoryRef(*row) for row in rows)
+
+
+def _load_tags():
+    rows = db.session.query(Tag.id, Tag.name).order_by(Tag.id).all()
+    return tuple(TagRef(*row) for row in rows)
+
+
+categories_cache = VersionedCache('categories', REFERENCE_DATA_VERSION, _load_categories)
+tags_cache = VersionedCache('tags', REFERENCE_DATA_VERSION, _load_tags)
+
+
+def get_categories():
+    """Todas as categorias (``CategoryRef``)."""
+    return categories_cache.get()
+
+
+def get_tags():
+    """Todas as tags (``TagRef``)."""
+    return tags_cache.get()
@@ -0,0 +1,99 @@
+"""
+Diferenças compactas entre duas versões do HTML de um artigo.
+
+Um delta descreve o texto novo como uma sequência de operações sobre o texto
+base: ``[início, tamanho]`` copia um trecho do texto base (posições em
+caracteres) e uma string insere texto novo. A lista de operações é gravada
+em JSON comprimido com zlib.
+
+A comparação é feita por tokens (tags HTML, palavras e espaços), e não por
+linhas, porque o Summernote costuma gravar o conteúdo inteiro em poucas
+linhas longas.
+
+Este módulo não depende do banco, para poder ser usado também pelo
+benchmark em ``src/misc/benchmark_version_storage.py``.
+"""
+import json
+import re
+import zlib
+from difflib import SequenceMatcher
+
+TOKEN_RE = re.compile(r'<[^>]*>|[^<\s]+|\s+|<')
+
+
+def tokenize(text):
+    """Tokens de ``text`` (tags, palavras e espaços); juntos refazem o texto."""
+    return TOKEN_RE.findall(text or '')
+
+
+def make_delta(base, target):
+    """
+    Delta que transforma ``base`` em ``target``.
+
+    Returns:
+        Bytes comprimidos (ver ``apply_delta``)
+    """
+    base_tokens = tokenize(base)
+    target_tokens = tokenize(target)
+
+    # Posição, em caracteres, do início de cada token do texto base
+    offsets = [0]
+    for token in base_tokens:
+        offsets.append(offsets[-1] + len(token))
+
+    # Início e fim em comum ficam fora da comparação (a maioria das edições
+    # muda um trecho pequeno, e o SequenceMatcher é caro em textos longos)
+    limit = min(len(base_tokens), len(target_tokens))
+    prefix = 0
+    while prefix < limit and base_tokens[prefix] == target_tokens[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and base_tokens[-1 - suffix] == target_tokens[-1 - suffix]:
+        suffix += 1
+    base_end = len(base_tokens) - suffix
+    target_end = len(target_tokens) - suffix
+
+    ops = []
+    if prefix:
+        ops.append([0, offsets[prefix]])
+    matcher = SequenceMatcher(None, base_tokens[prefix:base_end], target_tokens[prefix:target_end])
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            start, end = offsets[prefix + i1], offsets[prefix + i2]
+            ops.append([start, end - start])
+        elif j2 > j1:
+            ops.append(''.join(target_tokens[prefix + j1:prefix + j2]))
+    if suffix:
+        ops.append([offsets[base_end], offsets[-1] - offsets[base_end]])
+
+    payload = json.dumps(ops, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return zlib.compress(payload, 9)
+
+
+def apply_delta(base, delta):
+    """Texto obtido aplicando ``delta`` (de ``make_delta``) sobre ``base``."""
+    parts = []
+    for op in json.loads(zlib.decompress(delta)):
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            start, length = op
+            parts.append(base[start:start + length])
+    return ''.join(parts)
+
+
+def chain_is_full(depth, interval):
+    """
+    A próxima versão deve ser completa: a anterior já está a ``depth``
+    deltas da última versão completa e cada cadeia tem no máximo
+    ``interval`` versões (VERSION_KEYFRAME_INTERVAL).
+    """
+    return depth + 1 >= interval
+
+
+def delta_pays_off(delta_size, content_size):
+    """
+    O delta compensa em relação ao conteúdo completo (tamanhos em bytes). Em
+    reescritas grandes o delta quase não economiza e ainda custa para aplicar.
+    """
+    return delta_size * 2 < content_size
@@ -0,0 +1,219 @@
+"""
+Diferenças entre duas versões de um artigo, para exibição.
+
+O HTML é dividido nos mesmos tokens dos deltas (tags, palavras e espaços, ver
+``src/services/deltas.py``) e comparado com o algoritmo de Myers na variante
+de espaço linear (busca da "cobra do meio" e divisão recursiva). Em trechos
+muito diferentes a busca é limitada a ``MAX_EDIT_STEPS`` passos e o trecho
+inteiro é marcado como substituído, para que uma reescrita completa não
+custe segundos de CPU.
+
+A marcação respeita o HTML: apenas texto (e imagens) fica dentro de
+``<ins>``/``<del>``; as tags são mantidas conforme o lado exibido, então cada
+lado da visão lado a lado é o documento original daquela versão e a visão
+integrada segue a estrutura da versão mais nova.
+
+Os resultados ficam em um ``LRUCache`` por worker, limitado a
+``DIFF_CACHE_MAX_BYTES``; a chave é o par de ids das versões junto com o
+hash do conteúdo de cada uma, que muda quando uma manutenção regrava o
+conteúdo (ex.: ``extract_article``) e descarta o resultado antigo.
+"""
+from collections import namedtuple
+
+from flask import current_app
+
+from src.models.article_version import ArticleVersion
+from src.models.user import db
+from src.services.cache import LRUCache
+from src.services.deltas import tokenize
+
+# Limite de passos (tamanho da diferença) na busca de cada cobra do meio
+MAX_EDIT_STEPS = 500
+
+VersionDiff = namedtuple('VersionDiff', 'inline old new inserted deleted')
+
+
+def _is_tag(token):
+    return token.startswith('<') and len(token) > 1 and not token.lower().startswith('<img')
+
+
+def _middle_snake(a, a_lo, a_hi, b, b_lo, b_hi):
+    """
+    Cobra do meio do caminho de edição de a[a_lo:a_hi] para b[b_lo:b_hi].
+
+    Returns:
+        (x_ini, y_ini, x_fim, y_fim) em posições absolutas, ou None se a
+        diferença passar de MAX_EDIT_STEPS
+    """
+    n = a_hi - a_lo
+    m = b_hi - b_lo
+    delta = n - m
+    odd = delta % 2 != 0
+    max_d = min((n + m + 1) // 2, MAX_EDIT_STEPS)
+    offset = max_d + 1
+    forward = [0] * (2 * offset + 1)
+    backward = [0] * (2 * offset + 1)
+
+    for d in range(max_d + 1):
+        # Caminho a partir do início
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                x = forward[offset + k + 1]
+            else:
+                x = forward[offset + k - 1] + 1
+            y = x - k
+            start_x, start_y = x, y
+            while x < n and y < m and a[a_lo + x] == b[b_lo + y]:
+                x += 1
+                y += 1
+            forward[offset + k] = x
+            reverse_k = delta - k
+            if odd and -(d - 1) <= reverse_k <= d - 1 and x + backward[offset + reverse_k] >= n:
+                return a_lo + start_x, b_lo + start_y, a_lo + x, b_lo + y
+
+        # Caminho a partir do fim (x e y contados a partir do fim)
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and backward[offset + k - 1] < backward[offset + k + 1]):
+                x = backward[offset + k + 1]
+            else:
+                x = backward[offset + k - 1] + 1
+            y = x - k
+            start_x, start_y = x, y
+            while x < n and y < m and a[a_hi - 1 - x] == b[b_hi - 1 - y]:
+                x += 1
+                y += 1
+            backward[offset + k] = x
+            forward_k = delta - k
+            if not odd and -d <= forward_k <= d and x + forward[offset + forward_k] >= n:
+                return a_hi - x, b_hi - y, a_hi - start_x, b_hi - start_y
+    return None
+
+
+def _diff(a, a_lo, a_hi, b, b_lo, b_hi, ops):
+    """Acrescenta a ``ops`` as operações que transformam a[a_lo:a_hi] em b[b_lo:b_hi]."""
+    # Início e fim em comum
+    start_a, start_b = a_lo, b_lo
+    while a_lo < a_hi and b_lo < b_hi and a[a_lo] == b[b_lo]:
+        a_lo += 1
+        b_lo += 1
+    if a_lo > start_a:
+        ops.append(('equal', start_a, a_lo, start_b, b_lo))
+    end_a, end_b = a_hi, b_hi
+    while a_lo < a_hi and b_lo < b_hi and a[a_hi - 1] == b[b_hi - 1]:
+        a_hi -= 1
+        b_hi -= 1
+
+    if a_lo == a_hi:
+        if b_lo < b_hi:
+            ops.append(('insert', a_lo, a_lo, b_lo, b_hi))
+    elif b_lo == b_hi:
+        ops.append(('delete', a_lo, a_hi, b_lo, b_lo))
+    else:
+        snake = _middle_snake(a, a_lo, a_hi, b, b_lo, b_hi)
+        if snake is None:
+            ops.append(('delete', a_lo, a_hi, b_lo, b_lo))
+            ops.append(('insert', a_hi, a_hi, b_lo, b_hi))
+        else:
+            x1, y1, x2, y2 = snake
+            _diff(a, a_lo, x1, b, b_lo, y1, ops)
+            if x2 > x1:
+                ops.append(('equal', x1, x2, y1, y2))
+            _diff(a, x2, a_hi, b, y2, b_hi, ops)
+
+    if a_hi < end_a:
+        ops.append(('equal', a_hi, end_a, b_hi, end_b))
+
+
+def diff_tokens(a, b):
+    """
+    Operações ('equal', 'insert' ou 'delete', i1, i2, j1, j2) que transformam
+    a lista de tokens ``a`` em ``b``, com operações vizinhas do mesmo tipo unidas.
+    """
+    ops = []
+    _diff(a, 0, len(a), b, 0, len(b), ops)
+    merged = []
+    for op in ops:
+        if merged and merged[-1][0] == op[0] and merged[-1][2] == op[1] and merged[-1][4] == op[3]:
+            merged[-1] = (op[0], merged[-1][1], op[2], merged[-1][3], op[4])
+        else:
+            merged.append(op)
+    return merged
+
+
+def _mark(tokens, element, keep_tags):
+    """
+    HTML de ``tokens`` com os trechos de texto dentro de ``element`` (ins ou
+    del). As tags são mantidas ou descartadas conforme ``keep_tags``.
+
+    Returns:
+        (html, quantidade de palavras marcadas)
+    """
+    parts = []
+    run = []
+    words = 0
+
+    def close_run():
+        if run:
+            text = ''.join(run)
+            parts.append(f'<{element} class="diff-{element}">{text}</{element}>' if text.strip() else text)
+            run.clear()
+
+    for token in tokens:
+        if _is_tag(token):
+            close_run()
+            if keep_tags:
+                parts.append(token)
+        else:
+            run.append(token)
+            if token.strip():
+                words += 1
+    close_run()
+    return ''.join(parts), words
+
+
+def compare(old_content, new_content):
+    """Diferença entre dois conteúdos HTML (``VersionDiff``)."""
+    a = tokenize(old_content)
+    b = tokenize(new_content)
+    inline, old, new = [], [], []
+    inserted = deleted = 0
+    for tag, i1, i2, j1, j2 in diff_tokens(a, b):
+        if tag == 'equal':
+            inline.append(''.join(b[j1:j2]))
+            old.append(''.join(a[i1:i2]))
+            new.append(''.join(b[j1:j2]))
+        elif tag == 'delete':
+            html, words = _mark(a[i1:i2], 'del', keep_tags=True)
+            old.append(html)
+            inline.append(_mark(a[i1:i2], 'del', keep_tags=False)[0])
+            deleted += words
+        else:
+            html, words = _mark(b[j1:j2], 'ins', keep_tags=True)
+            new.append(html)
+            inline.append(html)
+            inserted += words
+    return VersionDiff(''.join(inline), ''.join(old), ''.join(new), inserted, deleted)
+
+
+def _load_diff(key):
+    old_id, _, new_id, _ = key
+    # As versões normalmente já estão na sessão (carregadas pela rota)
+    return compare(db.session.get(ArticleVersion, old_id).content,
+                   db.session.get(ArticleVersion, new_id).content)
+
+
+def _diff_size(diff):
+    return len(diff.inline) + len(diff.old) + len(diff.new)
+
+
+diff_cache = LRUCache(
+    'version_diffs',
+    lambda: current_app.config['DIFF_CACHE_MAX_BYTES'],
+    _load_diff,
+    size=_diff_size
+)
+
+
+def version_diff(old_version, new_version):
+    """Diferença entre duas versões gravadas (em cache)."""
+    return diff_cache.get((old_version.id, old_version.content_hash, new_version.id, new_version.content_hash))
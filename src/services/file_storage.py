@@ -0,0 +1,455 @@
+"""
+Backends de armazenamento do conteúdo de arquivos.
+
+* ``FilesystemStorage`` (padrão): repositório endereçado por conteúdo em
+  ``UPLOAD_FOLDER/blobs``, com o caminho derivado do SHA-256. Envios de um
+  mesmo conteúdo apontam para o mesmo blob (deduplicação por referência) e o
+  download usa ``send_file`` com o caminho, o que permite ao servidor WSGI usar
+  ``sendfile`` do sistema operacional (ou ``X-Sendfile`` com ``USE_X_SENDFILE``).
+  Blobs sem referência são removidos depois do commit da exclusão
+  (``discard``) ou por ``flask files gc-blobs``; blobs novos gravados em uma
+  transação desfeita são removidos ao fim dela.
+* ``DatabaseStorage``: conteúdo no banco em pedaços de tamanho fixo
+  (``FileChunk``, ``DB_CHUNK_SIZE``), enviado por uma resposta em streaming.
+
+O backend de novos envios é escolhido por ``FILE_STORAGE_BACKEND``; arquivos
+existentes são lidos pelo backend indicado em ``File.stored_in_db``.
+"""
+import hashlib
+import os
+import time
+import uuid
+
+from flask import Response, current_app, request, send_file
+
+from src.models.file import File, FileChunk
+from src.models.user import db
+from src.services.uploads import receive_upload
+
+# Tamanho dos blocos lidos ao conferir o checksum de um blob
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+class DatabaseStorage:
+    """Conteúdo no banco de dados, em pedaços de ``DB_CHUNK_SIZE`` bytes."""
+
+    name = 'database'
+
+    def save(self, file, stream):
+        """
+        Grava o conteúdo de ``stream`` em pedaços para ``file`` (que já deve
+        ter ``id``). Os pedaços são inseridos diretamente, sem ficar na sessão,
+        então só um pedaço fica em memória por vez.
+        """
+        chunk_size = current_app.config['DB_CHUNK_SIZE']
+        digest = hashlib.sha256()
+        total = 0
+        seq = 0
+        while True:
+            data = stream.read(chunk_size)
+            if not data:
+                break
+            db.session.execute(
+                FileChunk.__table__.insert(),
+                {'file_id': file.id, 'seq': seq, 'data': data}
+            )
+            digest.update(data)
+            total += len(data)
+            seq += 1
+
+        file.file_size = total
+        file.content_hash = digest.hexdigest()
+        file.file_path = None
+        file.stored_in_db = True
+
+    def save_upload(self, file, upload):
+        """Grava em pedaços o temporário recebido (ver ``receive_upload``)."""
+        with upload.open() as stream:
+            self.save(file, stream)
+
+    def exists(self, file):
+        return True
+
+    def open(self, file):
+        """Leitor sequencial do conteúdo, dentro da transação atual."""
+        return DatabaseChunkReader(file.id)
+
+    def send(self, file, as_attachment):
+        """
+        Resposta em streaming com validadores (ETag do ``content_hash`` e
+        Last-Modified de ``uploaded_at``), 304 para GET condicional e
+        respostas parciais (206) para requisições com Range.
+        """
+        response = Response(
+            DatabaseChunkStream(current_app._get_current_object(), file.id),
+            mimetype=file.mime_type,
+            direct_passthrough=True
+        )
+        response.content_length = file.file_size
+        response.headers.set(
+            'Content-Disposition',
+            'attachment' if as_attachment else 'inline',
+            filename=file.original_filename
+        )
+        if file.content_hash:
+            response.set_etag(file.content_hash)
+        response.last_modified = file.uploaded_at
+        return response.make_conditional(request, accept_ranges=True, complete_length=file.file_size)
+
+    def delete(self, file):
+        FileChunk.query.filter_by(file_id=file.id).delete()
+
+
+class DatabaseChunkStream:
+    """
+    Corpo da resposta para arquivos no banco: itera sobre os pedaços, um por
+    consulta, e suporta ``seek`` para que requisições com Range comecem no
+    pedaço certo sem ler os anteriores.
+
+    Cada pedaço é lido em um contexto de aplicação próprio, então nenhuma
+    conexão do pool fica presa enquanto um cliente lento baixa o arquivo.
+    """
+
+    def __init__(self, app, file_id):
+        self.app = app
+        self.file_id = file_id
+        self.seq = 0
+        self.skip = 0
+        self.position = 0
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, position):
+        # Todos os pedaços de um arquivo têm o tamanho do primeiro (exceto o último)
+        with self.app.app_context():
+            chunk_size = db.session.execute(
+                db.select(db.func.length(FileChunk.data)).where(
+                    FileChunk.file_id == self.file_id,
+                    FileChunk.seq == 0
+                )
+            ).scalar()
+        self.seq, self.skip = divmod(position, chunk_size) if chunk_size else (0, 0)
+        self.position = position
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        with self.app.app_context():
+            data = db.session.execute(
+                db.select(FileChunk.data).where(
+                    FileChunk.file_id == self.file_id,
+                    FileChunk.seq == self.seq
+                )
+            ).scalar()
+        if data is None:
+            raise StopIteration
+        self.seq += 1
+        if self.skip:
+            data, self.skip = data[self.skip:], 0
+        self.position += len(data)
+        return data
+
+
+class DatabaseChunkReader:
+    """
+    Objeto tipo arquivo (``read``) sobre os pedaços de um arquivo no banco.
+    Mantém apenas um pedaço em memória. Arquivos legados sem pedaços são
+    lidos de ``files.file_content`` por ``substr``, também em partes.
+    """
+
+    def __init__(self, file_id):
+        self.file_id = file_id
+        self.seq = 0
+        self.offset = 0
+        self.buffer = b''
+        self.legacy = None
+
+    def _next_piece(self):
+        if self.legacy is None:
+            self.legacy = not db.session.query(
+                FileChunk.query.filter_by(file_id=self.file_id).exists()
+            ).scalar()
+
+        if self.legacy:
+            size = current_app.config['DB_CHUNK_SIZE']
+            data = db.session.execute(
+                db.select(db.func.substr(File.file_content, self.offset + 1, size))
+                .where(File.id == self.file_id)
+            ).scalar()
+            self.offset += len(data or b'')
+            return data or b''
+
+        data = db.session.execute(
+            db.select(FileChunk.data).where(
+                FileChunk.file_id == self.file_id,
+                FileChunk.seq == self.seq
+            )
+        ).scalar()
+        self.seq += 1
+        return data or b''
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            piece = self._next_piece()
+            if not piece:
+                break
+            self.buffer += piece
+        if size < 0:
+            data, self.buffer = self.buffer, b''
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+class FilesystemStorage:
+    """Repositório em disco endereçado pelo SHA-256 do conteúdo."""
+
+    name = 'filesystem'
+
+    @staticmethod
+    def blob_key(content_hash):
+        """Caminho relativo do blob, ex.: ``blobs/ab/cd/abcd...``."""
+        return os.path.join('blobs', content_hash[:2], content_hash[2:4], content_hash)
+
+    @staticmethod
+    def resolve(file_path):
+        """
+        Caminho absoluto de ``File.file_path``; caminhos antigos já absolutos
+        são mantidos como estão.
+        """
+        return os.path.join(current_app.config['UPLOAD_FOLDER'], file_path)
+
+    def save(self, file, stream):
+        """Grava ``stream`` no repositório e aponta ``file`` para o blob."""
+        with receive_upload(stream) as upload:
+            self.save_upload(file, upload)
+
+    def save_upload(self, file, upload):
+        """Move o temporário recebido para o blob e aponta ``file`` para ele."""
+        self.store_path(upload.path, upload.content_hash)
+        file.file_size = upload.size
+        file.content_hash = upload.content_hash
+        file.file_path = self.blob_key(upload.content_hash)
+        file.stored_in_db = False
+
+    def write_blob(self, stream):
+        """
+        Copia ``stream`` para o blob correspondente ao seu SHA-256. Se o blob
+        já existir, a cópia é descartada (deduplicação).
+
+        Returns:
+            Tupla ``(content_hash, tamanho)``
+        """
+        with receive_upload(stream) as upload:
+            self.store_path(upload.path, upload.content_hash)
+            return upload.content_hash, upload.size
+
+    def verify(self, content_hash):
+        """Relê o blob do disco e confere se o SHA-256 corresponde."""
+        path = self.resolve(self.blob_key(content_hash))
+        if not os.path.exists(path):
+            return False
+        digest = hashlib.sha256()
+        with open(path, 'rb') as blob:
+            for data in iter(lambda: blob.read(COPY_BUFFER_SIZE), b''):
+                digest.update(data)
+        return digest.hexdigest() == content_hash
+
+    def store_path(self, path, content_hash):
+        """
+        Move o arquivo em ``path`` (no mesmo sistema de arquivos) para o blob
+        de ``content_hash``, a menos que o blob já exista.
+        """
+        blob_path = self.resolve(self.blob_key(content_hash))
+        if os.path.exists(blob_path):
+            try:
+                # Marca o blob como em uso: remove_unreferenced não apaga
+                # blobs tocados há menos de BLOB_REUSE_GRACE_SECONDS, então o
+                # registro que o reutiliza tem esse tempo para ser confirmado
+                os.utime(blob_path)
+                return blob_path
+            except FileNotFoundError:
+                pass  # removido depois da verificação: grava novamente
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        os.replace(path, blob_path)
+        # Blob novo: removido se a transação for desfeita (remove_written_blobs)
+        written = db.session.info.setdefault('written_blobs', {})
+        written[self.blob_key(content_hash)] = os.stat(blob_path).st_mtime_ns
+        return blob_path
+
+    def exists(self, file):
+        return bool(file.file_path) and os.path.exists(self.resolve(file.file_path))
+
+    def open(self, file):
+        return open(self.resolve(file.file_path), 'rb')
+
+    def send(self, file, as_attachment):
+        # send_file já trata GET condicional e Range para arquivos em disco
+        return send_file(
+            self.resolve(file.file_path),
+            mimetype=file.mime_type,
+            as_attachment=as_attachment,
+            download_name=file.original_filename,
+            conditional=True,
+            etag=file.content_hash or True,
+            last_modified=file.uploaded_at
+        )
+
+    def delete(self, file):
+        """Agenda a remoção do blob para depois do commit (ver ``discard``)."""
+        if file.file_path:
+            self.discard(file.file_path)
+
+    @staticmethod
+    def discard(blob_key):
+        """
+        Agenda a remoção de ``blob_key`` para depois do commit da transação
+        atual; se ela for desfeita, o blob fica. Na remoção as referências são
+        verificadas de novo (``remove_unreferenced``).
+        """
+        db.session.info.setdefault('discarded_blobs', set()).add(blob_key)
+
+    def remove_unreferenced(self, blob_key, written_mtime=None):
+        """
+        Remove o blob se nenhum arquivo o referencia (conteúdo ou miniatura)
+        e ele não foi tocado nos últimos ``BLOB_REUSE_GRACE_SECONDS``. Com
+        ``written_mtime`` (blob gravado por uma transação desfeita), o período
+        não se aplica: o blob só fica se foi tocado depois de gravado, isto é,
+        reutilizado por outro envio.
+
+        O blob é primeiro renomeado, para que um envio simultâneo do mesmo
+        conteúdo grave um blob novo em vez de reutilizar o que está saindo; as
+        verificações são feitas depois e, se o blob ainda estiver em uso, ele
+        volta para o lugar (o conteúdo é o mesmo).
+
+        Returns:
+            True se o blob foi removido
+        """
+        path = self.resolve(blob_key)
+        removing = f'{path}.{uuid.uuid4().hex}.removing'
+        try:
+            os.replace(path, removing)
+        except FileNotFoundError:
+            return False
+
+        content_hash = os.path.basename(blob_key)
+        with db.engine.connect() as connection:
+            referenced = connection.execute(
+                db.select(File.id).where(
+                    db.or_(File.file_path == blob_key, File.thumbnail_hash == content_hash)
+                ).limit(1)
+            ).first() is not None
+        if written_mtime is None:
+            grace = current_app.config['BLOB_REUSE_GRACE_SECONDS']
+            recently_used = time.time() - os.path.getmtime(removing) < grace
+        else:
+            recently_used = os.stat(removing).st_mtime_ns != written_mtime
+
+        if referenced or recently_used:
+            os.replace(removing, path)
+            return False
+        os.remove(removing)
+        return True
+
+    def collect_garbage(self):
+        """
+        Remove os blobs sem referência (ex.: de arquivos excluídos logo após o
+        envio, ainda no período de reutilização, ou de remoções interrompidas).
+
+        Returns:
+            Quantidade de blobs removidos
+        """
+        removed = 0
+        blobs_dir = self.resolve('blobs')
+        if not os.path.isdir(blobs_dir):
+            return 0
+        for directory, _, names in os.walk(blobs_dir):
+            for name in names:
+                path = os.path.join(directory, name)
+                if name.endswith('.removing'):
+                    # Remoção interrompida: volta para o lugar e é reavaliada
+                    name = name.split('.', 1)[0]
+                    original = os.path.join(directory, name)
+                    os.replace(path, original)
+                    path = original
+                blob_key = os.path.relpath(path, current_app.config['UPLOAD_FOLDER'])
+                if self.remove_unreferenced(blob_key):
+                    removed += 1
+        return removed
+
+
+BACKENDS = {
+    DatabaseStorage.name: DatabaseStorage(),
+    FilesystemStorage.name: FilesystemStorage(),
+}
+
+
+@db.event.listens_for(db.session, 'after_commit')
+def remove_discarded_blobs(session):
+    """Remove os blobs liberados pela transação confirmada (ver ``FilesystemStorage.discard``)."""
+    blob_keys = session.info.pop('discarded_blobs', None)
+    for blob_key in sorted(blob_keys or ()):
+        try:
+            BACKENDS[FilesystemStorage.name].remove_unreferenced(blob_key)
+        except OSError:
+            current_app.logger.exception('Falha ao remover o blob %s', blob_key)
+
+
+@db.event.listens_for(db.session, 'after_rollback')
+def keep_discarded_blobs(session):
+    session.info.pop('discarded_blobs', None)
+
+
+@db.event.listens_for(db.session, 'after_commit')
+def keep_written_blobs(session):
+    session.info.pop('written_blobs', None)
+
+
+@db.event.listens_for(db.session, 'after_transaction_end')
+def remove_written_blobs(session, transaction):
+    """
+    Remove os blobs novos de uma transação que terminou sem commit (desfeita
+    ou descartada com a sessão), ex.: as imagens de um artigo que não foi salvo.
+    """
+    if transaction.parent is not None:
+        return
+    written = session.info.pop('written_blobs', None)
+    for blob_key, mtime in sorted((written or {}).items()):
+        try:
+            BACKENDS[FilesystemStorage.name].remove_unreferenced(blob_key, written_mtime=mtime)
+        except OSError:
+            current_app.logger.exception('Falha ao remover o blob %s', blob_key)
+
+
+def apply_cache_policy(response, public):
+    """
+    Define o Cache-Control de um arquivo servido: ``public`` para arquivos
+    acessíveis sem login (imagens e PDFs embutidos nos artigos) e ``private``
+    para downloads autenticados, com ``FILE_CACHE_MAX_AGE_PUBLIC`` e
+    ``FILE_CACHE_MAX_AGE_PRIVATE`` segundos.
+    """
+    if public:
+        max_age = current_app.config['FILE_CACHE_MAX_AGE_PUBLIC']
+        response.headers['Cache-Control'] = f'public, max-age={max_age}'
+    else:
+        max_age = current_app.config['FILE_CACHE_MAX_AGE_PRIVATE']
+        policy = f'private, max-age={max_age}'
+        if not max_age:
+            policy += ', no-cache'
+        response.headers['Cache-Control'] = policy
+    return response
+
+
+def get_storage(name=None):
+    """Backend pelo nome, ou o configurado em ``FILE_STORAGE_BACKEND``."""
+    return BACKENDS[name or current_app.config['FILE_STORAGE_BACKEND']]
+
+
+def storage_for(file):
+    """Backend em que ``file`` está armazenado."""
+    return BACKENDS[DatabaseStorage.name if file.stored_in_db else FilesystemStorage.name]
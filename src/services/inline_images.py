@@ -0,0 +1,241 @@
+"""
+Extração das imagens embutidas em base64 no conteúdo dos artigos.
+
+O Summernote grava as imagens coladas como ``src="data:image/...;base64,..."``
+dentro do HTML, e esses megabytes passam a ir junto em cada listagem, cópia
+de versão e busca. Ao salvar, cada imagem é gravada como um ``File`` no
+backend configurado e o ``src`` passa a apontar para ``serve_file``.
+
+Imagens iguais (mesmo SHA-256) reutilizam o mesmo ``File``, tanto em um
+mesmo salvamento quanto entre artigos e versões, então a extração do
+histórico não cria um registro por versão. Só são extraídos os tipos aceitos
+nos envios (PNG, JPEG e GIF, identificados pelos bytes); outros (ex.: SVG)
+continuam embutidos. Os blobs são gravados antes do commit, junto com os
+registros; se a transação não for confirmada, os blobs novos são removidos
+(ver ``remove_written_blobs`` em ``src/services/file_storage.py``).
+
+Os arquivos extraídos são ligados aos artigos que os usam (``ArticleFile``)
+e seguem a visibilidade deles (``can_view``): não são públicos, não aparecem
+na lista de arquivos nem entre os anexos e não podem ser excluídos pela
+lista, o que quebraria as imagens do artigo.
+
+O conteúdo já gravado é convertido por ``flask files extract-inline-images``
+(``extract_article``), que também regrava o histórico de versões.
+"""
+import base64
+import binascii
+import hashlib
+import io
+import re
+import uuid
+from collections import namedtuple
+
+from flask import current_app, has_request_context, url_for
+from sqlalchemy.orm.attributes import flag_modified
+
+from src.models.article import Article
+from src.models.file import File, ArticleFile
+from src.models.user import db
+from src.services import thumbnails
+from src.services.file_storage import get_storage
+from src.services.text import content_hash
+from src.services.uploads import receive_upload, sniff_mime_type, SNIFF_LENGTH
+from src.services.version_store import load_history, reencode
+
+# Trecho procurado antes de aplicar a expressão regular
+INLINE_MARKER = 'data:image/'
+
+DATA_URI_RE = re.compile(
+    r'''(\bsrc\s*=\s*)(["'])data:image/[\w.+-]+;base64,([A-Za-z0-9+/=\s]*)\2''',
+    re.IGNORECASE
+)
+
+# Descrição dos arquivos criados pela extração (só esses são reutilizados)
+EXTRACTED_DESCRIPTION = 'Imagem extraída do conteúdo de um artigo'
+
+InlineExtraction = namedtuple('InlineExtraction', 'html created file_ids')
+ArticleExtraction = namedtuple('ArticleExtraction', 'images article_bytes version_bytes')
+
+
+def image_url(file_id):
+    """URL de ``serve_file``, também fora de uma requisição (CLI)."""
+    if has_request_context():
+        return url_for('files.serve_file', file_id=file_id)
+    adapter = current_app.url_map.bind('localhost', script_name=current_app.config['APPLICATION_ROOT'])
+    return adapter.build('files.serve_file', {'file_id': file_id})
+
+
+def utf8_size(text):
+    return len((text or '').encode('utf-8'))
+
+
+def is_extracted(file):
+    return file.description == EXTRACTED_DESCRIPTION
+
+
+def not_extracted():
+    """Filtro dos arquivos enviados diretamente (sem as imagens extraídas)."""
+    return db.or_(File.description.is_(None), File.description != EXTRACTED_DESCRIPTION)
+
+
+def can_view(file, user):
+    """
+    Se ``user`` pode ver a imagem extraída ``file``: a mesma regra de
+    ``Article.is_viewable_by`` aplicada aos artigos ligados a ela (editores
+    veem todos; os demais, apenas os homologados).
+    """
+    if not user.is_authenticated:
+        return False
+    if user.is_editor():
+        return True
+    return db.session.query(ArticleFile.id).join(Article, Article.id == ArticleFile.article_id).filter(
+        ArticleFile.file_id == file.id, Article.status == 'homologado'
+    ).first() is not None
+
+
+def link_to_article(article_id, file_ids):
+    """Liga ao artigo os arquivos extraídos que ele usa e ainda não estão ligados. Não faz commit."""
+    if not file_ids:
+        return
+    linked = {
+        file_id for (file_id,) in db.session.query(ArticleFile.file_id).filter(
+            ArticleFile.article_id == article_id, ArticleFile.file_id.in_(file_ids)
+        )
+    }
+    db.session.add_all([
+        ArticleFile(article_id=article_id, file_id=file_id)
+        for file_id in file_ids if file_id not in linked
+    ])
+
+
+class InlineImageExtractor:
+    """
+    Substitui as imagens em base64 por URLs de ``File``. Guarda os arquivos
+    já resolvidos por hash, então uma instância deve ser reutilizada em um
+    lote (ex.: todas as versões de um artigo). Com ``dry_run``, nenhum arquivo
+    é gravado e as URLs apontam para um id fictício (só os tamanhos importam).
+    """
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.file_ids = {}
+        self.created = []
+
+    def used_file_ids(self):
+        """Ids dos arquivos usados até aqui (criados ou reutilizados)."""
+        return sorted({file_id for file_id in self.file_ids.values() if file_id})
+
+    def file_id_for(self, data, user_id):
+        """Id do ``File`` com o conteúdo ``data`` (criado se preciso), ou None se não for imagem aceita."""
+        digest = hashlib.sha256(data).hexdigest()
+        if digest in self.file_ids:
+            return self.file_ids[digest]
+
+        mime_type = sniff_mime_type(data[:SNIFF_LENGTH])
+        if mime_type is None or not mime_type.startswith('image/'):
+            self.file_ids[digest] = None
+            return None
+
+        existing = db.session.query(File.id).filter_by(
+            content_hash=digest, description=EXTRACTED_DESCRIPTION
+        ).order_by(File.id).first()
+        if existing is not None:
+            self.file_ids[digest] = existing[0]
+            return existing[0]
+        if self.dry_run:
+            self.file_ids[digest] = 0
+            return 0
+
+        extension = mime_type.split('/', 1)[1]
+        with receive_upload(io.BytesIO(data)) as upload:
+            new_file = File(
+                filename=f'{uuid.uuid4().hex}.{extension}',
+                original_filename=f'imagem-{digest[:12]}.{extension}',
+                file_type=mime_type,
+                file_size=upload.size,
+                mime_type=mime_type,
+                description=EXTRACTED_DESCRIPTION,
+                uploaded_by=user_id
+            )
+            db.session.add(new_file)
+            db.session.flush()
+            get_storage().save_upload(new_file, upload)
+        thumbnails.mark_pending(new_file)
+        self.created.append(new_file)
+        self.file_ids[digest] = new_file.id
+        return new_file.id
+
+    def rewrite(self, html, user_id):
+        """``html`` com as imagens embutidas trocadas por URLs (sem alteração se não houver)."""
+        if not html or INLINE_MARKER not in html:
+            return html
+
+        def replace(match):
+            try:
+                data = base64.b64decode(re.sub(r'\s+', '', match.group(3)), validate=True)
+            except (binascii.Error, ValueError):
+                return match.group(0)
+            file_id = self.file_id_for(data, user_id) if data else None
+            if file_id is None:
+                return match.group(0)
+            return f'{match.group(1)}{match.group(2)}{image_url(file_id)}{match.group(2)}'
+
+        return DATA_URI_RE.sub(replace, html)
+
+
+def extract_inline_images(html, user_id):
+    """
+    Conteúdo a salvar com as imagens embutidas gravadas como arquivos. Não faz
+    commit; os arquivos devem ser ligados ao artigo com ``link_to_article`` e,
+    depois do commit, as miniaturas dos novos podem ser agendadas com
+    ``thumbnails.schedule``.
+
+    Returns:
+        InlineExtraction com o html, os arquivos criados e os ids de todos os
+        arquivos usados
+    """
+    extractor = InlineImageExtractor()
+    html = extractor.rewrite(html, user_id)
+    return InlineExtraction(html, extractor.created, extractor.used_file_ids())
+
+
+def extract_article(article_id, dry_run=False):
+    """
+    Extrai as imagens do conteúdo atual do artigo e de todas as suas versões
+    (a cadeia de deltas é regravada) e confirma; com ``dry_run``, desfaz tudo.
+    A data de atualização do artigo é mantida.
+
+    Returns:
+        ArticleExtraction com as imagens encontradas (distintas) e os bytes
+        removidos das colunas de conteúdo do artigo e das versões
+    """
+    extractor = InlineImageExtractor(dry_run=dry_run)
+    article_bytes = version_bytes = 0
+
+    article = db.session.get(Article, article_id)
+    if article is not None:
+        content = extractor.rewrite(article.content, article.updated_by)
+        if content != article.content:
+            article_bytes = utf8_size(article.content) - utf8_size(content)
+            article.content = content
+            # Conversão, não edição: sem isso o onupdate trocaria updated_at
+            flag_modified(article, 'updated_at')
+
+    versions = load_history(article_id)
+    contents = [extractor.rewrite(version.content, version.created_by) for version in versions]
+    if any(content != version.content for version, content in zip(versions, contents)):
+        for version, content in zip(versions, contents):
+            if content != version.content:
+                version.content_hash = content_hash(content)
+        before, after = reencode(versions, contents=contents)
+        version_bytes = before - after
+
+    images = sum(1 for file_id in extractor.file_ids.values() if file_id is not None)
+    if article is not None:
+        link_to_article(article_id, extractor.used_file_ids())
+    if dry_run:
+        db.session.rollback()
+    else:
+        # As miniaturas ficam pendentes para 'flask files thumbnails'
+        db.session.commit()
+    return ArticleExtraction(images, article_bytes, version_bytes)
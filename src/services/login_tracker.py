@@ -0,0 +1,120 @@
+"""
+Gravação adiada (write-behind) de ``users.last_login``.
+
+O login apenas anota o horário em um buffer em memória; uma thread do próprio
+processo grava o buffer em lote (um UPDATE por chave primária para todos os
+usuários pendentes, em uma transação) a cada ``LAST_LOGIN_FLUSH_INTERVAL``
+segundos ou quando ``LAST_LOGIN_FLUSH_SIZE`` usuários se acumulam. Assim a
+resposta do login não espera uma transação de escrita e vários logins
+simultâneos não disputam a tabela ``users``.
+
+Na saída do processo (ex.: reinício do worker do gunicorn) o buffer é gravado
+por ``atexit``. Se o processo for morto sem encerrar normalmente, os horários
+ainda não gravados se perdem, o que é aceitável para este dado informativo.
+"""
+import atexit
+import threading
+from datetime import datetime
+
+from flask import current_app
+
+from src.models.user import db, User
+
+# Tentativas seguidas de gravar um lote antes de descartá-lo
+MAX_FLUSH_ATTEMPTS = 3
+
+
+class LastLoginBuffer:
+    """Horários de login pendentes por usuário (o mais recente prevalece)."""
+
+    def __init__(self):
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopping = False
+        self.thread = None
+        self.app = None
+        self.failures = 0
+
+    def record(self, user_id, when=None):
+        """Anota o login de ``user_id``; a gravação acontece depois, em lote."""
+        with self.lock:
+            self.pending[user_id] = when or datetime.utcnow()
+            size = len(self.pending)
+            if self.thread is None:
+                self._start(current_app._get_current_object())
+        if size >= current_app.config['LAST_LOGIN_FLUSH_SIZE']:
+            self.wakeup.set()
+
+    def _start(self, app):
+        self.app = app
+        self.thread = threading.Thread(target=self._run, name='last-login-flusher', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        interval = self.app.config['LAST_LOGIN_FLUSH_INTERVAL']
+        while not self.stopping:
+            self.wakeup.wait(interval)
+            self.wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """
+        Grava os horários pendentes em uma transação. Usuários excluídos nesse
+        meio tempo são ignorados. Em caso de erro, os horários voltam ao buffer
+        (sem sobrescrever logins mais recentes) para a próxima tentativa; após
+        ``MAX_FLUSH_ATTEMPTS`` falhas seguidas, são descartados.
+
+        Returns:
+            Quantidade de usuários gravados
+        """
+        with self.lock:
+            batch, self.pending = self.pending, {}
+        if not batch or self.app is None:
+            return 0
+
+        users = User.__table__
+        with self.app.app_context():
+            try:
+                # UPDATE em lote pela chave primária (executemany). Pelo Core,
+                # e não pelo UPDATE em lote do ORM, que falha (StaleDataError)
+                # se algum dos usuários já tiver sido excluído
+                db.session.execute(
+                    users.update().where(users.c.id == db.bindparam('user_id'))
+                    .values(last_login=db.bindparam('when')),
+                    [{'user_id': user_id, 'when': when} for user_id, when in batch.items()]
+                )
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                self.failures += 1
+                if self.failures >= MAX_FLUSH_ATTEMPTS:
+                    self.failures = 0
+                    self.app.logger.exception('Falha ao gravar last_login de %d usuário(s); descartados',
+                                              len(batch))
+                    return 0
+                self.app.logger.exception('Falha ao gravar last_login de %d usuário(s)', len(batch))
+                with self.lock:
+                    for user_id, when in batch.items():
+                        if user_id not in self.pending:
+                            self.pending[user_id] = when
+                return 0
+        self.failures = 0
+        return len(batch)
+
+    def drain(self):
+        """Para a thread e grava o que estiver pendente (chamado na saída do processo)."""
+        self.stopping = True
+        self.wakeup.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=5)
+        self.flush()
+
+
+last_login_buffer = LastLoginBuffer()
+atexit.register(last_login_buffer.drain)
+
+
+def record_login(user):
+    """Anota o login de ``user`` para gravação adiada de ``last_login``."""
+    last_login_buffer.record(user.id)
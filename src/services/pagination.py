@@ -0,0 +1,234 @@
+"""
+Paginação por cursor (keyset) para as listagens.
+
+Em vez de OFFSET, cada página continua a partir da chave de ordenação do último
+item exibido (ex.: ``(updated_at, id)``), então qualquer página custa o mesmo
+que a primeira quando existe índice sobre essas colunas. Os cursores são
+opacos para o cliente (JSON em base64 url-safe).
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from flask import current_app, request, url_for
+
+from src.models.user import db
+
+
+class KeysetPage:
+    """Uma página de resultados com os cursores para navegar entre páginas."""
+
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total  # total de itens da listagem, quando conhecido
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def to_dict(self):
+        data = {
+            'per_page': self.per_page,
+            'next_cursor': self.next_cursor,
+            'prev_cursor': self.prev_cursor,
+        }
+        if self.total is not None:
+            data['total'] = self.total
+        return data
+
+
+def encode_cursor(values):
+    """Serializa os valores da chave de ordenação em um cursor opaco."""
+    payload = [_encode_value(v) for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _encode_value(value):
+    # Datas e decimais (ex.: relevância da busca) não são tipos JSON; decimais
+    # vão como texto para voltarem exatamente ao mesmo valor
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'dec': str(value)}
+    return value
+
+
+def _decode_value(value):
+    if not isinstance(value, dict):
+        return value
+    if 'dec' in value:
+        return Decimal(value['dec'])
+    return datetime.fromisoformat(value['dt'])
+
+
+def decode_cursor(token, size):
+    """
+    Converte um cursor de volta nos valores da chave de ordenação.
+    Retorna ``None`` para cursores ausentes ou inválidos.
+    """
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw.decode('utf-8'))
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(payload, list) or len(payload) != size:
+        return None
+    try:
+        return [_decode_value(v) for v in payload]
+    except (KeyError, TypeError, ValueError, InvalidOperation):
+        return None
+
+
+def get_page_size():
+    """Tamanho de página pedido em ``?per_page=``, limitado pela configuração."""
+    per_page = request.args.get('per_page', type=int) or current_app.config['PAGE_SIZE']
+    return max(1, min(per_page, current_app.config['MAX_PAGE_SIZE']))
+
+
+def paginate_keyset(query, keys, after=None, before=None, per_page=None, descending=True):
+    """
+    Pagina ``query`` pela tupla de colunas ``keys``.
+
+    A ordenação da query é substituída pela de ``keys`` (todas na mesma
+    direção), e a última coluna deve ser única (normalmente o ``id``).
+
+    Args:
+        query: Query do SQLAlchemy com a entidade a listar
+        keys: Expressões da chave de ordenação, ex.: ``[Article.updated_at, Article.id]``
+        after: Cursor da página seguinte (itens depois dele)
+        before: Cursor da página anterior (itens antes dele)
+        per_page: Itens por página (padrão: ``PAGE_SIZE``)
+        descending: Ordem decrescente (padrão) ou crescente
+
+    Returns:
+        KeysetPage com os itens e os cursores de navegação
+    """
+    if per_page is None:
+        per_page = current_app.config['PAGE_SIZE']
+
+    after_values = decode_cursor(after, len(keys))
+    before_values = decode_cursor(before, len(keys)) if after_values is None else None
+    backwards = before_values is not None
+
+    row = db.tuple_(*keys)
+    if after_values is not None:
+        query = query.filter(row < tuple(after_values) if descending else row > tuple(after_values))
+    elif backwards:
+        query = query.filter(row > tuple(before_values) if descending else row < tuple(before_values))
+
+    # Na volta para a página anterior a ordem é invertida e depois desfeita
+    forward_desc = descending != backwards
+    ordering = [key.desc() if forward_desc else key.asc() for key in keys]
+
+    rows = (
+        query.add_columns(*keys)
+        .order_by(None)
+        .order_by(*ordering)
+        .limit(per_page + 1)
+        .all()
+    )
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    if backwards:
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, after_values is not None
+
+    next_cursor = encode_cursor(rows[-1][1:]) if rows and has_next else None
+    prev_cursor = encode_cursor(rows[0][1:]) if rows and has_prev else None
+    return KeysetPage([r[0] for r in rows], per_page, next_cursor, prev_cursor)
+
+
+def first_pages_by_group(query, group, groups, keys, per_page=None, descending=True, options=()):
+    """
+    Primeira página de cada grupo (ex.: de cada status) e o total de itens do
+    grupo, tudo em uma consulta: ``row_number()`` e ``count()`` em janelas
+    particionadas por ``group`` calculam a posição e o total sobre apenas
+    as colunas da chave, e só as linhas das primeiras páginas são lidas por
+    inteiro.
+
+    Args:
+        query: Query do SQLAlchemy com a entidade a listar (sem opções de carga)
+        group: Coluna de agrupamento, ex.: ``Article.status``
+        groups: Valores de ``group`` a listar (grupos vazios também são devolvidos)
+        keys: Chave de ordenação, como em ``paginate_keyset``
+        options: Opções de carga da entidade (``joinedload``, ``defer``...)
+
+    Returns:
+        Dicionário ``{grupo: KeysetPage}``, com ``total`` preenchido
+    """
+    if per_page is None:
+        per_page = current_app.config['PAGE_SIZE']
+
+    ordering = [key.desc() if descending else key.asc() for key in keys]
+    ranked = (
+        query.filter(group.in_(groups))
+        .with_entities(
+            keys[-1].label('pk'),
+            group.label('grp'),
+            db.func.row_number().over(partition_by=group, order_by=ordering).label('position'),
+            db.func.count().over(partition_by=group).label('total')
+        )
+        .order_by(None)
+        .subquery()
+    )
+
+    entity = query.column_descriptions[0]['entity']
+    rows = (
+        db.session.query(entity, ranked.c.grp, ranked.c.position, ranked.c.total)
+        .join(ranked, keys[-1] == ranked.c.pk)
+        .filter(ranked.c.position <= per_page + 1)
+        .options(*options)
+        .add_columns(*keys)
+        .order_by(ranked.c.grp, ranked.c.position)
+        .all()
+    )
+
+    grouped = {value: [] for value in groups}
+    totals = {value: 0 for value in groups}
+    for row in rows:
+        grouped[row[1]].append(row)
+        totals[row[1]] = row[3]
+
+    pages = {}
+    for value, group_rows in grouped.items():
+        has_next = len(group_rows) > per_page
+        group_rows = group_rows[:per_page]
+        next_cursor = encode_cursor(group_rows[-1][4:]) if has_next else None
+        pages[value] = KeysetPage([r[0] for r in group_rows], per_page, next_cursor, None, total=totals[value])
+    return pages
+
+
+def page_link(page, direction, prefix='', **extra):
+    """
+    URL da página seguinte (``direction='next'``) ou anterior (``'prev'``),
+    preservando os demais filtros da requisição atual.
+
+    ``prefix`` permite várias listagens paginadas na mesma tela
+    (ex.: ``rascunho_after``).
+    """
+    args = request.args.copy()
+    args.pop(f'{prefix}after', None)
+    args.pop(f'{prefix}before', None)
+    if direction == 'next':
+        args[f'{prefix}after'] = page.next_cursor
+    else:
+        args[f'{prefix}before'] = page.prev_cursor
+    for key, value in extra.items():
+        args[key] = value
+    return url_for(request.endpoint, **(request.view_args or {}), **args.to_dict(flat=False))
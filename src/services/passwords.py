@@ -0,0 +1,146 @@
+"""
+Cálculo de hashes de senha fora da thread da requisição, com concorrência limitada.
+
+O scrypt/pbkdf2 do werkzeug ocupa a CPU por dezenas de milissegundos. Em picos
+de login, calculá-los diretamente na thread da requisição deixa o worker sem
+CPU para as demais rotas. Aqui cada cálculo vai para um pool com no máximo
+``PASSWORD_HASH_WORKERS`` threads (o ``hashlib`` libera o GIL durante o
+cálculo). Até ``PASSWORD_HASH_QUEUE`` pedidos podem esperar por uma thread
+livre; além disso o pedido é recusado com ``PasswordHashBusy``, em vez de
+acumular requisições presas (as rotas respondem 503 com ``BUSY_MESSAGE``).
+Fora das requisições (``init_db``, comandos da CLI) o pedido usa
+``wait=True`` e espera por uma vaga em vez de ser recusado.
+
+``PASSWORD_HASH_METHOD`` define o algoritmo e o custo (no formato de
+``generate_password_hash``, ex.: ``scrypt:32768:8:1`` ou
+``pbkdf2:sha256:600000``). Hashes gravados com outros parâmetros continuam
+válidos e são refeitos no próximo login (ver ``needs_rehash``).
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class PasswordHashBusy(Exception):
+    """A fila de cálculos de hash está cheia."""
+
+
+# Mensagem exibida quando um cálculo de hash é recusado
+BUSY_MESSAGE = 'O sistema está com muitos acessos no momento. Tente novamente em alguns segundos.'
+
+
+class PasswordHasher:
+    """Pool limitado de cálculos de hash, com métricas de espera na fila."""
+
+    def __init__(self):
+        self.executor = None
+        self.workers = None
+        self.slots = None
+        self.lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+        self.waiting = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.hash_total = 0.0
+
+    def _start(self):
+        with self.lock:
+            if self.executor is None:
+                config = current_app.config
+                workers = self.workers = config['PASSWORD_HASH_WORKERS']
+                self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='passwords')
+                # Pedidos em execução mais os que podem esperar na fila
+                self.slots = threading.BoundedSemaphore(workers + config['PASSWORD_HASH_QUEUE'])
+        return self.executor
+
+    def run(self, func, *args, wait=False):
+        """
+        Executa ``func(*args)`` no pool e devolve o resultado, esperando por
+        ele. Levanta ``PasswordHashBusy`` se a fila estiver cheia, ou espera
+        por uma vaga com ``wait``.
+        """
+        executor = self._start()
+        if not self.slots.acquire(blocking=wait):
+            with self.lock:
+                self.rejected += 1
+            raise PasswordHashBusy()
+
+        submitted = time.monotonic()
+        with self.lock:
+            self.waiting += 1
+
+        def task():
+            started = time.monotonic()
+            with self.lock:
+                self.waiting -= 1
+                wait = started - submitted
+                self.wait_total += wait
+                self.wait_max = max(self.wait_max, wait)
+            try:
+                return func(*args)
+            finally:
+                with self.lock:
+                    self.completed += 1
+                    self.hash_total += time.monotonic() - started
+
+        try:
+            return executor.submit(task).result()
+        finally:
+            self.slots.release()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'workers': self.workers,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'waiting': self.waiting,
+                'avg_wait_ms': round(self.wait_total / self.completed * 1000, 2) if self.completed else None,
+                'max_wait_ms': round(self.wait_max * 1000, 2),
+                'avg_hash_ms': round(self.hash_total / self.completed * 1000, 2) if self.completed else None,
+            }
+
+
+hasher = PasswordHasher()
+
+# Prefixo gravado nos hashes ("método:parâmetros") para cada método configurado
+_prefixes = {}
+
+
+def hash_method():
+    return current_app.config['PASSWORD_HASH_METHOD']
+
+
+def method_prefix(method):
+    """
+    Prefixo que ``generate_password_hash`` grava para ``method``, já com os
+    parâmetros padrão preenchidos (ex.: ``scrypt`` -> ``scrypt:32768:8:1``).
+    Obtido gerando o hash de um valor qualquer, uma vez por método.
+    """
+    if method not in _prefixes:
+        _prefixes[method] = generate_password_hash('-', method).split('$', 1)[0]
+    return _prefixes[method]
+
+
+def hash_password(password, wait=False):
+    """Hash de ``password`` com o método configurado."""
+    return hasher.run(generate_password_hash, password, hash_method(), wait=wait)
+
+
+def verify_password(pwhash, password):
+    """Confere ``password`` com o hash gravado."""
+    return hasher.run(check_password_hash, pwhash, password)
+
+
+def needs_rehash(pwhash):
+    """O hash foi gerado com um método ou custo diferente do configurado."""
+    return pwhash.split('$', 1)[0] != method_prefix(hash_method())
+
+
+def password_stats():
+    """Métricas do pool de hashes deste worker."""
+    return dict(hasher.stats(), method=method_prefix(hash_method()))
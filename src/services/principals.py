@@ -0,0 +1,129 @@
+"""
+Usuário logado (``current_user``) sem carregar a linha de ``users`` a cada
+requisição.
+
+``load_user`` devolve um ``Principal`` com os campos usados nas verificações
+de permissão e nos templates (papel, ativo, nome...), guardados por
+``PRINCIPAL_CACHE_TTL`` segundos. Qualquer outro atributo (relacionamentos,
+``check_password``, ``set_password``...) carrega o ``User`` completo na
+primeira vez em que é usado na requisição.
+
+Alterações de um usuário incrementam o carimbo dele (``principal_version``)
+na mesma transação (ver ``track_changed_users``): em todos os workers, a
+requisição seguinte ao commit já recarrega o usuário (um usuário desativado
+perde o acesso imediatamente). Alterações só de ``last_login`` não contam.
+
+Compromisso: cada requisição autenticada ainda faz uma consulta, a do carimbo
+(pela chave primária de ``stat_counters``, junto com os carimbos de
+categorias e tags, que as listagens leriam de qualquer forma). Ela custa o
+mesmo que ler a linha do usuário; o ganho do cache é não montar o ``User``
+do ORM a cada requisição e não disputar a linha de ``users`` com as escritas
+de ``last_login``. A invalidação imediata em todos os workers é o motivo de
+mantê-la; sem ela, uma desativação só valeria após ``PRINCIPAL_CACHE_TTL``.
+"""
+from collections import namedtuple
+
+from flask import current_app
+from flask_login import UserMixin
+
+from sqlalchemy import inspect
+
+from src.models.stats import bump_version, principal_version
+from src.models.user import db, User
+from src.services.cache import TTLCache
+
+PrincipalData = namedtuple('PrincipalData', 'id username email full_name role active')
+
+
+class Principal(UserMixin):
+    """Usuário logado com os campos básicos em cache; o resto vem de ``user``."""
+
+    def __init__(self, data):
+        self._data = data
+        self._user = None
+
+    id = property(lambda self: self._data.id)
+    username = property(lambda self: self._data.username)
+    email = property(lambda self: self._data.email)
+    full_name = property(lambda self: self._data.full_name)
+    role = property(lambda self: self._data.role)
+    active = property(lambda self: self._data.active)
+    # Usuários desativados deixam de estar autenticados (login_required)
+    is_active = property(lambda self: self._data.active)
+
+    def is_admin(self):
+        return self.role == 'admin'
+
+    def is_editor(self):
+        return self.role == 'editor' or self.role == 'admin'
+
+    @property
+    def user(self):
+        """Registro ``User`` completo, carregado na primeira vez que é pedido."""
+        if self._user is None:
+            self._user = db.session.get(User, self.id)
+        return self._user
+
+    def __getattr__(self, name):
+        # Chamado apenas para atributos que não estão em cache
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+    def __repr__(self):
+        return f'<Principal {self.username}>'
+
+
+def _load_principal_data(user_id):
+    row = db.session.query(
+        User.id, User.username, User.email, User.full_name, User.role, User.active
+    ).filter(User.id == user_id).first()
+    return PrincipalData(*row) if row else None
+
+
+principal_cache = TTLCache(
+    'principals',
+    lambda: current_app.config['PRINCIPAL_CACHE_TTL'],
+    _load_principal_data,
+    version_key=principal_version
+)
+
+
+def load_principal(user_id):
+    """Principal do usuário ``user_id`` (ou ``None`` se não existir)."""
+    data = principal_cache.get(user_id)
+    return Principal(data) if data else None
+
+
+def invalidate(user_id):
+    principal_cache.invalidate(user_id)
+
+
+@db.event.listens_for(db.session, 'after_flush')
+def track_changed_users(session, flush_context):
+    """
+    Anota os usuários alterados ou excluídos na transação e incrementa o
+    carimbo de cada um, para que os demais workers os recarreguem.
+    """
+    changed = session.info.setdefault('changed_user_ids', set())
+    user_ids = {obj.id for obj in session.deleted if isinstance(obj, User)}
+    user_ids.update(obj.id for obj in session.dirty if isinstance(obj, User) and _principal_changed(obj))
+    for user_id in sorted(user_ids - changed):
+        bump_version(session.connection(), principal_version(user_id))
+    changed.update(user_ids)
+
+
+def _principal_changed(user):
+    """Alguma coluna além de ``last_login`` foi alterada (o histórico ainda não foi zerado no after_flush)."""
+    return any(attr.history.has_changes() for attr in inspect(user).attrs if attr.key != 'last_login')
+
+
+@db.event.listens_for(db.session, 'after_commit')
+def invalidate_changed_users(session):
+    for user_id in session.info.pop('changed_user_ids', ()):
+        invalidate(user_id)
+
+
+@db.event.listens_for(db.session, 'after_rollback')
+def discard_changed_users(session):
+    session.info.pop('changed_user_ids', None)
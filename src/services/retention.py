@@ -0,0 +1,135 @@
+"""
+Política de retenção do histórico de versões dos artigos.
+
+Por padrão (configurável):
+
+- versões dos últimos ``VERSION_RETENTION_KEEP_ALL_DAYS`` dias: todas;
+- até ``VERSION_RETENTION_DAILY_DAYS`` dias: a última versão de cada dia;
+- mais antigas: a última versão de cada mês.
+
+Sempre são mantidas a versão mais recente, as versões em que o status mudou
+e as ligadas a entradas de criação ou mudança de status no histórico. As
+versões mantidas têm a cadeia de deltas regravada (nenhuma passa a depender
+de uma versão removida) e as entradas "update" do histórico das versões
+removidas também são excluídas. Executado por ``flask versions retention``,
+um artigo por transação.
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from src.models.article import ArticleHistory
+from src.models.article_version import ArticleVersion
+from src.models.user import db
+from src.services.version_store import load_history, reencode, remove_versions, stored_size
+
+RetentionPolicy = namedtuple('RetentionPolicy', 'keep_all_days daily_days')
+RetentionResult = namedtuple('RetentionResult', 'versions_removed history_removed bytes_reclaimed')
+
+# Ações do histórico cujas versões nunca são removidas
+PROTECTED_ACTIONS = ('create', 'status_change')
+
+
+def configured_policy():
+    config = current_app.config
+    return RetentionPolicy(config['VERSION_RETENTION_KEEP_ALL_DAYS'], config['VERSION_RETENTION_DAILY_DAYS'])
+
+
+def versions_to_keep(versions, policy, now, protected_ids=()):
+    """
+    Ids das versões mantidas pela política.
+
+    Args:
+        versions: Versões do artigo em ordem de número
+        policy: RetentionPolicy
+        now: Data de referência (UTC)
+        protected_ids: Versões que não podem ser removidas
+    """
+    keep = set(protected_ids)
+    if not versions:
+        return keep
+    keep.add(versions[-1].id)
+
+    keep_all_since = now - timedelta(days=policy.keep_all_days)
+    daily_since = now - timedelta(days=policy.daily_days)
+    last_of_period = {}
+    previous_status = None
+    for version in versions:
+        if version.status != previous_status:
+            keep.add(version.id)
+        previous_status = version.status
+
+        created_at = version.created_at
+        if created_at is None or created_at >= keep_all_since:
+            keep.add(version.id)
+        elif created_at >= daily_since:
+            last_of_period[('dia', created_at.date())] = version.id
+        else:
+            last_of_period[('mês', created_at.year, created_at.month)] = version.id
+    keep.update(last_of_period.values())
+    return keep
+
+
+def apply_retention(article_id, policy=None, now=None, dry_run=False):
+    """
+    Aplica a política ao histórico do artigo (uma transação). Com
+    ``dry_run``, calcula o resultado e desfaz tudo.
+
+    Returns:
+        RetentionResult
+    """
+    policy = policy or configured_policy()
+    now = now or datetime.utcnow()
+
+    versions = load_history(article_id)
+    protected_ids = {
+        version_id for (version_id,) in db.session.query(ArticleHistory.version_id).filter(
+            ArticleHistory.article_id == article_id,
+            ArticleHistory.action.in_(PROTECTED_ACTIONS),
+            ArticleHistory.version_id.isnot(None)
+        )
+    }
+    keep_ids = versions_to_keep(versions, policy, now, protected_ids)
+    kept = [version for version in versions if version.id in keep_ids]
+    if len(kept) == len(versions):
+        db.session.rollback()
+        return RetentionResult(0, 0, 0)
+
+    # Cada versão removida é substituída pela mantida imediatamente anterior
+    # (a primeira versão sempre é mantida: o status "muda" nela)
+    replaced_by = {}
+    last_kept = None
+    for version in versions:
+        if version.id in keep_ids:
+            last_kept = version
+        else:
+            replaced_by[version.id] = (last_kept or kept[0]).id
+
+    before = sum(stored_size(version) for version in versions)
+    reencode(kept)
+    after = sum(stored_size(version) for version in kept)
+
+    if dry_run:
+        with db.session.no_autoflush:
+            history_removed = ArticleHistory.query.filter(
+                ArticleHistory.version_id.in_(list(replaced_by)), ArticleHistory.action == 'update'
+            ).count()
+        db.session.rollback()
+    else:
+        history_removed = remove_versions(replaced_by)
+        db.session.commit()
+    return RetentionResult(len(replaced_by), history_removed, before - after)
+
+
+def candidate_articles(policy=None, now=None, after_id=0, limit=None):
+    """Artigos com versões anteriores ao período em que tudo é mantido, em ordem de id."""
+    policy = policy or configured_policy()
+    now = now or datetime.utcnow()
+    query = db.session.query(ArticleVersion.article_id).filter(
+        ArticleVersion.created_at < now - timedelta(days=policy.keep_all_days),
+        ArticleVersion.article_id > after_id
+    ).distinct().order_by(ArticleVersion.article_id)
+    if limit:
+        query = query.limit(limit)
+    return [article_id for (article_id,) in query]
@@ -0,0 +1,99 @@
+"""
+Busca textual de artigos.
+
+No PostgreSQL a busca usa a coluna ``articles.search_vector`` (tsvector com a
+configuração ``portuguese``, mantida por trigger e indexada com GIN), ordena os
+resultados por ``ts_rank`` (arredondado para ``numeric``, para a paginação
+por cursor) e gera trechos destacados com ``ts_headline``.
+Em outros bancos (ex.: SQLite em desenvolvimento) mantém a busca por ``ILIKE``
+no título e no conteúdo.
+"""
+import re
+from html import unescape
+
+from markupsafe import Markup, escape
+
+from src.models.user import db
+from src.models.article import Article
+
+SEARCH_CONFIG = 'portuguese'
+
+# Marcadores neutros usados pelo ts_headline; são trocados por <mark> depois
+# que o trecho é escapado, para que o HTML do artigo nunca vaze no resultado.
+_HIGHLIGHT_START = '[[hl]]'
+_HIGHLIGHT_STOP = '[[/hl]]'
+_HEADLINE_OPTIONS = (
+    f'StartSel="{_HIGHLIGHT_START}", StopSel="{_HIGHLIGHT_STOP}", '
+    'MaxWords=35, MinWords=15, MaxFragments=2, FragmentDelimiter=" … "'
+)
+
+
+def uses_full_text():
+    """Indica se o banco atual suporta a busca textual do PostgreSQL."""
+    return db.engine.dialect.name == 'postgresql'
+
+
+def build_tsquery(text):
+    """
+    Monta um tsquery com prefixo para cada termo digitado
+    (``impres`` encontra ``impressora``), já que a busca é submetida
+    enquanto o usuário digita.
+    """
+    terms = re.findall(r'\w+', text or '')
+    if not terms:
+        return None
+    return db.func.to_tsquery(SEARCH_CONFIG, ' & '.join(f'{term}:*' for term in terms))
+
+
+def apply_search(query, text):
+    """
+    Aplica o filtro de busca à query de artigos.
+
+    Returns:
+        Tupla ``(query, rank)``; ``rank`` é a expressão de relevância a ser
+        usada na ordenação ou ``None`` quando não há ranking disponível.
+    """
+    if not uses_full_text():
+        pattern = f'%{text}%'
+        return query.filter(
+            db.or_(
+                Article.title.ilike(pattern),
+                Article.content.ilike(pattern)
+            )
+        ), None
+
+    tsquery = build_tsquery(text)
+    if tsquery is None:
+        return query, None
+
+    # ts_rank é float4: arredondado para numeric, o valor volta exato do
+    # cursor e empates no limite da página são desfeitos por (updated_at, id)
+    rank = db.cast(db.func.ts_rank(Article.search_vector, tsquery), db.Numeric(10, 6))
+    return query.filter(Article.search_vector.op('@@')(tsquery)), rank
+
+
+def search_snippets(article_ids, text):
+    """
+    Gera trechos destacados apenas para os artigos exibidos na página.
+
+    Returns:
+        Dicionário ``{article_id: Markup}``; vazio fora do PostgreSQL.
+    """
+    if not article_ids or not uses_full_text():
+        return {}
+
+    tsquery = build_tsquery(text)
+    if tsquery is None:
+        return {}
+
+    plain_text = db.func.regexp_replace(Article.content, '<[^>]*>', ' ', 'g')
+    headline = db.func.ts_headline(SEARCH_CONFIG, plain_text, tsquery, _HEADLINE_OPTIONS)
+    rows = db.session.query(Article.id, headline).filter(Article.id.in_(article_ids)).all()
+    return {article_id: _render_snippet(fragment) for article_id, fragment in rows}
+
+
+def _render_snippet(fragment):
+    escaped = str(escape(unescape(fragment or '')))
+    return Markup(
+        escaped.replace(_HIGHLIGHT_START, '<mark>').replace(_HIGHLIGHT_STOP, '</mark>')
+    )
@@ -0,0 +1,60 @@
+"""
+Leitura e reconciliação dos contadores do painel (``StatCounter``).
+"""
+from src.models.stats import StatCounter, COUNTED_MODELS, ARTICLE_STATUSES, article_status_counter
+from src.models.article import Article
+from src.models.user import db
+
+COUNTER_NAMES = tuple(COUNTED_MODELS) + tuple(article_status_counter(s) for s in ARTICLE_STATUSES)
+
+
+def get_counters():
+    """Valores de todos os contadores em uma consulta (contadores ausentes valem 0)."""
+    rows = db.session.query(StatCounter.name, StatCounter.value).filter(
+        StatCounter.name.in_(COUNTER_NAMES)
+    ).all()
+    counters = dict.fromkeys(COUNTER_NAMES, 0)
+    counters.update(rows)
+    return counters
+
+
+def actual_counts():
+    """Contagens reais nas tabelas (consulta cara; usada só na reconciliação)."""
+    counts = {
+        name: db.session.query(db.func.count()).select_from(model).scalar()
+        for name, model in COUNTED_MODELS.items()
+    }
+    by_status = dict(
+        db.session.query(Article.status, db.func.count()).group_by(Article.status).all()
+    )
+    for status in ARTICLE_STATUSES:
+        counts[article_status_counter(status)] = by_status.get(status, 0)
+    return counts
+
+
+def reconcile():
+    """
+    Recalcula os contadores e corrige os divergentes (criando os ausentes).
+
+    As linhas dos contadores são travadas antes da contagem, para que nenhuma
+    transação concorrente os altere entre a contagem e a correção.
+
+    Returns:
+        Dicionário ``{nome: (valor_anterior, valor_correto)}`` dos corrigidos
+    """
+    stored = {
+        counter.name: counter
+        for counter in StatCounter.query.filter(StatCounter.name.in_(COUNTER_NAMES))
+        .order_by(StatCounter.name).with_for_update()
+    }
+    fixed = {}
+    for name, value in actual_counts().items():
+        counter = stored.get(name)
+        if counter is None:
+            db.session.add(StatCounter(name=name, value=value))
+            fixed[name] = (None, value)
+        elif counter.value != value:
+            fixed[name] = (counter.value, value)
+            counter.value = value
+    db.session.commit()
+    return fixed
@@ -0,0 +1,84 @@
+"""
+Extração de texto simples do HTML dos artigos (gerado pelo Summernote).
+"""
+import hashlib
+import re
+from html.parser import HTMLParser
+
+# Tamanho máximo do resumo exibido nos cartões das listagens
+EXCERPT_LENGTH = 280
+
+# Elementos cujo conteúdo não é texto visível
+SKIPPED_TAGS = {'script', 'style', 'head', 'title'}
+
+# Elementos que quebram o texto (viram espaço entre as palavras)
+BLOCK_TAGS = {
+    'address', 'article', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'figcaption',
+    'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'ol', 'p',
+    'pre', 'section', 'table', 'td', 'th', 'tr', 'ul',
+}
+
+
+class TextExtractor(HTMLParser):
+    """Acumula o texto visível; imagens (inclusive base64 no ``src``) são ignoradas."""
+
+    def __init__(self, limit=None):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.length = 0
+        self.limit = limit
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self.skipping += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append(' ')
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS and self.skipping:
+            self.skipping -= 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append(' ')
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(data)
+            self.length += len(data)
+
+    @property
+    def full(self):
+        """Já há texto suficiente para o limite pedido."""
+        return self.limit is not None and self.length > self.limit * 2
+
+    def text(self):
+        return re.sub(r'\s+', ' ', ''.join(self.parts)).strip()
+
+
+def html_to_text(html, limit=None):
+    """
+    Texto visível de ``html`` com espaços normalizados. Com ``limit``, a
+    leitura para assim que houver texto suficiente para esse tamanho.
+    """
+    extractor = TextExtractor(limit)
+    # Alimenta em partes para poder parar cedo em conteúdos grandes
+    for start in range(0, len(html or ''), 8192):
+        extractor.feed(html[start:start + 8192])
+        if extractor.full:
+            break
+    extractor.close()
+    return extractor.text()
+
+
+def make_excerpt(html, length=EXCERPT_LENGTH):
+    """Resumo de até ``length`` caracteres, cortado no fim de uma palavra."""
+    text = html_to_text(html, limit=length)
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(' ', 1)[0] or text[:length]
+    return cut.rstrip(' .,;:') + '…'
+
+
+def content_hash(html):
+    """SHA-256 (hex) do HTML, para detectar salvamentos sem alteração."""
+    return hashlib.sha256((html or '').encode('utf-8')).hexdigest()
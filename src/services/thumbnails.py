@@ -0,0 +1,207 @@
+"""
+Miniaturas de imagens e da primeira página de PDFs.
+
+As miniaturas são geradas fora da requisição, em um pool de threads
+(``THUMBNAIL_WORKERS``), e gravadas como JPEG no repositório de blobs em disco
+(endereçado pelo SHA-256, ver ``FilesystemStorage``). O registro do arquivo
+guarda ``thumbnail_hash`` e ``thumbnail_status``; as listagens exibem a
+miniatura por ``/files/thumb/<id>``, que é pequena e pode ficar em cache.
+
+Imagens usam o Pillow; PDFs também exigem o PyMuPDF, que é opcional e não está
+em requirements.txt (sem ele, PDFs continuam sem miniatura). O PDF é aberto
+pelo caminho do arquivo, sem ser lido inteiro para a memória.
+
+Trabalhos perdidos (ex.: reinício do processo) ficam como ``pending`` e são
+refeitos por ``flask files thumbnails``.
+"""
+import io
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from src.models.file import File
+from src.models.user import db
+from src.services.file_storage import FilesystemStorage, storage_for
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - Pillow é dependência da aplicação
+    Image = None
+
+try:
+    import pymupdf
+except ImportError:
+    pymupdf = None
+
+THUMBNAIL_MIME_TYPE = 'image/jpeg'
+THUMBNAIL_QUALITY = 80
+
+# Conteúdo de arquivos no banco é copiado para a memória até este tamanho e,
+# acima disso, para um temporário (Pillow e PyMuPDF precisam de acesso aleatório)
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Pool de threads das miniaturas, criado no primeiro uso."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config['THUMBNAIL_WORKERS'],
+                thread_name_prefix='thumbnails'
+            )
+    return _executor
+
+
+def supports(file):
+    """Indica se é possível gerar miniatura para o tipo do arquivo."""
+    if Image is None:
+        return False
+    if file.is_image:
+        return True
+    return file.is_pdf and pymupdf is not None
+
+
+def mark_pending(file):
+    """Marca ``file`` para ter miniatura, se houver suporte ao tipo."""
+    if supports(file):
+        file.thumbnail_status = 'pending'
+
+
+def schedule(file):
+    """
+    Agenda a geração da miniatura de ``file``, marcado com ``mark_pending`` e
+    já confirmado no banco (o pool lê o registro em outra sessão).
+    """
+    if file.thumbnail_status != 'pending':
+        return None
+    app = current_app._get_current_object()
+    return get_executor().submit(generate_in_context, app, file.id)
+
+
+def generate_in_context(app, file_id):
+    """Gera a miniatura em um contexto de aplicação próprio (usado pelo pool)."""
+    with app.app_context():
+        file = db.session.get(File, file_id)
+        return file is not None and generate(file)
+
+
+def generate(file):
+    """
+    Gera a miniatura de ``file`` e atualiza o registro.
+
+    Returns:
+        ``True`` se a miniatura foi gerada
+    """
+    try:
+        with _open_source(file) as source:
+            if file.is_pdf:
+                image = _render_pdf_page(source)
+            else:
+                image = Image.open(source)
+                # Para JPEG, decodifica já reduzido (bem menos memória e CPU)
+                image.draft('RGB', _box())
+                image = ImageOps.exif_transpose(image)
+            thumbnail = _encode(image)
+        content_hash, _ = FilesystemStorage().write_blob(thumbnail)
+    except Exception:
+        current_app.logger.exception('Falha ao gerar miniatura do arquivo %s', file.id)
+        File.query.filter_by(id=file.id).update({'thumbnail_status': 'failed'})
+        db.session.commit()
+        return False
+
+    File.query.filter_by(id=file.id).update({
+        'thumbnail_hash': content_hash,
+        'thumbnail_status': 'ready'
+    })
+    db.session.commit()
+    return True
+
+
+def _box():
+    size = current_app.config['THUMBNAIL_SIZE']
+    return size, size
+
+
+def _open_source(file):
+    """
+    Conteúdo do arquivo com acesso aleatório (arquivo em disco ou cópia
+    temporária). PDFs no banco sempre vão para um temporário em disco, que o
+    PyMuPDF abre pelo caminho.
+    """
+    storage = storage_for(file)
+    if isinstance(storage, FilesystemStorage):
+        return storage.open(file)
+    if file.is_pdf:
+        copy = tempfile.NamedTemporaryFile(suffix='.pdf')
+    else:
+        copy = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    shutil.copyfileobj(storage.open(file), copy)
+    copy.flush()
+    copy.seek(0)
+    return copy
+
+
+def _render_pdf_page(source):
+    """
+    Primeira página do PDF como imagem, na escala da miniatura. O PDF é aberto
+    pelo caminho de ``source``.
+    """
+    with pymupdf.open(source.name, filetype='pdf') as document:
+        page = document[0]
+        width, height = _box()
+        zoom = min(width / page.rect.width, height / page.rect.height)
+        pixmap = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+        return Image.frombytes('RGB', (pixmap.width, pixmap.height), pixmap.samples)
+
+
+def _encode(image):
+    """Reduz ``image`` à caixa da miniatura e codifica em JPEG."""
+    image.thumbnail(_box())
+    if image.mode in ('RGBA', 'LA', 'P'):
+        # Transparência sobre fundo branco
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True)
+    output.seek(0)
+    return output
+
+
+def thumbnail_path(file):
+    """Caminho absoluto da miniatura pronta de ``file``, ou ``None``."""
+    if file.thumbnail_status != 'ready' or not file.thumbnail_hash:
+        return None
+    storage = FilesystemStorage()
+    path = storage.resolve(storage.blob_key(file.thumbnail_hash))
+    return path if os.path.exists(path) else None
+
+
+def delete(file):
+    """
+    Agenda a remoção do blob da miniatura para depois do commit; como no
+    conteúdo dos arquivos, ele só é removido se nada mais o referenciar.
+    """
+    if file.thumbnail_hash:
+        FilesystemStorage.discard(FilesystemStorage.blob_key(file.thumbnail_hash))
+
+
+def pending_files(include_failed=False):
+    """Consulta dos arquivos com suporte a miniatura ainda sem ela."""
+    statuses = ['pending', 'failed'] if include_failed else ['pending']
+    types = ['application/pdf'] if pymupdf is not None else []
+    return File.query.filter(
+        db.or_(File.thumbnail_status.is_(None), File.thumbnail_status.in_(statuses)),
+        db.or_(File.file_type.like('image/%'), File.file_type.in_(types))
+    ).order_by(File.id)
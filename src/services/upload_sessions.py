@@ -0,0 +1,218 @@
+"""
+Envios retomáveis em pedaços (``/files/uploads``).
+
+Os pedaços ficam em ``UPLOAD_FOLDER/sessions/<id>/<n>.part``. Cada pedaço é
+gravado em um temporário e renomeado só depois de recebido por completo, então
+um pedaço interrompido nunca aparece como recebido e reenviar o mesmo número
+apenas o substitui. Ao finalizar, os pedaços são lidos em sequência por
+``receive_upload`` (tamanho, SHA-256 e tipo) e entregues ao backend de
+armazenamento como um envio comum.
+"""
+import hashlib
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from src.models.file import UploadSession
+from src.models.user import db
+from src.services.uploads import UPLOAD_BUFFER_SIZE
+
+
+class ChunkError(ValueError):
+    """Pedaço inválido (número fora da sessão, tamanho ou checksum divergente)."""
+
+
+def sessions_dir():
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], 'sessions')
+
+
+def session_dir(upload_session):
+    return os.path.join(sessions_dir(), upload_session.id)
+
+
+def chunk_path(upload_session, number):
+    return os.path.join(session_dir(upload_session), f'{number}.part')
+
+
+def create_session(user_id, original_filename, total_size, description='', article_id=None, reference_text=''):
+    """Cria a sessão e o diretório dos pedaços."""
+    upload_session = UploadSession(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        original_filename=original_filename,
+        description=description,
+        article_id=article_id,
+        reference_text=reference_text,
+        total_size=total_size,
+        chunk_size=current_app.config['UPLOAD_CHUNK_SIZE']
+    )
+    db.session.add(upload_session)
+    db.session.commit()
+    os.makedirs(session_dir(upload_session), exist_ok=True)
+    return upload_session
+
+
+def write_chunk(upload_session, number, stream, checksum=None):
+    """
+    Grava o pedaço ``number`` lendo ``stream`` em blocos.
+
+    Args:
+        checksum: SHA-256 (hexadecimal) opcional enviado pelo cliente
+
+    Raises:
+        ChunkError: número fora da sessão, tamanho diferente do esperado ou
+            checksum divergente (o pedaço é descartado)
+    """
+    if not 0 <= number < upload_session.total_chunks:
+        raise ChunkError(f'Pedaço {number} fora da sessão (0 a {upload_session.total_chunks - 1})')
+
+    expected = upload_session.expected_chunk_size(number)
+    directory = session_dir(upload_session)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f'{number}.{uuid.uuid4().hex}.tmp')
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, 'wb') as tmp:
+            while size <= expected:
+                data = stream.read(UPLOAD_BUFFER_SIZE)
+                if not data:
+                    break
+                tmp.write(data)
+                digest.update(data)
+                size += len(data)
+
+        if size != expected:
+            raise ChunkError(f'Pedaço {number} com {size} bytes; esperado {expected}')
+        if checksum and checksum.lower() != digest.hexdigest():
+            raise ChunkError(f'Checksum do pedaço {number} não confere')
+
+        os.replace(tmp_path, chunk_path(upload_session, number))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return size
+
+
+def received_chunks(upload_session):
+    """Números dos pedaços já recebidos, em ordem."""
+    directory = session_dir(upload_session)
+    if not os.path.isdir(directory):
+        return []
+    numbers = []
+    for name in os.listdir(directory):
+        stem, _, extension = name.partition('.')
+        if extension == 'part' and stem.isdigit():
+            numbers.append(int(stem))
+    return sorted(numbers)
+
+
+def received_ranges(upload_session, chunks=None):
+    """
+    Intervalos de bytes recebidos, como listas ``[início, fim]`` inclusivas
+    (mesma convenção do cabeçalho Range), com pedaços contíguos unidos.
+    """
+    if chunks is None:
+        chunks = received_chunks(upload_session)
+    ranges = []
+    for number in chunks:
+        start = number * upload_session.chunk_size
+        end = start + upload_session.expected_chunk_size(number) - 1
+        if ranges and ranges[-1][1] + 1 == start:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
+    return ranges
+
+
+def session_status(upload_session):
+    """Estado da sessão para a API (pedaços recebidos, faltantes e intervalos)."""
+    chunks = received_chunks(upload_session)
+    received = set(chunks)
+    return {
+        'session_id': upload_session.id,
+        'filename': upload_session.original_filename,
+        'total_size': upload_session.total_size,
+        'chunk_size': upload_session.chunk_size,
+        'total_chunks': upload_session.total_chunks,
+        'received': chunks,
+        'missing': [n for n in range(upload_session.total_chunks) if n not in received],
+        'ranges': received_ranges(upload_session, chunks),
+        'completed': upload_session.completed_at is not None,
+        'file_id': upload_session.file_id
+    }
+
+
+class ChunkSequenceReader:
+    """Objeto tipo arquivo (``read``) que lê os pedaços da sessão em ordem."""
+
+    def __init__(self, upload_session):
+        self.paths = [chunk_path(upload_session, n) for n in range(upload_session.total_chunks)]
+        self.current = None
+
+    def read(self, size=-1):
+        while self.paths or self.current:
+            if self.current is None:
+                self.current = open(self.paths.pop(0), 'rb')
+            data = self.current.read(size)
+            if data:
+                return data
+            self.current.close()
+            self.current = None
+        return b''
+
+    def close(self):
+        if self.current is not None:
+            self.current.close()
+            self.current = None
+
+
+def discard_parts(upload_session):
+    """Remove o diretório dos pedaços da sessão."""
+    shutil.rmtree(session_dir(upload_session), ignore_errors=True)
+
+
+def _modified_before(path, cutoff):
+    try:
+        return datetime.utcfromtimestamp(os.path.getmtime(path)) < cutoff
+    except FileNotFoundError:
+        return False
+
+
+def collect_garbage(now=None):
+    """
+    Remove as sessões criadas há mais de ``UPLOAD_SESSION_TTL_HOURS``
+    (concluídas ou abandonadas), com seus pedaços, e diretórios de pedaços
+    sem sessão em andamento correspondente e sem alteração no mesmo período.
+
+    Os pedaços de uma sessão concluída já são apagados ao finalizar; o
+    registro é mantido até expirar para que uma nova chamada de finalização
+    (ex.: após perda da resposta) devolva o mesmo arquivo.
+
+    Returns:
+        Quantidade de sessões removidas
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(hours=current_app.config['UPLOAD_SESSION_TTL_HOURS'])
+    expired = UploadSession.query.filter(UploadSession.created_at < cutoff).all()
+    for upload_session in expired:
+        discard_parts(upload_session)
+        db.session.delete(upload_session)
+    db.session.commit()
+
+    directory = sessions_dir()
+    if os.path.isdir(directory):
+        known = {
+            session_id for (session_id,) in
+            db.session.query(UploadSession.id).filter(UploadSession.completed_at.is_(None))
+        }
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            # Diretórios recentes podem ser de sessões criadas depois da consulta
+            if name not in known and _modified_before(path, cutoff):
+                shutil.rmtree(path, ignore_errors=True)
+    return len(expired)
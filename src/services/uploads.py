@@ -0,0 +1,96 @@
+"""
+Recebimento de arquivos enviados.
+
+O conteúdo é copiado em blocos para um temporário em ``UPLOAD_FOLDER/tmp``
+enquanto o tamanho e o SHA-256 são calculados e o tipo é identificado pelos
+primeiros bytes (assinatura), sem nunca manter o arquivo inteiro em memória.
+Depois o temporário é entregue ao backend de armazenamento
+(``save_upload``), que o move ou copia para o destino final.
+"""
+import hashlib
+import os
+import tempfile
+
+from flask import current_app
+
+# Tamanho dos blocos copiados do stream da requisição
+UPLOAD_BUFFER_SIZE = 64 * 1024
+
+# Assinaturas (magic bytes) dos tipos aceitos
+MAGIC_SIGNATURES = (
+    (b'%PDF-', 'application/pdf'),
+    (b'PK\x03\x04', 'application/zip'),
+    (b'PK\x05\x06', 'application/zip'),  # ZIP vazio
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+SNIFF_LENGTH = max(len(signature) for signature, _ in MAGIC_SIGNATURES)
+
+
+def sniff_mime_type(head):
+    """Tipo MIME pelos primeiros bytes do conteúdo, ou ``None`` se desconhecido."""
+    for signature, mime_type in MAGIC_SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    return None
+
+
+class ReceivedUpload:
+    """
+    Arquivo recebido em um temporário, com tamanho, SHA-256 e tipo já
+    calculados. Usado como gerenciador de contexto: o temporário é removido
+    na saída, caso o backend não o tenha movido.
+    """
+
+    def __init__(self, path, size, content_hash, mime_type):
+        self.path = path
+        self.size = size
+        self.content_hash = content_hash
+        self.mime_type = mime_type
+
+    def open(self):
+        return open(self.path, 'rb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def temp_upload_dir():
+    """Diretório de temporários, no mesmo sistema de arquivos dos blobs."""
+    tmp_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+    return tmp_dir
+
+
+def receive_upload(stream):
+    """
+    Copia ``stream`` em blocos para um temporário.
+
+    Returns:
+        ReceivedUpload com caminho, tamanho, SHA-256 e tipo identificado
+    """
+    digest = hashlib.sha256()
+    size = 0
+    head = b''
+    fd, path = tempfile.mkstemp(dir=temp_upload_dir(), suffix='.upload')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            while True:
+                data = stream.read(UPLOAD_BUFFER_SIZE)
+                if not data:
+                    break
+                if len(head) < SNIFF_LENGTH:
+                    head += data[:SNIFF_LENGTH - len(head)]
+                tmp.write(data)
+                digest.update(data)
+                size += len(data)
+    except BaseException:
+        os.remove(path)
+        raise
+    return ReceivedUpload(path, size, digest.hexdigest(), sniff_mime_type(head))
@@ -0,0 +1,218 @@
+"""
+Cadastro de usuários em lote (arquivo CSV ou JSON).
+
+Todas as linhas são validadas antes de gravar: campos obrigatórios, nomes e
+e-mails repetidos dentro do próprio arquivo e já existentes no banco (uma
+única consulta para o lote inteiro). Na CLI, os hashes das senhas são
+calculados em um pool de processos (o custo do scrypt/pbkdf2 é todo de CPU);
+na rota, um por vez no pool limitado de ``src.services.passwords``, para não
+tirar a CPU do worker dos logins. Os usuários válidos são inseridos em uma
+única transação.
+
+Formato (CSV com cabeçalho, separado por vírgula ou ponto e vírgula, ou JSON
+com uma lista de objetos ou ``{"users": [...]}``)::
+
+    username,email,full_name,role,active,password
+    maria,maria@example.com,Maria Souza,editor,1,senha-inicial
+"""
+import csv
+import io
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from flask import current_app
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+
+from src.models.user import db, User
+from src.services.passwords import hasher
+
+FIELDS = ('username', 'email', 'full_name', 'role', 'active', 'password')
+ROLES = ('admin', 'editor', 'user', 'viewer')
+DEFAULT_ROLE = 'user'
+
+# Valores aceitos como "falso" na coluna active (vazio = ativo)
+FALSE_VALUES = {'0', 'false', 'f', 'nao', 'não', 'n', 'no', 'inativo'}
+
+
+class ImportFormatError(ValueError):
+    """O arquivo não pôde ser lido como CSV ou JSON de usuários."""
+
+
+def parse_rows(data, fmt=None, filename=None):
+    """
+    Lê as linhas de ``data`` (bytes ou texto). O formato vem de ``fmt``
+    ('csv'/'json') ou da extensão de ``filename``; sem nenhum dos dois,
+    conteúdo começando com ``[`` ou ``{`` é tratado como JSON.
+
+    Returns:
+        Lista de dicionários com os campos de ``FIELDS`` (texto)
+    """
+    if isinstance(data, bytes):
+        try:
+            data = data.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            data = data.decode('latin-1')
+
+    if fmt is None and filename:
+        fmt = os.path.splitext(filename)[1].lstrip('.').lower() or None
+    if fmt is None:
+        fmt = 'json' if data.lstrip()[:1] in ('[', '{') else 'csv'
+
+    if fmt == 'json':
+        try:
+            items = json.loads(data)
+        except ValueError as e:
+            raise ImportFormatError(f'JSON inválido: {e}')
+        if isinstance(items, dict):
+            items = items.get('users')
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            raise ImportFormatError('O JSON deve ser uma lista de objetos ou {"users": [...]}.')
+    elif fmt == 'csv':
+        try:
+            dialect = csv.Sniffer().sniff(data[:4096], delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        items = list(csv.DictReader(io.StringIO(data), dialect=dialect))
+    else:
+        raise ImportFormatError(f'Formato não suportado: {fmt}')
+
+    return [
+        {field: str(item.get(field) if item.get(field) is not None else '').strip() for field in FIELDS}
+        for item in items
+    ]
+
+
+def hash_passwords(passwords, method, processes=None):
+    """
+    Hashes de ``passwords``. Sem ``processes`` (requisições), são calculados
+    um por vez no pool limitado de hashes do worker, ocupando no máximo uma
+    das suas threads; levanta ``PasswordHashBusy`` se a fila estiver cheia.
+
+    Com ``processes`` (CLI), são calculados em paralelo nesse número de
+    processos, iniciados com ``spawn`` (não herdam conexões do banco nem
+    threads do worker) e que só importam o werkzeug.
+    """
+    if not processes:
+        return [hasher.run(generate_password_hash, password, method) for password in passwords]
+    if len(passwords) <= 1:
+        return [generate_password_hash(password, method) for password in passwords]
+    processes = min(processes, len(passwords))
+    with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn')) as pool:
+        chunksize = max(1, len(passwords) // (processes * 4))
+        return list(pool.map(generate_password_hash, passwords, repeat(method), chunksize=chunksize))
+
+
+def _validate(rows):
+    """Relatório inicial de cada linha, com os erros que não dependem do banco."""
+    report = []
+    seen_usernames = set()
+    seen_emails = set()
+    for line, row in enumerate(rows, start=1):
+        entry = {'line': line, 'username': row['username'], 'email': row['email'],
+                 'status': 'error', 'message': None}
+        report.append(entry)
+
+        if not row['username']:
+            entry['message'] = 'O nome de usuário é obrigatório.'
+        elif ' ' in row['username']:
+            entry['message'] = 'O nome de usuário não pode conter espaços.'
+        elif not row['email']:
+            entry['message'] = 'O e-mail é obrigatório.'
+        elif not row['password']:
+            entry['message'] = 'A senha é obrigatória.'
+        elif row['role'] and row['role'] not in ROLES:
+            entry['message'] = f'Função inválida: {row["role"]}.'
+        elif row['username'] in seen_usernames:
+            entry['message'] = 'Nome de usuário repetido no arquivo.'
+        elif row['email'] in seen_emails:
+            entry['message'] = 'E-mail repetido no arquivo.'
+        else:
+            entry['status'] = 'ok'
+
+        seen_usernames.add(row['username'])
+        seen_emails.add(row['email'])
+    return report
+
+
+def import_users(rows, dry_run=False, processes=None):
+    """
+    Valida e cadastra os usuários de ``rows`` (ver ``parse_rows``). As linhas
+    com erro são ignoradas; as demais são gravadas juntas em uma transação.
+
+    Args:
+        rows: Linhas lidas do arquivo
+        dry_run: Apenas valida, sem calcular hashes nem gravar
+        processes: Processos para os hashes (ver ``hash_passwords``)
+
+    Returns:
+        Lista com uma entrada por linha: ``line``, ``username``, ``email``,
+        ``status`` ('created', 'valid' no dry_run, ou 'error') e ``message``
+    """
+    max_rows = current_app.config['USER_IMPORT_MAX_ROWS']
+    if len(rows) > max_rows:
+        raise ImportFormatError(f'O arquivo tem {len(rows)} linhas; o máximo é {max_rows}.')
+
+    report = _validate(rows)
+    candidates = [(entry, row) for entry, row in zip(report, rows) if entry['status'] == 'ok']
+
+    # Nomes e e-mails já cadastrados, em uma consulta para o lote inteiro
+    if candidates:
+        usernames = {row['username'] for _, row in candidates}
+        emails = {row['email'] for _, row in candidates}
+        existing = db.session.query(User.username, User.email).filter(
+            or_(User.username.in_(usernames), User.email.in_(emails))
+        ).all()
+        taken_usernames = {username for username, _ in existing}
+        taken_emails = {email for _, email in existing}
+        for entry, row in candidates:
+            if row['username'] in taken_usernames:
+                entry.update(status='error', message='Este nome de usuário já está em uso.')
+            elif row['email'] in taken_emails:
+                entry.update(status='error', message='Este e-mail já está em uso.')
+        candidates = [(entry, row) for entry, row in candidates if entry['status'] == 'ok']
+
+    if dry_run or not candidates:
+        for entry, _ in candidates:
+            entry['status'] = 'valid'
+        return report
+
+    hashes = hash_passwords([row['password'] for _, row in candidates],
+                            current_app.config['PASSWORD_HASH_METHOD'], processes)
+    users = [
+        User(
+            username=row['username'],
+            email=row['email'],
+            full_name=row['full_name'] or None,
+            role=row['role'] or DEFAULT_ROLE,
+            active=row['active'].lower() not in FALSE_VALUES,
+            password_hash=password_hash,
+        )
+        for (_, row), password_hash in zip(candidates, hashes)
+    ]
+    db.session.add_all(users)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Outro cadastro com o mesmo nome ou e-mail entre a consulta e o
+        # commit; nada do lote é gravado
+        db.session.rollback()
+        for entry, _ in candidates:
+            entry['message'] = 'Conflito ao gravar o lote (cadastro simultâneo); nenhum usuário foi cadastrado.'
+            entry['status'] = 'error'
+        return report
+    for entry, _ in candidates:
+        entry.update(status='created', message=None)
+    return report
+
+
+def summarize(report):
+    """Totais por situação (``created``, ``valid``, ``error``)."""
+    summary = {}
+    for entry in report:
+        summary[entry['status']] = summary.get(entry['status'], 0) + 1
+    return summary
@@ -0,0 +1,154 @@
+"""
+Manutenção do histórico de versões gravado como deltas (ver ArticleVersion).
+
+``load_history`` carrega todas as versões de um artigo em uma consulta e
+reconstrói o conteúdo de cada uma em memória; ``reencode`` regrava a cadeia
+(versões completas a cada VERSION_KEYFRAME_INTERVAL versões e deltas entre
+elas). É o que ``flask versions compact`` faz com os históricos antigos, em
+que todas as versões estão completas. ``collapse_duplicates`` remove as
+versões repetidas em sequência (salvamentos sem alteração).
+"""
+from src.models.article import Article, ArticleHistory
+from src.models.article_version import ArticleVersion
+from src.models.user import db
+from src.services.deltas import apply_delta
+from src.services.text import content_hash
+
+# Versões removidas por comando (limite do IN)
+DELETE_BATCH_SIZE = 500
+
+
+def stored_size(version):
+    """Bytes ocupados pelo conteúdo da versão (texto completo ou delta)."""
+    if version.stored_content is not None:
+        return len(version.stored_content.encode('utf-8'))
+    return len(version.delta or b'')
+
+
+def load_history(article_id):
+    """
+    Versões do artigo em ordem, com o conteúdo já reconstruído (a propriedade
+    ``content`` não faz novas consultas).
+    """
+    versions = ArticleVersion.query.filter_by(article_id=article_id).order_by(
+        ArticleVersion.version_number, ArticleVersion.id
+    ).all()
+    by_id = {version.id: version for version in versions}
+
+    # As bases sempre têm id menor, então em ordem de id a base já está pronta
+    for version in sorted(versions, key=lambda v: v.id):
+        if version.stored_content is not None:
+            version._reconstructed = (version.stored_content, 0)
+            continue
+        base = by_id.get(version.base_version_id)
+        if base is None:
+            version.reconstruct()
+            continue
+        content, depth = base.reconstruct()
+        version._reconstructed = (apply_delta(content, version.delta), depth + 1)
+    return versions
+
+
+def reencode(versions, interval=None, contents=None):
+    """
+    Regrava o conteúdo de ``versions`` (em ordem, carregadas por
+    ``load_history``) como uma cadeia de versões completas e deltas, cada
+    delta em relação à versão anterior da lista. Com ``contents``, grava
+    esses conteúdos (um por versão) no lugar dos atuais. Não faz commit.
+
+    Returns:
+        Tupla (bytes antes, bytes depois)
+    """
+    before = sum(stored_size(version) for version in versions)
+    if contents is None:
+        contents = [version.content for version in versions]
+    previous = None
+    for version, content in zip(versions, contents):
+        version.encode_content(content, previous, interval)
+        previous = version
+    after = sum(stored_size(version) for version in versions)
+    return before, after
+
+
+def compact_article(article_id, interval=None):
+    """Regrava o histórico do artigo como deltas e confirma. Retorna (antes, depois)."""
+    sizes = reencode(load_history(article_id), interval)
+    db.session.commit()
+    return sizes
+
+
+def version_key(version):
+    """Dados que definem uma versão; versões seguidas com a mesma chave são repetidas."""
+    return (version.content_hash, version.title, version.status, version.category_id)
+
+
+def collapse_duplicates(article_id, interval=None):
+    """
+    Remove as versões iguais à anterior (mesmo conteúdo, título, status e
+    categoria), preenche os hashes que faltam e regrava a cadeia de deltas das
+    versões mantidas. As entradas do histórico das versões removidas eram
+    salvamentos sem alteração e também são removidas; as de outro tipo
+    passam a apontar para a versão mantida.
+
+    Returns:
+        Quantidade de versões removidas
+    """
+    versions = load_history(article_id)
+    for version in versions:
+        if version.content_hash is None:
+            version.content_hash = content_hash(version.content)
+
+    article = db.session.get(Article, article_id)
+    if article is not None and article.content_hash is None:
+        article.content_hash = content_hash(article.content)
+
+    kept = []
+    replaced_by = {}
+    for version in versions:
+        if kept and version_key(version) == version_key(kept[-1]):
+            replaced_by[version.id] = kept[-1].id
+        else:
+            kept.append(version)
+
+    if replaced_by:
+        reencode(kept, interval)
+        remove_versions(replaced_by)
+
+    db.session.commit()
+    return len(replaced_by)
+
+
+def remove_versions(replaced_by):
+    """
+    Exclui as versões de ``replaced_by`` (id removido -> id da versão mantida
+    que a substitui). As versões mantidas já devem ter sido regravadas sem
+    usar as removidas como base (``reencode``). As entradas de histórico
+    "update" das versões removidas também são excluídas; as demais passam a
+    apontar para a versão mantida. Não faz commit.
+
+    Returns:
+        Quantidade de entradas de histórico excluídas
+    """
+    # Grava antes as versões regravadas, que deixam de apontar para as removidas
+    db.session.flush()
+
+    removed_ids = list(replaced_by)
+    batches = [removed_ids[start:start + DELETE_BATCH_SIZE]
+               for start in range(0, len(removed_ids), DELETE_BATCH_SIZE)]
+    # Uma versão removida pode ser a base de outra removida em um lote
+    # seguinte: as ligações entre elas são desfeitas antes de excluir
+    for batch in batches:
+        ArticleVersion.query.filter(ArticleVersion.id.in_(batch)).update(
+            {ArticleVersion.base_version_id: None}, synchronize_session=False
+        )
+
+    history_removed = 0
+    for batch in batches:
+        history_removed += ArticleHistory.query.filter(
+            ArticleHistory.version_id.in_(batch), ArticleHistory.action == 'update'
+        ).delete(synchronize_session=False)
+        for entry in ArticleHistory.query.filter(ArticleHistory.version_id.in_(batch)):
+            entry.version_id = replaced_by[entry.version_id]
+        db.session.flush()
+        ArticleVersion.query.filter(ArticleVersion.id.in_(batch)).delete(synchronize_session=False)
+    return history_removed
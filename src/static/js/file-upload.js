@@ -48,7 +48,96 @@ document.addEventListener("DOMContentLoaded", function () {
       if (!fileInputElement.files || fileInputElement.files.length === 0) {
         e.preventDefault();
         alert("Por favor, selecione um arquivo para upload.");
+        return;
+      }
+
+      // Arquivos maiores que um pedaço vão pelo envio retomável
+      const chunkSize = parseInt(fileForm.dataset.chunkSize || "0", 10);
+      const file = fileInputElement.files[0];
+      if (fileForm.dataset.uploadsUrl && chunkSize && file.size > chunkSize) {
+        e.preventDefault();
+        uploadInChunks(fileForm, file).catch(function (error) {
+          alert("Erro no upload: " + error.message);
+        });
       }
     });
   }
 });
+
+// -------------------------------------------------------------
+// Envio em pedaços (/files/uploads): cria a sessão, envia os pedaços
+// que faltam (com novas tentativas) e finaliza. Se a conexão cair,
+// enviar o mesmo arquivo de novo retoma a sessão salva no navegador.
+// -------------------------------------------------------------
+const CHUNK_RETRIES = 5;
+
+async function uploadInChunks(form, file) {
+  const baseUrl = form.dataset.uploadsUrl;
+  const storageKey = `upload-session:${file.name}:${file.size}:${file.lastModified}`;
+  const progress = document.getElementById("file-upload-progress");
+  const progressBar = progress ? progress.querySelector(".progress-bar") : null;
+  const submitButton = form.querySelector("button[type=submit]");
+  if (submitButton) submitButton.disabled = true;
+  if (progress) progress.classList.remove("d-none");
+
+  try {
+    let status = null;
+    const savedId = localStorage.getItem(storageKey);
+    if (savedId) {
+      const response = await fetch(`${baseUrl}/${savedId}`);
+      if (response.ok) status = await response.json();
+    }
+    if (!status || status.completed) {
+      const response = await fetch(baseUrl, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({
+          filename: file.name,
+          total_size: file.size,
+          article_id: form.elements["article_id"] ? form.elements["article_id"].value : null,
+          reference_text: form.elements["reference_text"] ? form.elements["reference_text"].value : "",
+          description: form.elements["description"] ? form.elements["description"].value : ""
+        })
+      });
+      status = await response.json();
+      if (!response.ok) throw new Error(status.error || response.statusText);
+      localStorage.setItem(storageKey, status.session_id);
+    }
+
+    const sessionUrl = `${baseUrl}/${status.session_id}`;
+    let done = status.total_chunks - status.missing.length;
+    for (const number of status.missing) {
+      const start = number * status.chunk_size;
+      const blob = file.slice(start, Math.min(start + status.chunk_size, file.size));
+      await putChunk(`${sessionUrl}/chunks/${number}`, blob);
+      done += 1;
+      if (progressBar) progressBar.style.width = `${Math.round((done / status.total_chunks) * 100)}%`;
+    }
+
+    const response = await fetch(`${sessionUrl}/complete`, { method: "POST" });
+    const result = await response.json();
+    if (!response.ok || !result.success) throw new Error(result.error || response.statusText);
+    localStorage.removeItem(storageKey);
+    window.location.reload();
+  } finally {
+    if (submitButton) submitButton.disabled = false;
+  }
+}
+
+async function putChunk(url, blob) {
+  for (let attempt = 1; ; attempt++) {
+    try {
+      const response = await fetch(url, { method: "PUT", body: blob });
+      if (response.ok) return;
+      // Erros 4xx não se resolvem com nova tentativa
+      if (response.status < 500) {
+        const result = await response.json();
+        throw Object.assign(new Error(result.error || response.statusText), { fatal: true });
+      }
+    } catch (error) {
+      if (error.fatal || attempt >= CHUNK_RETRIES) throw error;
+    }
+    if (attempt >= CHUNK_RETRIES) throw new Error("Falha ao enviar o pedaço após várias tentativas.");
+    await new Promise((resolve) => setTimeout(resolve, 1000 * 2 ** (attempt - 1)));
+  }
+}
@@ -0,0 +1,144 @@
+"""
+Fixtures dos testes: a aplicação roda sobre um SQLite temporário (com chaves
+estrangeiras ativas), recriado a cada teste, e os caches por worker são
+esvaziados entre os testes.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_TMP_DIR = tempfile.mkdtemp(prefix='kb-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_TMP_DIR, 'test.db')
+
+
+@event.listens_for(Engine, 'connect')
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+
+from src.main import app as flask_app  # noqa: E402
+from src.models import db, init_db, Article  # noqa: E402
+from src.models.article_version import ArticleVersion  # noqa: E402
+from src.services.cache import CACHES  # noqa: E402
+from src.services.login_tracker import last_login_buffer  # noqa: E402
+from src.services.text import content_hash  # noqa: E402
+
+
+def reset_caches():
+    for cache in CACHES.values():
+        if hasattr(cache, 'entries'):
+            cache.entries.clear()
+        if hasattr(cache, 'total_size'):
+            cache.total_size = 0
+        if hasattr(cache, 'version'):
+            cache.value = cache.version = None
+
+
+@pytest.fixture
+def app(tmp_path):
+    flask_app.config.update(TESTING=True, UPLOAD_FOLDER=str(tmp_path / 'uploads'))
+    with flask_app.app_context():
+        db.session.remove()
+        db.drop_all()
+        reset_caches()
+        # Logins de testes anteriores não são gravados no banco novo
+        with last_login_buffer.lock:
+            last_login_buffer.pending.clear()
+        init_db(flask_app)
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def login(client, username='admin', password='admin123'):
+    response = client.post('/auth/login', data={'username': username, 'password': password})
+    assert response.status_code == 302, response.status_code
+    return client
+
+
+@pytest.fixture
+def admin_client(client):
+    return login(client)
+
+
+def create_article(contents, created_at=(), user_id=1, category_id=1, status='rascunho'):
+    """
+    Artigo com uma versão por item de ``contents`` (gravadas como em
+    ``create_from_article``: deltas em relação à anterior) e o conteúdo da
+    última. ``created_at`` dá a data de cada versão. Não faz commit.
+    """
+    article = Article(title='Artigo', content=contents[-1], content_hash=content_hash(contents[-1]),
+                      status=status, category_id=category_id, created_by=user_id, updated_by=user_id,
+                      version_counter=len(contents))
+    db.session.add(article)
+    db.session.flush()
+    previous = None
+    for number, content in enumerate(contents, start=1):
+        version = ArticleVersion(
+            article_id=article.id, version_number=number, title=article.title, status=status,
+            category_id=category_id, content_hash=content_hash(content), created_by=user_id,
+            created_at=created_at[number - 1] if created_at else None
+        )
+        version.encode_content(content, previous)
+        db.session.add(version)
+        db.session.flush()
+        previous = version
+    return article
+
+
+class SQLRecorder:
+    """
+    Comandos SQL executados pela thread do teste (texto e parâmetros)
+    enquanto ativo; os de threads em segundo plano (gravação de last_login,
+    miniaturas) ficam de fora.
+    """
+
+    def __init__(self):
+        self.statements = []
+        self.thread_id = threading.get_ident()
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self.thread_id:
+            self.statements.append((statement, parameters))
+
+    @property
+    def selects(self):
+        return [(sql, params) for sql, params in self.statements if sql.lstrip().upper().startswith(('SELECT', 'WITH'))]
+
+    def fetched_bytes(self):
+        """Bytes das linhas devolvidas pelos SELECTs registrados (reexecutados)."""
+        total = 0
+        with db.engine.connect() as conn:
+            for sql, params in self.selects:
+                for row in conn.exec_driver_sql(sql, params).fetchall():
+                    total += sum(len(value) if isinstance(value, (str, bytes)) else 8
+                                 for value in row if value is not None)
+        return total
+
+
+@pytest.fixture
+def sql_log(app):
+    """Registra os comandos SQL do teste (use ``sql_log.statements.clear()`` para recomeçar)."""
+    recorder = SQLRecorder()
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', recorder)
+    yield recorder
+    event.remove(engine, 'before_cursor_execute', recorder)
@@ -0,0 +1,46 @@
+"""Listagem de arquivos: o conteúdo armazenado no banco nunca é lido."""
+import os
+
+from src.models import db, File
+
+BLOB_SIZE = 1024 * 1024
+
+
+def add_db_files(count):
+    for number in range(count):
+        db.session.add(File(
+            filename=f'arquivo{number}.pdf',
+            original_filename=f'arquivo{number}.pdf',
+            file_type='application/pdf',
+            mime_type='application/pdf',
+            file_size=BLOB_SIZE,
+            file_content=os.urandom(BLOB_SIZE),
+            stored_in_db=True,
+            uploaded_by=1
+        ))
+    db.session.commit()
+
+
+def test_listing_does_not_select_file_content(app, admin_client, sql_log):
+    with app.app_context():
+        add_db_files(5)
+
+    sql_log.statements.clear()
+    response = admin_client.get('/files/')
+    assert response.status_code == 200
+    assert 'arquivo4.pdf' in response.get_data(as_text=True)
+
+    assert sql_log.selects
+    assert not any('file_content' in sql for sql, _ in sql_log.selects)
+    with app.app_context():
+        # Metadados de 5 arquivos, contra 5 MB de conteúdo
+        assert sql_log.fetched_bytes() < 16 * 1024
+
+
+def test_file_relationship_keeps_content_deferred(app):
+    with app.app_context():
+        add_db_files(1)
+        db.session.expunge_all()
+        file = File.query.first()
+        assert 'file_content' not in file.__dict__
+        assert len(file.file_content) == BLOB_SIZE
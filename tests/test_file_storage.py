@@ -0,0 +1,116 @@
+"""Remoção dos blobs do repositório em disco."""
+import io
+import os
+
+from src.models import db, File
+from src.services import thumbnails
+from src.services.file_storage import FilesystemStorage
+
+
+def add_file(content, name='a.pdf'):
+    file = File(filename=name, original_filename=name, file_type='application/pdf',
+                mime_type='application/pdf', file_size=0, uploaded_by=1)
+    db.session.add(file)
+    db.session.flush()
+    FilesystemStorage().save(file, io.BytesIO(content))
+    db.session.commit()
+    return file
+
+
+def blob_exists(file_path):
+    return os.path.exists(FilesystemStorage.resolve(file_path))
+
+
+def delete_file(file):
+    FilesystemStorage().delete(file)
+    thumbnails.delete(file)
+    db.session.delete(file)
+
+
+def test_blob_removed_after_commit_when_unreferenced(app):
+    app.config['BLOB_REUSE_GRACE_SECONDS'] = 0
+    with app.app_context():
+        first = add_file(b'%PDF-1 shared')
+        second = add_file(b'%PDF-1 shared', 'b.pdf')
+        blob = first.file_path
+        assert second.file_path == blob
+
+        delete_file(first)
+        assert blob_exists(blob)  # nada é removido antes do commit
+        db.session.commit()
+        assert blob_exists(blob)  # ainda referenciado por second
+
+        delete_file(second)
+        db.session.commit()
+        assert not blob_exists(blob)
+
+
+def test_blob_kept_when_delete_rolls_back(app):
+    app.config['BLOB_REUSE_GRACE_SECONDS'] = 0
+    with app.app_context():
+        file = add_file(b'%PDF-1 rollback')
+        delete_file(file)
+        db.session.rollback()
+        assert blob_exists(file.file_path)
+        assert db.session.get(File, file.id) is not None
+
+
+def test_blob_kept_while_used_as_thumbnail(app):
+    app.config['BLOB_REUSE_GRACE_SECONDS'] = 0
+    with app.app_context():
+        file = add_file(b'%PDF-1 thumb')
+        other = add_file(b'%PDF-1 other', 'c.pdf')
+        other.thumbnail_hash = file.content_hash
+        db.session.commit()
+
+        delete_file(file)
+        db.session.commit()
+        assert blob_exists(file.file_path)
+
+        delete_file(other)
+        db.session.commit()
+        assert not blob_exists(file.file_path)
+
+
+def test_recently_reused_blob_left_for_gc(app):
+    app.config['BLOB_REUSE_GRACE_SECONDS'] = 3600
+    with app.app_context():
+        file = add_file(b'%PDF-1 recent')
+        blob = file.file_path
+        delete_file(file)
+        db.session.commit()
+        assert blob_exists(blob)
+
+        app.config['BLOB_REUSE_GRACE_SECONDS'] = 0
+        assert FilesystemStorage().collect_garbage() == 1
+        assert not blob_exists(blob)
+
+
+def test_new_blob_removed_when_upload_is_not_committed(app):
+    with app.app_context():
+        file = File(filename='d.pdf', original_filename='d.pdf', file_type='application/pdf',
+                    mime_type='application/pdf', file_size=0, uploaded_by=1)
+        db.session.add(file)
+        db.session.flush()
+        FilesystemStorage().save(file, io.BytesIO(b'%PDF-1 abandoned'))
+        blob = file.file_path
+        assert blob_exists(blob)
+    # Sessão descartada sem commit nem rollback explícito (fim da requisição)
+    with app.app_context():
+        assert not blob_exists(blob)
+
+
+def test_new_blob_kept_on_rollback_when_reused(app):
+    with app.app_context():
+        file = File(filename='e.pdf', original_filename='e.pdf', file_type='application/pdf',
+                    mime_type='application/pdf', file_size=0, uploaded_by=1)
+        db.session.add(file)
+        db.session.flush()
+        FilesystemStorage().save(file, io.BytesIO(b'%PDF-1 reused'))
+        blob = file.file_path
+        # Outro envio do mesmo conteúdo o reutiliza antes do rollback
+        path = FilesystemStorage.resolve(blob)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+        db.session.rollback()
+        assert blob_exists(blob)
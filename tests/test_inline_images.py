@@ -0,0 +1,130 @@
+"""Extração das imagens embutidas em base64 no conteúdo dos artigos."""
+import base64
+import io
+import os
+import re
+
+from PIL import Image
+
+from src.models import db, Article, ArticleFile, File, User
+from src.services import thumbnails
+from src.services.file_storage import FilesystemStorage
+from src.services.inline_images import extract_article, extract_inline_images
+from src.services.version_store import load_history
+
+from conftest import create_article, login
+
+
+def make_png(color):
+    output = io.BytesIO()
+    Image.new('RGB', (40, 30), color).save(output, 'PNG')
+    return output.getvalue()
+
+
+def inline(data):
+    return f'<img src="data:image/png;base64,{base64.b64encode(data).decode()}">'
+
+
+def blob_exists(file):
+    return os.path.exists(FilesystemStorage.resolve(file.file_path))
+
+
+def test_saved_article_points_to_extracted_files(app, admin_client, monkeypatch):
+    monkeypatch.setattr(thumbnails, 'schedule', lambda file: None)
+    red, blue = make_png((200, 0, 0)), make_png((0, 0, 200))
+    content = f'<p>Antes</p>{inline(red)}<p>Meio</p>{inline(blue)}{inline(red)}'
+    response = admin_client.post('/articles/create', data={
+        'title': 'Com imagens', 'content': content, 'category_id': '1', 'status': 'rascunho'
+    })
+    assert response.status_code == 302
+
+    with app.app_context():
+        article = Article.query.filter_by(title='Com imagens').one()
+        assert 'base64' not in article.content
+        file_ids = [int(file_id) for file_id in re.findall(r'src="/files/serve/(\d+)', article.content)]
+        files = File.query.order_by(File.id).all()
+        assert len(files) == 2 and file_ids == [files[0].id, files[1].id, files[0].id]
+        assert all(blob_exists(file) for file in files)
+        assert article.versions[0].content == article.content
+
+
+def test_blobs_removed_when_the_article_is_not_saved(app):
+    with app.app_context():
+        content, created, _ = extract_inline_images(inline(make_png((0, 200, 0))), 1)
+        (file,) = created
+        path = FilesystemStorage.resolve(file.file_path)
+        assert os.path.exists(path)
+        db.session.rollback()
+        assert not os.path.exists(path)
+        assert File.query.count() == 0
+
+
+def test_extract_article_rewrites_content_and_history(app):
+    image = inline(make_png((0, 120, 120)))
+    texts = [f'<p>Versão {n}</p>{image}' for n in range(3)]
+    with app.app_context():
+        article_id = create_article(texts).id
+        db.session.commit()
+
+    with app.app_context():
+        result = extract_article(article_id)
+        assert result.images == 1
+        assert result.article_bytes > 0 and result.version_bytes > 0
+
+    with app.app_context():
+        (file,) = File.query.all()
+        assert blob_exists(file)
+        article = db.session.get(Article, article_id)
+        assert f'src="/files/serve/{file.id}"' in article.content
+        assert [link.file_id for link in ArticleFile.query.filter_by(article_id=article_id)] == [file.id]
+        versions = load_history(article_id)
+        assert [version.content for version in versions] == [
+            text.replace(image, f'<img src="/files/serve/{file.id}">') for text in texts
+        ]
+
+        # Nada mais a extrair; o arquivo é reutilizado
+        assert extract_article(article_id).article_bytes == 0
+        assert File.query.count() == 1
+
+
+def create_with_image(app, admin_client, monkeypatch, status):
+    monkeypatch.setattr(thumbnails, 'schedule', lambda file: None)
+    admin_client.post('/articles/create', data={
+        'title': 'Com imagem', 'content': inline(make_png((90, 90, 0))), 'category_id': '1', 'status': status
+    })
+    with app.app_context():
+        article = Article.query.filter_by(title='Com imagem').one()
+        (link,) = ArticleFile.query.filter_by(article_id=article.id).all()
+        user = User(username='leitor', email='leitor@example.com', role='user')
+        user.set_password('leitor123')
+        db.session.add(user)
+        db.session.commit()
+        return link.file_id
+
+
+def test_extracted_image_follows_article_visibility(app, admin_client, monkeypatch):
+    file_id = create_with_image(app, admin_client, monkeypatch, 'rascunho')
+
+    response = admin_client.get(f'/files/serve/{file_id}')
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'].startswith('private')
+
+    reader = login(app.test_client(), 'leitor', 'leitor123')
+    assert reader.get(f'/files/serve/{file_id}').status_code == 404
+    assert app.test_client().get(f'/files/serve/{file_id}').status_code == 404
+
+    with app.app_context():
+        Article.query.filter_by(title='Com imagem').one().status = 'homologado'
+        db.session.commit()
+    assert reader.get(f'/files/serve/{file_id}').status_code == 200
+
+
+def test_extracted_image_hidden_from_file_list(app, admin_client, monkeypatch):
+    file_id = create_with_image(app, admin_client, monkeypatch, 'homologado')
+
+    response = admin_client.get('/files/', headers={'X-Requested-With': 'XMLHttpRequest'})
+    assert response.get_json()['files'] == []
+
+    admin_client.post(f'/files/delete/{file_id}')
+    with app.app_context():
+        assert db.session.get(File, file_id) is not None
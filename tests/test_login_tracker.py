@@ -0,0 +1,33 @@
+"""Gravação adiada de ``users.last_login``."""
+from datetime import datetime
+
+from src.models import db, User
+from src.services.login_tracker import LastLoginBuffer, MAX_FLUSH_ATTEMPTS
+
+
+def test_flush_ignores_deleted_users(app):
+    when = datetime(2026, 10, 1, 8, 30)
+    buffer = LastLoginBuffer()
+    buffer.app = app
+    buffer.pending = {1: when, 999: when}
+
+    assert buffer.flush() == 2
+    assert buffer.pending == {}
+    with app.app_context():
+        assert db.session.get(User, 1).last_login == when
+
+
+def test_failing_batch_is_eventually_dropped(app, monkeypatch):
+    buffer = LastLoginBuffer()
+    buffer.app = app
+    buffer.pending = {1: datetime(2026, 10, 1)}
+
+    def fail(*args, **kwargs):
+        raise RuntimeError('banco indisponível')
+
+    monkeypatch.setattr(db.session, 'execute', fail)
+    for _ in range(MAX_FLUSH_ATTEMPTS - 1):
+        assert buffer.flush() == 0
+        assert list(buffer.pending) == [1]
+    assert buffer.flush() == 0
+    assert buffer.pending == {}
@@ -0,0 +1,58 @@
+"""Hashes de senha com a fila cheia."""
+import pytest
+
+from src.models import db, init_db, User
+from src.services.passwords import PasswordHashBusy, hasher
+
+
+@pytest.fixture
+def busy_hasher(app, monkeypatch):
+    """Recusa todos os cálculos feitos sem ``wait`` (fila cheia)."""
+    run = hasher.run
+
+    def refuse(func, *args, wait=False):
+        if not wait:
+            raise PasswordHashBusy()
+        return run(func, *args, wait=wait)
+
+    monkeypatch.setattr(hasher, 'run', refuse)
+
+
+def test_create_user_answers_503_when_busy(app, admin_client, busy_hasher):
+    response = admin_client.post('/admin/users/create', data={
+        'username': 'maria', 'email': 'maria@example.com', 'role': 'user', 'password': 'segredo123'
+    })
+    assert response.status_code == 503
+    with app.app_context():
+        assert User.query.filter_by(username='maria').first() is None
+
+
+def test_update_user_keeps_changes_out_when_busy(app, admin_client, busy_hasher):
+    with app.app_context():
+        user = User(username='maria', email='maria@example.com', role='user', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    response = admin_client.post(f'/admin/users/{user_id}/edit', data={
+        'username': 'maria', 'email': 'outro@example.com', 'role': 'editor', 'password': 'nova123'
+    })
+    assert response.status_code == 503
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        assert (user.email, user.role, user.password_hash) == ('maria@example.com', 'user', 'x')
+
+
+def test_profile_answers_503_when_busy(admin_client, busy_hasher):
+    response = admin_client.post('/auth/profile', data={
+        'full_name': 'Administrador', 'email': 'admin@example.com', 'current_password': 'admin123',
+        'new_password': 'nova123', 'confirm_password': 'nova123'
+    })
+    assert response.status_code == 503
+
+
+def test_init_db_waits_for_the_hasher(app, busy_hasher):
+    with app.app_context():
+        db.drop_all()
+    init_db(app)
+    with app.app_context():
+        assert User.query.filter_by(username='admin').one().password_hash
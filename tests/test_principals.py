@@ -0,0 +1,63 @@
+"""Usuário logado em cache (``Principal``)."""
+from datetime import datetime
+
+from src.models import db, User
+from src.models.stats import principal_version
+from src.services.cache import read_version
+from src.services.principals import principal_cache
+
+from conftest import login
+
+
+def create_user(app, role='user'):
+    with app.app_context():
+        user = User(username='maria', email='maria@example.com', role=role)
+        user.set_password('segredo123')
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def update_user(app, user_id, **values):
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        for name, value in values.items():
+            setattr(user, name, value)
+        db.session.commit()
+
+
+def test_deactivated_user_session_is_rejected(app, client):
+    user_id = create_user(app)
+    login(client, 'maria', 'segredo123')
+    assert client.get('/articles/').status_code == 200
+
+    update_user(app, user_id, active=False)
+    response = client.get('/articles/')
+    assert response.status_code == 302
+    assert '/auth/login' in response.headers['Location']
+
+
+def test_changes_from_other_workers_reload_the_principal(app, client):
+    user_id = create_user(app)
+    login(client, 'maria', 'segredo123')
+    client.get('/articles/')
+    stale = principal_cache.entries[user_id]
+
+    # Outro worker altera o usuário: a invalidação local não chega aqui
+    update_user(app, user_id, active=False)
+    principal_cache.entries[user_id] = stale
+
+    response = client.get('/articles/')
+    assert response.status_code == 302
+    assert principal_cache.entries[user_id][2].active is False
+
+
+def test_stamp_is_per_user_and_ignores_last_login(app):
+    user_id = create_user(app)
+    with app.app_context():
+        update_user(app, user_id, last_login=datetime(2026, 10, 1))
+        assert read_version(principal_version(user_id)) == 0
+
+        update_user(app, 1, role='editor')
+        assert read_version(principal_version(1)) == 1
+        assert read_version(principal_version(user_id)) == 0
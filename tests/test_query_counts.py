@@ -0,0 +1,56 @@
+"""Quantidade de comandos SQL das listagens (sem consultas por item)."""
+import pytest
+
+from src.models import db, User, Category, Tag, Article, File
+from src.services.stats import reconcile
+
+STATUSES = ('rascunho', 'em_analise', 'homologado', 'arquivado')
+
+
+def populate(count):
+    authors = [User(username=f'autor{n}', email=f'autor{n}@example.com', role='editor',
+                    password_hash='x', active=True) for n in range(3)]
+    categories = [Category(name=f'Categoria {n}') for n in range(3)]
+    tags = [Tag(name=f'tag{n}') for n in range(4)]
+    db.session.add_all(authors + categories + tags)
+    db.session.flush()
+    for n in range(count):
+        author = authors[n % len(authors)]
+        db.session.add(Article(
+            title=f'Artigo {n}', content=f'<p>conteúdo {n}</p>', status=STATUSES[n % len(STATUSES)],
+            category_id=categories[n % len(categories)].id, created_by=author.id, updated_by=author.id,
+            tags=tags[:n % len(tags) + 1]
+        ))
+        db.session.add(File(filename=f'f{n}.pdf', original_filename=f'f{n}.pdf', file_type='application/pdf',
+                            mime_type='application/pdf', file_size=1, uploaded_by=author.id))
+    db.session.commit()
+    reconcile()
+
+
+# Limite de comandos por página, com os caches por worker já aquecidos
+# (incluindo a leitura dos carimbos de versão); não depende da quantidade de
+# itens listados
+MAX_STATEMENTS = {
+    '/articles/': 3,
+    '/articles/?status=rascunho': 3,
+    '/admin/articles': 2,
+    '/admin/users': 2,
+    '/admin/': 3,
+    '/files/': 5,
+}
+
+
+def count_statements(client, sql_log, url):
+    client.get(url)  # aquece os caches por worker (usuário, categorias, tags)
+    sql_log.statements.clear()
+    response = client.get(url)
+    assert response.status_code == 200, url
+    return len(sql_log.statements)
+
+
+@pytest.mark.parametrize('count', [4, 40])
+@pytest.mark.parametrize('url', sorted(MAX_STATEMENTS))
+def test_statements_per_page(app, admin_client, sql_log, url, count):
+    with app.app_context():
+        populate(count)
+    assert count_statements(admin_client, sql_log, url) <= MAX_STATEMENTS[url]
@@ -0,0 +1,75 @@
+"""Política de retenção do histórico de versões."""
+from datetime import datetime, timedelta
+
+from src.models import db, ArticleHistory
+from src.models.article_version import ArticleVersion
+from src.services.retention import RetentionPolicy, apply_retention
+from src.services.version_store import DELETE_BATCH_SIZE, load_history
+
+from conftest import create_article
+
+NOW = datetime(2026, 1, 1, 12)
+POLICY = RetentionPolicy(keep_all_days=90, daily_days=365)
+
+# Dez versões por dia durante 70 dias, há quase dois anos, e cinco recentes
+OLD_DATES = [NOW - timedelta(days=700 - day, minutes=60 - n) for day in range(70) for n in range(10)]
+RECENT_DATES = [NOW - timedelta(days=5 - n) for n in range(5)]
+DATES = OLD_DATES + RECENT_DATES
+TEXTS = [f'<p>Revisão {n}.</p><p>' + 'texto ' * 40 + '</p>' for n in range(len(DATES))]
+
+
+def expected_numbers():
+    """Primeira versão, a última de cada mês antigo e todas as recentes."""
+    last_of_month = {}
+    for number, created_at in enumerate(OLD_DATES, start=1):
+        last_of_month[(created_at.year, created_at.month)] = number
+    recent = range(len(OLD_DATES) + 1, len(DATES) + 1)
+    return sorted({1, *last_of_month.values(), *recent})
+
+
+def populate(app):
+    with app.app_context():
+        article = create_article(TEXTS, created_at=DATES)
+        numbers = {version.version_number: version.id for version in article.versions}
+        db.session.add_all([
+            ArticleHistory(article_id=article.id, user_id=1, action='create', version_id=numbers[1]),
+            ArticleHistory(article_id=article.id, user_id=1, action='update', version_id=numbers[2]),
+            ArticleHistory(article_id=article.id, user_id=1, action='status_change', version_id=numbers[350],
+                           old_status='rascunho', new_status='em_analise'),
+        ])
+        db.session.commit()
+        return article.id
+
+
+def test_retention_keeps_policy_versions(app):
+    article_id = populate(app)
+    kept = expected_numbers()
+    assert len(DATES) - len(kept) > DELETE_BATCH_SIZE
+
+    with app.app_context():
+        result = apply_retention(article_id, POLICY, now=NOW)
+        assert result.versions_removed == len(DATES) - len(kept) - 1  # + status_change
+        assert result.history_removed == 1
+        assert result.bytes_reclaimed > 0
+
+    with app.app_context():
+        versions = load_history(article_id)
+        assert [version.version_number for version in versions] == sorted(kept + [350])
+        assert [version.content for version in versions] == [TEXTS[version.version_number - 1] for version in versions]
+        actions = sorted(entry.action for entry in ArticleHistory.query.filter_by(article_id=article_id))
+        assert actions == ['create', 'status_change']
+
+        # Nada mais a remover
+        assert apply_retention(article_id, POLICY, now=NOW).versions_removed == 0
+
+
+def test_retention_dry_run_changes_nothing(app):
+    article_id = populate(app)
+    with app.app_context():
+        result = apply_retention(article_id, POLICY, now=NOW, dry_run=True)
+        assert result.versions_removed > DELETE_BATCH_SIZE
+        assert result.history_removed == 1
+
+    with app.app_context():
+        assert ArticleVersion.query.filter_by(article_id=article_id).count() == len(DATES)
+        assert ArticleHistory.query.filter_by(article_id=article_id).count() == 3
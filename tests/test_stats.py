@@ -0,0 +1,25 @@
+"""Contadores do painel."""
+from src.models import db, init_db, User
+from src.services import stats
+
+
+def test_new_database_gets_counters(app):
+    with app.app_context():
+        counters = stats.get_counters()
+        assert counters['users'] == 1
+        assert counters['categories'] == 1
+
+
+def test_init_db_does_not_reconcile_existing_database(app, monkeypatch):
+    calls = []
+    monkeypatch.setattr(stats, 'reconcile', lambda: calls.append(True))
+    init_db(app)
+    assert calls == []
+
+
+def test_counters_follow_changes(app):
+    with app.app_context():
+        db.session.add(User(username='novo', email='novo@example.com', password_hash='x', role='leitor'))
+        db.session.commit()
+        assert stats.get_counters()['users'] == 2
+        assert stats.reconcile() == {}
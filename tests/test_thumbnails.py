@@ -0,0 +1,56 @@
+"""Miniaturas de imagens e PDFs, com o conteúdo em disco ou no banco."""
+import io
+
+import pytest
+from PIL import Image
+
+from src.models import db, File
+from src.services import thumbnails
+from src.services.file_storage import get_storage
+
+
+def make_pdf():
+    pymupdf = pytest.importorskip('pymupdf')
+    document = pymupdf.open()
+    page = document.new_page()
+    page.insert_text((72, 72), 'Primeira página')
+    return document.tobytes()
+
+
+def make_png():
+    output = io.BytesIO()
+    Image.new('RGB', (800, 600), (200, 30, 30)).save(output, 'PNG')
+    return output.getvalue()
+
+
+def add_file(content, mime_type, backend):
+    file = File(filename='x', original_filename='x', file_type=mime_type,
+                mime_type=mime_type, file_size=0, uploaded_by=1)
+    db.session.add(file)
+    db.session.flush()
+    get_storage(backend).save(file, io.BytesIO(content))
+    thumbnails.mark_pending(file)
+    db.session.commit()
+    return file
+
+
+@pytest.mark.parametrize('backend', ['filesystem', 'database'])
+def test_pdf_thumbnail(app, backend):
+    content = make_pdf()
+    with app.app_context():
+        file = add_file(content, 'application/pdf', backend)
+        assert thumbnails.generate(file)
+        db.session.refresh(file)
+        assert file.thumbnail_status == 'ready'
+        with Image.open(thumbnails.thumbnail_path(file)) as image:
+            assert max(image.size) <= app.config['THUMBNAIL_SIZE']
+
+
+@pytest.mark.parametrize('backend', ['filesystem', 'database'])
+def test_image_thumbnail(app, backend):
+    with app.app_context():
+        file = add_file(make_png(), 'image/png', backend)
+        assert thumbnails.generate(file)
+        db.session.refresh(file)
+        with Image.open(thumbnails.thumbnail_path(file)) as image:
+            assert image.size == (320, 240)
@@ -0,0 +1,33 @@
+"""Sessões de envio em pedaços: limite de tamanho e limpeza."""
+import os
+import time
+
+from src.services import upload_sessions
+
+
+def test_session_limit_defaults_to_upload_limit(app):
+    assert app.config['UPLOAD_SESSION_MAX_SIZE'] == app.config['MAX_CONTENT_LENGTH']
+
+
+def test_session_over_limit_rejected(admin_client, app):
+    response = admin_client.post('/files/uploads', json={
+        'filename': 'grande.zip',
+        'total_size': app.config['MAX_CONTENT_LENGTH'] + 1
+    })
+    assert response.status_code == 413
+
+
+def test_gc_keeps_recent_orphan_directories(app):
+    with app.app_context():
+        directory = upload_sessions.sessions_dir()
+        recent = os.path.join(directory, 'recente')
+        old = os.path.join(directory, 'antigo')
+        os.makedirs(recent)
+        os.makedirs(old)
+        two_days_ago = time.time() - 48 * 3600
+        os.utime(old, (two_days_ago, two_days_ago))
+
+        upload_sessions.collect_garbage()
+
+        assert os.path.isdir(recent)
+        assert not os.path.exists(old)
@@ -0,0 +1,37 @@
+"""Cadastro de usuários em lote."""
+from src.cli import users_cli
+from src.models import User
+from src.services import user_import
+from src.services.passwords import hasher
+
+ROWS = [
+    {'username': f'pessoa{n}', 'email': f'pessoa{n}@example.com', 'password': f'senha{n}', 'role': 'user'}
+    for n in range(3)
+]
+
+
+def test_web_import_hashes_on_the_bounded_pool(app, admin_client, monkeypatch):
+    def no_processes(*args, **kwargs):
+        raise AssertionError('a rota não deve iniciar processos')
+
+    monkeypatch.setattr(user_import, 'ProcessPoolExecutor', no_processes)
+    completed = hasher.completed
+    response = admin_client.post('/admin/users/import', json=ROWS)
+    assert response.status_code == 200
+    assert response.get_json()['summary'] == {'created': 3}
+    assert hasher.completed - completed == 3
+    with app.app_context():
+        assert User.query.filter_by(username='pessoa1').one().check_password('senha1')
+
+
+def test_cli_import_uses_processes(app, tmp_path):
+    path = tmp_path / 'usuarios.csv'
+    path.write_text('username,email,password\n' + ''.join(
+        f'{row["username"]},{row["email"]},{row["password"]}\n' for row in ROWS
+    ))
+    app.config['USER_IMPORT_HASH_PROCESSES'] = 2
+    result = app.test_cli_runner().invoke(users_cli, ['import', str(path)])
+    assert result.exit_code == 0, result.output
+    assert '3 usuário(s) criado(s)' in result.output
+    with app.app_context():
+        assert User.query.filter_by(username='pessoa2').one().check_password('senha2')
@@ -0,0 +1,62 @@
+"""Histórico de versões gravado como deltas."""
+from src.models import db
+from src.models.article_version import ArticleVersion
+from src.services.diff import version_diff
+from src.services.text import content_hash
+from src.services.version_store import DELETE_BATCH_SIZE, collapse_duplicates, load_history, reencode
+
+from conftest import create_article
+
+
+def contents(count):
+    return [f'<p>Parágrafo inicial.</p><p>Revisão {n}: ' + 'texto ' * 50 + '</p>' for n in range(count)]
+
+
+def test_reconstruct_follows_the_chain_in_order(app, sql_log):
+    app.config['VERSION_KEYFRAME_INTERVAL'] = 10
+    texts = contents(8)
+    with app.app_context():
+        article_id = create_article(texts).id
+        db.session.commit()
+
+    with app.app_context():
+        versions = ArticleVersion.query.filter_by(article_id=article_id).order_by(ArticleVersion.version_number).all()
+        assert versions[0].is_keyframe and not versions[-1].is_keyframe
+        sql_log.statements.clear()
+        assert versions[-1].reconstruct() == (texts[-1], 7)
+        (chain_sql, _), = sql_log.statements
+        assert 'ORDER BY' in chain_sql.rsplit(')', 1)[-1]
+        assert [version.content for version in load_history(article_id)] == texts
+
+
+def test_collapse_duplicates_removes_more_than_a_batch(app):
+    app.config['VERSION_KEYFRAME_INTERVAL'] = 10
+    texts = contents(1) * (DELETE_BATCH_SIZE + 100) + contents(2)[1:]
+    with app.app_context():
+        article_id = create_article(texts).id
+        db.session.commit()
+
+    with app.app_context():
+        assert collapse_duplicates(article_id) == DELETE_BATCH_SIZE + 99
+
+    with app.app_context():
+        versions = load_history(article_id)
+        assert [version.version_number for version in versions] == [1, len(texts)]
+        assert [version.content for version in versions] == [texts[0], texts[-1]]
+
+
+def test_version_diff_follows_rewritten_content(app):
+    texts = ['<p>um dois</p>', '<p>um dois três</p>']
+    with app.app_context():
+        article_id = create_article(texts).id
+        db.session.commit()
+        old, new = load_history(article_id)
+        assert version_diff(old, new).inline == '<p>um dois<ins class="diff-ins"> três</ins></p>'
+
+        # Regravação do conteúdo por uma manutenção (mesmos ids)
+        rewritten = ['<p>um</p>', '<p>um quatro</p>']
+        for version, content in zip((old, new), rewritten):
+            version.content_hash = content_hash(content)
+        reencode([old, new], contents=rewritten)
+        db.session.commit()
+        assert version_diff(old, new).inline == '<p>um<ins class="diff-ins"> quatro</ins></p>'